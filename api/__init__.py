@@ -1,5 +1,6 @@
 from flask import Blueprint
 from .routes import register_routes
+from .batch import register_batch_routes
 
 
 def create_routes(app):
@@ -7,5 +8,6 @@ def create_routes(app):
     api_bp = Blueprint('api', __name__, url_prefix='/api')
 
     register_routes(api_bp)
+    register_batch_routes(api_bp)
 
     app.register_blueprint(api_bp)
\ No newline at end of file
@@ -0,0 +1,138 @@
+import time
+from urllib.parse import parse_qsl
+from services.async_data_service import AsyncDataService
+from config import REQUEST_DEADLINE_SECONDS, ACCESSIBILITY_DEADLINE_SECONDS
+from utils.metrics import metrics
+from utils.upstream import set_deadline, reset_deadline
+
+# Flask endpoints served natively async: endpoint -> (feed category, view argument)
+ASYNC_ENDPOINTS = {
+    'api.get_subway_feed': ('subway', 'feed_id'),
+    'api.get_lirr_feed': ('lirr', 'feed_id'),
+    'api.get_mnr_feed': ('mnr', 'feed_id'),
+    'api.get_service_alerts': ('alerts', 'alert_type'),
+    'api.get_accessibility_data': ('accessibility', 'data_type')
+}
+
+# Requests that need the full Flask view: archive lookups, profiling and non-JSON formats
+WSGI_ONLY_PARAMS = ('at', '_profile', 'format', 'pretty')
+WSGI_ONLY_HEADERS = (b'x-profile',)
+WSGI_ONLY_ACCEPT = (b'protobuf', b'msgpack')
+
+
+class AsyncFeedRouter:
+    """
+    ASGI application serving the I/O-bound feed endpoints without a thread per request
+
+    GET requests for the feed endpoints are answered from AsyncDataService,
+    so thousands can wait on upstream fetches in one process. Everything
+    else, and feed requests that need archive lookups, profiling or a
+    non-JSON format, is passed to the Flask app through asgiref's WsgiToAsgi.
+    """
+
+    def __init__(self, flask_app):
+        """
+        Args:
+            flask_app (Flask): Application built by create_app()
+        """
+        from asgiref.wsgi import WsgiToAsgi
+
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.url_adapter = flask_app.url_map.bind('localhost')
+        self.data_service = AsyncDataService()
+        self.request_latency = metrics.histogram(
+            'http_request_duration_seconds', 'API request latency', ('endpoint', 'method', 'status'))
+
+    def _match(self, scope):
+        """Get (endpoint, category, feed_id) for requests served async, else None"""
+        from werkzeug.exceptions import HTTPException
+
+        if scope['method'] != 'GET':
+            return None
+        if any(name in WSGI_ONLY_HEADERS for name, _ in scope['headers']):
+            return None
+        accept = dict(scope['headers']).get(b'accept', b'')
+        if any(wire_format in accept for wire_format in WSGI_ONLY_ACCEPT):
+            return None
+        query = dict(parse_qsl(scope['query_string'].decode('latin-1')))
+        if any(param in query for param in WSGI_ONLY_PARAMS):
+            return None
+
+        try:
+            endpoint, view_args = self.url_adapter.match(scope['path'], method='GET')
+        except HTTPException:
+            return None
+        if endpoint not in ASYNC_ENDPOINTS:
+            return None
+
+        category, argument = ASYNC_ENDPOINTS[endpoint]
+        return endpoint, category, view_args[argument]
+
+    def _render(self, category, feed_id, data):
+        """Encode a result exactly as the Flask feed views would, sharing their cached body per snapshot"""
+        json_provider = self.flask_app.json
+        body, error = self.data_service.encode_feed(
+            category, feed_id, data, 'json', lambda materialized: json_provider.response(materialized).get_data(),
+            variant='pretty' if json_provider.pretty_requested() else None)
+        if error:
+            body = json_provider.response(error).get_data()
+        return 200, body, json_provider.mimetype
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.data_service.aclose()
+                self.data_service.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        match = self._match(scope) if scope['type'] == 'http' else None
+        if match is None:
+            return await self.wsgi(scope, receive, send)
+
+        start = time.perf_counter()
+        endpoint, category, feed_id = match
+        deadline = ACCESSIBILITY_DEADLINE_SECONDS if category == 'accessibility' else REQUEST_DEADLINE_SECONDS
+        token = set_deadline(deadline) if REQUEST_DEADLINE_SECONDS else None
+        try:
+            data = await self.data_service.get_feed_async(category, feed_id)
+        finally:
+            if token is not None:
+                reset_deadline(token)
+        status, body, content_type = await self.data_service.run_in_executor(
+            self._render, category, feed_id, data)
+
+        headers = [(b'content-type', content_type.encode('latin-1')),
+                   (b'content-length', str(len(body)).encode('latin-1'))]
+
+        # Same CORS headers flask-cors adds on the WSGI path
+        origin = dict(scope['headers']).get(b'origin')
+        if origin:
+            headers += [(b'access-control-allow-origin', origin), (b'vary', b'Origin')]
+        else:
+            headers.append((b'access-control-allow-origin', b'*'))
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+        self.request_latency.observe(time.perf_counter() - start, endpoint, 'GET', str(status))
+
+
+def create_asgi_app(flask_app):
+    """
+    Wrap a Flask app for ASGI servers, serving feed endpoints natively async
+
+    Args:
+        flask_app (Flask): Application built by create_app()
+
+    Returns:
+        AsyncFeedRouter: ASGI application
+    """
+    return AsyncFeedRouter(flask_app)
@@ -0,0 +1,154 @@
+import contextvars
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit, urlencode
+from flask import current_app, jsonify, request, Response
+from config import BATCH_MAX_REQUESTS, BATCH_MAX_WORKERS
+from utils.admission import admission, BATCH_SUBREQUEST_ENVIRON
+
+# Headers forwarded from the batch request to every sub-request
+FORWARDED_HEADERS = ('Authorization', 'Accept-Language')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Get the shared sub-request executor, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix='batch')
+    return _executor
+
+
+def _normalize(item, url_prefix):
+    """
+    Validate a sub-request and build its dedupe key
+
+    Args:
+        item (dict): Sub-request ({"id", "method", "path", "params"})
+        url_prefix (str): Blueprint URL prefix sub-requests must target
+
+    Returns:
+        tuple: (key, error) where key is (path, query_string)
+    """
+    if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+        return None, "Sub-request must be an object with a 'path'"
+
+    if item.get('method', 'GET').upper() != 'GET':
+        return None, "Only GET sub-requests are supported"
+
+    url = urlsplit(item['path'])
+    path = url.path
+    if not path.startswith(url_prefix + '/') or path.rstrip('/') == url_prefix + '/batch':
+        return None, f"Invalid sub-request path: {path}"
+
+    # Merge params into the query string; sort so equivalent requests share a key
+    params = item.get('params') or {}
+    if not isinstance(params, dict):
+        return None, "Sub-request 'params' must be an object"
+    query = parse_qsl(url.query, keep_blank_values=True)
+    query.extend((key, str(value)) for key, value in params.items())
+    # Sub-responses are spliced into the JSON body, binary wire formats can't be
+    if any(key == 'format' and value != 'json' for key, value in query):
+        return None, "Only JSON sub-responses are supported (format=json)"
+    query_string = urlencode(sorted(query))
+
+    return (path, query_string), None
+
+
+def _dispatch(app, path, query_string, headers):
+    """
+    Run one sub-request through the full Flask dispatch pipeline
+
+    Returns:
+        tuple: (status code, body bytes, mimetype)
+    """
+    # Sub-requests were admitted with the batch request
+    with app.test_request_context(path, method='GET', query_string=query_string, headers=headers,
+                                  environ_base={BATCH_SUBREQUEST_ENVIRON: True}):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            current_app.logger.exception("Batch sub-request failed: %s", path)
+            return 500, json.dumps({"error": str(e)}).encode(), 'application/json'
+
+        return response.status_code, response.get_data(), response.mimetype
+
+
+def register_batch_routes(bp):
+    """Register the batch endpoint on the API blueprint"""
+
+    def batch_tokens(request):
+        """Admission tokens of a batch: the sum of its distinct sub-requests' class costs"""
+        data = request.get_json(silent=True)
+        items = data.get('requests') if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            items = []
+        keys = dict.fromkeys(_normalize(item, bp.url_prefix)[0] for item in items[:BATCH_MAX_REQUESTS])
+        app = current_app._get_current_object()
+        cost = sum(admission.path_cost(app, key[0]) for key in keys if key is not None)
+        return cost or admission.classes['expensive']['cost']
+
+    @bp.route('/batch', methods=['POST'])
+    @admission.cost('expensive', tokens=batch_tokens)
+    def batch():
+        """Run many GET sub-requests in one round trip"""
+        data = request.get_json(silent=True)
+        items = data.get('requests') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Please provide a non-empty 'requests' list"}), 400
+        if len(items) > BATCH_MAX_REQUESTS:
+            return jsonify({"error": f"Too many sub-requests (max {BATCH_MAX_REQUESTS})"}), 400
+
+        # Identical sub-requests are dispatched once and share the result
+        keys = []
+        errors = {}
+        for position, item in enumerate(items):
+            key, error = _normalize(item, bp.url_prefix)
+            keys.append(key)
+            if error:
+                errors[position] = error
+        unique_keys = list(dict.fromkeys(key for key in keys if key is not None))
+
+        app = current_app._get_current_object()
+        headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+
+        if len(unique_keys) == 1:
+            results = {unique_keys[0]: _dispatch(app, *unique_keys[0], headers)}
+        else:
+            # Sub-requests inherit the batch request's upstream deadline
+            futures = {
+                key: _get_executor().submit(contextvars.copy_context().run, _dispatch, app, *key, headers)
+                for key in unique_keys
+            }
+            results = {key: future.result() for key, future in futures.items()}
+
+        # Splice each sub-response's encoded JSON into the combined body
+        # instead of decoding and re-encoding it
+        parts = []
+        for position, item in enumerate(items):
+            meta = {
+                "id": item.get('id', position) if isinstance(item, dict) else position,
+                "path": item.get('path') if isinstance(item, dict) else None
+            }
+
+            if position in errors:
+                meta["status"] = 400
+                body = json.dumps({"error": errors[position]}).encode()
+            else:
+                meta["status"], body, mimetype = results[keys[position]]
+                if not body:
+                    body = b'null'
+                elif mimetype.startswith('text/'):
+                    body = json.dumps(body.decode('utf-8', 'replace')).encode()
+                elif mimetype != 'application/json' and not mimetype.endswith('+json'):
+                    meta["status"] = 400
+                    body = json.dumps({"error": f"Unsupported sub-response type: {mimetype}"}).encode()
+
+            parts.append(json.dumps(meta)[:-1].encode() + b', "body": ' + body + b'}')
+
+        payload = b'{"responses": [' + b', '.join(parts) + b']}'
+        return Response(payload, mimetype='application/json')
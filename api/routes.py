@@ -1,29 +1,114 @@
-from flask import jsonify, request
-from services.data_service import DataService
+from flask import current_app, jsonify, request, Response
+from services.data_service import DataService, static_datasets, upstream, feed_cadences
+from config import DEFAULT_AGENCY, ACCESSIBILITY_DEADLINE_SECONDS
+from utils.lazy import LazyObject
+from utils.metrics import metrics
+from utils.admission import admission
+from utils.profiling import profiler
+from utils.upstream import request_deadline
+from utils.wire_formats import MIMETYPES, negotiate, encode_msgpack
 from flask import jsonify, request
 
 from services.user_service import UserService
+from services.dashboard_service import DashboardService
 from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
 
 def register_routes(bp):
 
-   # Initialize  service
-   data_service = DataService()
-   user_service = UserService()
+   # Initialize  service (constructed on first use)
+   data_service = LazyObject(DataService)
+   user_service = LazyObject(UserService)
+   dashboard_service = LazyObject(lambda: DashboardService(data_service, user_service))
+
+   def get_agency():
+       """Get the static GTFS agency of a request (?agency=), and an error response if it is unknown"""
+       agency = request.args.get('agency', DEFAULT_AGENCY)
+       if agency not in static_datasets.agencies:
+           return agency, (jsonify({"error": f"Invalid agency: {agency}"}), 400)
+       return agency, None
+
+   def is_current_user(user_id):
+       """Whether the request's JWT identity is the given user (identities are issued as strings)"""
+       return str(get_jwt_identity()) == str(user_id)
+
+   def feed_response(category, feed_id, archived=True):
+       """
+       Render a feed in the wire format the client asked for (?format= or Accept)
+
+       JSON stays the default. application/x-protobuf returns the upstream
+       GTFS-RT payload (only the entities of ?route_id= when given), and
+       application/msgpack the parsed data. Live bodies are encoded once per
+       snapshot (and per ?pretty= for JSON); ?at= (when `archived`) serves
+       the archived snapshot instead.
+       """
+       wire_format = negotiate(request)
+       if wire_format is None:
+           return jsonify({"error": f"Not acceptable, supported formats: {', '.join(MIMETYPES)}"}), 406
+       if wire_format == 'protobuf' and category == 'accessibility':
+           return jsonify({"error": "Accessibility data is only available as JSON or msgpack"}), 406
+
+       pretty = wire_format == 'json' and current_app.json.pretty_requested()
+       encoders = {
+           'json': lambda data: current_app.json.response(data).get_data(),
+           'msgpack': encode_msgpack
+       }
+       at = request.args.get('at', type=int) if archived else None
+       try:
+           if at is None:
+               body, error = data_service.get_encoded_feed(
+                   category, feed_id, wire_format, encoders.get(wire_format),
+                   route_id=request.args.get('route_id') or None, variant='pretty' if pretty else None)
+           elif wire_format == 'protobuf':
+               body, error = data_service.get_archived_payload(category, feed_id, at)
+           else:
+               data = data_service.get_archived_feed(category, feed_id, at)
+               body, error = (None, data) if "error" in data else (encoders[wire_format](data), None)
+       except ImportError:
+           return jsonify({"error": f"{wire_format} support is not installed"}), 406
+
+       if error:
+           return jsonify(error)
+       return Response(body, mimetype=MIMETYPES[wire_format])
 
    @bp.route('/feeds')
+   @admission.cost('cheap')
    def list_feeds():
        """List all available data feeds"""
        feeds = data_service.get_available_feeds()
        return jsonify(feeds)
 
    @bp.route('/health')
+   @admission.cost('cheap')
    def health_check():
        """Health check endpoint"""
-       return jsonify({"status": "ok", "message": "Service is running"})
+       breakers = upstream.get_stats()
+       open_feeds = sorted(feed_id for feed_id, stats in breakers.items() if stats["state"] != 'closed')
+       return jsonify({"status": "degraded" if open_feeds else "ok",
+                       "message": f"Upstream unavailable: {', '.join(open_feeds)}" if open_feeds
+                       else "Service is running",
+                       "static_datasets": static_datasets.get_stats(),
+                       "upstream": breakers,
+                       "feed_cadence": feed_cadences.get_stats(),
+                       "admission": admission.get_stats() if admission.enabled else None})
+
+   @bp.route('/metrics')
+   @admission.cost('cheap')
+   def get_metrics():
+       """Metrics in Prometheus text format"""
+       return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+   @bp.route('/admin/slow-requests')
+   @profiler.exempt
+   @admission.cost('cheap')
+   def get_slow_requests():
+       """Slow request samples and hot functions"""
+       if not profiler.is_authorized(request):
+           return jsonify({"error": "Unauthorized access"}), 403
+       return jsonify(profiler.get_report())
 
    # Subway endpoints
    @bp.route('/subway/feeds')
+   @admission.cost('cheap')
    def list_subway_feeds():
        """List all available subway feeds"""
        return jsonify(data_service.get_subway_feeds())
@@ -31,75 +116,158 @@ def register_routes(bp):
    @bp.route('/subway/feeds/<feed_id>')
    def get_subway_feed(feed_id):
        """Get data for specific subway feed"""
-       data = data_service.get_subway_feed(feed_id)
-       return jsonify(data)
+       return feed_response('subway', feed_id)
 
    # LIRR endpoints
    @bp.route('/lirr/feeds/<feed_id>')
    def get_lirr_feed(feed_id):
        """Get LIRR data"""
-       data = data_service.get_lirr_feed(feed_id)
-       return jsonify(data)
+       return feed_response('lirr', feed_id)
 
    # Metro-North endpoints
    @bp.route('/mnr/feeds/<feed_id>')
    def get_mnr_feed(feed_id):
        """Get Metro-North data"""
-       data = data_service.get_mnr_feed(feed_id)
-       return jsonify(data)
+       return feed_response('mnr', feed_id)
 
    # Service alert endpoints
+   @bp.route('/alerts/active')
+   def get_active_alerts():
+       """Get alerts active for a route and/or stop at a point in time"""
+       data = data_service.get_active_alerts(
+           request.args.get('feed', 'all_alerts'),
+           route_id=request.args.get('route_id') or None,
+           stop_id=request.args.get('stop_id') or None,
+           at=request.args.get('at', type=int)
+       )
+       if "error" in data:
+           return jsonify(data), 400
+       return jsonify(data)
+
    @bp.route('/alerts/<alert_type>')
    def get_service_alerts(alert_type):
        """Get service alerts"""
-       data = data_service.get_service_alerts(alert_type)
+       return feed_response('alerts', alert_type)
+
+   # Analytics endpoints
+   @bp.route('/analytics/headways')
+   @admission.cost('expensive')
+   def get_headway_analytics():
+       """Get headway and delay statistics for a subway route over archived snapshots"""
+       route_id = request.args.get('route_id')
+       if not route_id:
+           return jsonify({"error": "route_id is required"}), 400
+       data = data_service.get_headway_analytics(
+           route_id,
+           start=request.args.get('from', type=int),
+           end=request.args.get('to', type=int)
+       )
+       if "error" in data:
+           return jsonify(data), 400
        return jsonify(data)
 
    # Accessibility endpoints
    @bp.route('/accessibility/<data_type>')
+   @request_deadline(ACCESSIBILITY_DEADLINE_SECONDS)
    def get_accessibility_data(data_type):
        """Get accessibility data"""
-       data = data_service.get_accessibility_data(data_type)
-       return jsonify(data)
+       return feed_response('accessibility', data_type, archived=False)
 
    @bp.route('/accessibility/station/<station_id>')
+   @request_deadline(ACCESSIBILITY_DEADLINE_SECONDS)
    def get_station_accessibility(station_id):
        """Get station accessibility info"""
        data = data_service.get_station_accessibility(station_id)
        return jsonify(data)
 
+   @bp.route('/accessibility/stations/outages')
+   @request_deadline(ACCESSIBILITY_DEADLINE_SECONDS)
+   def get_stations_with_outages():
+       """Get all stations with equipment currently out of service"""
+       data = data_service.get_stations_with_outages()
+       return jsonify(data)
+
+   # Merged realtime view
+   @bp.route('/realtime/routes/<route_id>/trips')
+   @admission.cost('expensive')
+   def get_route_trips(route_id):
+       """Active trips of a route across all of the agency's feeds (?agency=)"""
+       agency, error = get_agency()
+       if error:
+           return error
+       return jsonify(data_service.get_route_trips(route_id, agency))
+
+   @bp.route('/realtime/trips/<trip_id>')
+   @admission.cost('expensive')
+   def get_realtime_trip(trip_id):
+       """Merged realtime state of a trip (?agency=)"""
+       agency, error = get_agency()
+       if error:
+           return error
+       data = data_service.get_realtime_trip(trip_id, agency)
+       if "error" in data:
+           return jsonify(data), 404
+       return jsonify(data)
+
+   @bp.route('/static/datasets')
+   @admission.cost('cheap')
+   def list_static_datasets():
+       """Static GTFS release, memory use and reload state of every agency"""
+       return jsonify(static_datasets.get_stats())
+
    @bp.route('/stations')
+   @admission.cost('cheap')
    def list_stations():
        """List all stations"""
-       stations = data_service.get_stations()
+       agency, error = get_agency()
+       if error:
+           return error
+       stations = data_service.get_stations(agency)
        return jsonify(stations)
 
    @bp.route('/routes')
+   @admission.cost('cheap')
    def list_routes():
        """List all routes"""
-       routes = data_service.get_routes()
+       agency, error = get_agency()
+       if error:
+           return error
+       routes = data_service.get_routes(agency)
        return jsonify(routes)
 
    @bp.route('/routes/<route_id>/shape')
+   @admission.cost('expensive')
    def get_route_shape(route_id):
        """Get shape for a specific route"""
-       shape_data = data_service.get_line_shape(route_id)
+       agency, error = get_agency()
+       if error:
+           return error
+       shape_data = data_service.get_line_shape(route_id, agency)
        return jsonify(shape_data)
 
    @bp.route('/routes/<route_id>/stops')
+   @admission.cost('expensive')
    def get_route_stops(route_id):
        """Get stops for a specific route"""
-       stops_data = data_service.get_stops_for_route(route_id)
+       agency, error = get_agency()
+       if error:
+           return error
+       stops_data = data_service.get_stops_for_route(route_id, agency)
        return jsonify(stops_data)
 
    @bp.route('/line/<line_id>')
+   @admission.cost('expensive')
    def get_line(line_id):
        """Get line coordinates"""
-       line_data = data_service.get_line(line_id)
+       agency, error = get_agency()
+       if error:
+           return error
+       line_data = data_service.get_line(line_id, agency)
        return jsonify(line_data)
 
    # user_service
    @bp.route('/users/register', methods=['POST'])
+   @admission.cost('expensive')
    def register_user():
        """Register a new user"""
        data = request.json
@@ -113,6 +281,7 @@ def register_routes(bp):
        return jsonify({"message": "User registered successfully", "user_id": user.id}), 201
 
    @bp.route('/users/login', methods=['POST'])
+   @admission.cost('expensive')
    def login():
        """User login"""
        data = request.json
@@ -124,12 +293,11 @@ def register_routes(bp):
        pass
 
    @bp.route('/users/<int:user_id>/favorites/routes', methods=['GET'])
-
+   @jwt_required()
    def get_favorite_routes(user_id):
        """Get user's favorite routes"""
        # Verify identity
-       current_user = get_jwt_identity()
-       if current_user != user_id:
+       if not is_current_user(user_id):
            return jsonify({"error": "Unauthorized access"}), 403
 
        favorites = user_service.get_user_favorite_routes(user_id)
@@ -140,24 +308,107 @@ def register_routes(bp):
        } for fav in favorites])
 
    @bp.route('/users/<int:user_id>/favorites/routes', methods=['POST'])
-
+   @jwt_required()
    def add_favorite_route(user_id):
-       """Add a favorite route"""
-       # Implement add favorite logic
-       pass
+       """Add favorite routes ({"route_id": ...} or {"route_ids": [...]})"""
+       if not is_current_user(user_id):
+           return jsonify({"error": "Unauthorized access"}), 403
+
+       data = request.json or {}
+       route_ids = data.get('route_ids') or ([data['route_id']] if 'route_id' in data else [])
+       if not route_ids:
+           return jsonify({"error": "Please provide route_id or route_ids"}), 400
+
+       added, error = user_service.add_favorite_routes(user_id, route_ids)
+       if error:
+           return jsonify({"error": error}), 404
+       return jsonify({"added": [fav.route_id for fav in added]}), 201
+
+   @bp.route('/users/<int:user_id>/favorites/routes', methods=['DELETE'])
+   @jwt_required()
+   def remove_favorite_routes(user_id):
+       """Remove favorite routes ({"route_ids": [...]})"""
+       if not is_current_user(user_id):
+           return jsonify({"error": "Unauthorized access"}), 403
+
+       data = request.json or {}
+       removed = user_service.remove_favorite_routes(user_id, data.get('route_ids', []))
+       return jsonify({"removed": removed})
+
+   @bp.route('/users/<int:user_id>/favorites/stations', methods=['GET'])
+   @jwt_required()
+   def get_favorite_stations(user_id):
+       """Get user's favorite stations"""
+       if not is_current_user(user_id):
+           return jsonify({"error": "Unauthorized access"}), 403
+
+       favorites = user_service.get_user_favorite_stations(user_id)
+       return jsonify([{
+           "id": fav.id,
+           "station_id": fav.station_id,
+           "added_at": fav.added_at.isoformat()
+       } for fav in favorites])
+
+   @bp.route('/users/<int:user_id>/favorites/stations', methods=['POST'])
+   @jwt_required()
+   def add_favorite_stations(user_id):
+       """Add favorite stations ({"station_id": ...} or {"station_ids": [...]})"""
+       if not is_current_user(user_id):
+           return jsonify({"error": "Unauthorized access"}), 403
+
+       data = request.json or {}
+       station_ids = data.get('station_ids') or ([data['station_id']] if 'station_id' in data else [])
+       if not station_ids:
+           return jsonify({"error": "Please provide station_id or station_ids"}), 400
+
+       added, error = user_service.add_favorite_stations(user_id, station_ids)
+       if error:
+           return jsonify({"error": error}), 404
+       return jsonify({"added": [fav.station_id for fav in added]}), 201
+
+   @bp.route('/users/<int:user_id>/favorites/stations', methods=['DELETE'])
+   @jwt_required()
+   def remove_favorite_stations(user_id):
+       """Remove favorite stations ({"station_ids": [...]})"""
+       if not is_current_user(user_id):
+           return jsonify({"error": "Unauthorized access"}), 403
+
+       data = request.json or {}
+       removed = user_service.remove_favorite_stations(user_id, data.get('station_ids', []))
+       return jsonify({"removed": removed})
+
+   @bp.route('/users/<int:user_id>/dashboard')
+   @admission.cost('expensive')
+   @jwt_required()
+   def get_user_dashboard(user_id):
+       """Get live arrivals, alerts and elevator outages for a user's favorites"""
+       # Verify identity
+       if not is_current_user(user_id):
+           return jsonify({"error": "Unauthorized access"}), 403
+
+       dashboard = dashboard_service.get_dashboard(user_id)
+       return jsonify(dashboard)
 
    @bp.route('/station-route-map')
+   @admission.cost('expensive')
    def get_station_route_map():
        """Get mapping between stations and routes"""
-       mapping = data_service.get_station_route_map()
+       agency, error = get_agency()
+       if error:
+           return error
+       mapping = data_service.get_station_route_map(agency)
        if "error" in mapping:
            return jsonify(mapping), 500
        return jsonify(mapping)
 
    @bp.route('/stations/<station_id>/routes')
+   @admission.cost('expensive')
    def get_routes_for_station(station_id):
        """Get all routes serving a specific station"""
-       result = data_service.get_routes_for_station(station_id)
+       agency, error = get_agency()
+       if error:
+           return error
+       result = data_service.get_routes_for_station(station_id, agency)
        if "error" in result:
            error_message = result["error"]
            if error_message == "Station not found":
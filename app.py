@@ -3,13 +3,26 @@ from flask_cors import CORS
 from api import create_routes
 from models import db
 from flask_migrate import Migrate
+from flask_jwt_extended import JWTManager
+from utils.metrics import init_request_metrics
+from utils.upstream import init_request_deadline
+from utils.profiling import profiler
+from utils.admission import admission
+from services.notification_service import notification_service
+from services.feed_refresher import feed_refresher
+from utils.json_provider import FastJSONProvider
 
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
 
-    # 加载配置
+    # 加载配置（config 覆盖 config.py 中的同名项，例如测试用的数据库）
     app.config.from_pyfile('config.py')
+    if config:
+        app.config.update(config)
+
+    # JSON 编码：优先使用 orjson，未安装时回退到标准库
+    app.json = FastJSONProvider(app, backend=app.config.get('JSON_BACKEND', 'auto'))
 
     # 初始化数据库
     db.init_app(app)
@@ -20,9 +33,42 @@ def create_app():
     # 启用CORS
     CORS(app)
 
+    # JWT 认证：用户相关接口使用 @jwt_required()，缺少或无效的令牌返回 401
+    JWTManager(app)
+
+    # 记录请求延迟指标
+    init_request_metrics(app)
+
+    # 上游请求截止时间：每个 API 请求的上游抓取总预算
+    init_request_deadline(app, app.config.get('REQUEST_DEADLINE_SECONDS'))
+
+    # 可选：准入控制，按客户端令牌桶限流，按成本等级限制并发，过载时优先拒绝昂贵请求
+    admission.init_app(app)
+
+    # 请求性能分析与慢请求采样
+    profiler.init_app(app)
+
     # 注册路由
     create_routes(app)
 
+    # 通知匹配：根据用户的 NotificationSetting 推送告警和延误
+    notification_service.init_app(app)
+
+    # 可选：后台按学习到的发布周期刷新实时数据（每个进程在首个请求时启动）
+    feed_refresher.init_app(app)
+
+    # 可选：在 fork 工作进程之前预加载静态数据（车站、线路、车站-线路映射以及每条线路的站点和形状）
+    if app.config.get('PRELOAD_STATIC_DATA'):
+        import gc
+        from services.data_service import DataService
+        errors = DataService().preload_static_data(all_routes=True)
+        for name, error in errors.items():
+            app.logger.warning("Preloading %s failed: %s", name, error)
+
+        # 将预加载的对象移出 GC 跟踪，避免工作进程中的垃圾回收写入共享页面
+        gc.collect()
+        gc.freeze()
+
     return app
 
 
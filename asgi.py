@@ -0,0 +1,15 @@
+"""
+ASGI entry point
+
+    uvicorn asgi:app --workers 4
+
+Feed endpoints (/api/subway/feeds, /api/lirr/feeds, /api/mnr/feeds,
+/api/alerts, /api/accessibility) are served by an async router that awaits
+upstream fetches on a pooled HTTP client; every other route runs the Flask
+app through a WSGI adapter. Requires httpx and asgiref.
+"""
+from app import create_app
+from api.async_routes import create_asgi_app
+
+flask_app = create_app()
+app = create_asgi_app(flask_app)
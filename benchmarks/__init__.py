@@ -0,0 +1 @@
+"""Offline benchmarks and synthetic GTFS-RT data (run with `python -m benchmarks.run`)"""
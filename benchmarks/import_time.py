@@ -0,0 +1,110 @@
+"""
+Import-time budget check
+
+Imports a module (the Flask app by default) in fresh interpreters and fails
+when the median import time exceeds the budget, or when a heavy dependency
+that should only load on first use gets imported eagerly:
+
+    python -m benchmarks.import_time --budget-ms 800
+    python -m benchmarks.import_time --module init_db
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use only; importing the app must not pull them in
+LAZY_MODULES = ['pyproj', 'shapely', 'numpy', 'requests', 'google.protobuf', 'firebase_admin']
+
+# Median time to import the app
+DEFAULT_BUDGET_MS = 800.0
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure_import(module, runs):
+    """
+    Time importing a module in fresh interpreters
+
+    Args:
+        module (str): Module name
+        runs (int): Number of interpreters to start
+
+    Returns:
+        tuple: (list of import times in seconds, set of modules loaded by the import)
+    """
+    timings = []
+    loaded = set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE.format(module=module)], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        loaded.update(result["modules"])
+    return timings, loaded
+
+
+def importtime(module):
+    """
+    Import a module in a fresh interpreter under `python -X importtime`
+
+    Args:
+        module (str): Module name
+
+    Returns:
+        dict: Cumulative import time in microseconds of every module loaded by the import
+    """
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT_DIR,
+                            capture_output=True, text=True, check=True).stderr
+    cumulative = {}
+    for line in stderr.splitlines():
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            cumulative[parts[2].strip()] = int(parts[1])
+    return cumulative
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import-time budget")
+    parser.add_argument('--module', default='app', help="Module to import (default app)")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Median import time budget (default {DEFAULT_BUDGET_MS:.0f})")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters to time (default 5)")
+    args = parser.parse_args(argv)
+
+    timings, loaded = measure_import(args.module, args.runs)
+    median_ms = statistics.median(timings) * 1000
+    eager = [name for name in LAZY_MODULES if name in loaded]
+
+    print(json.dumps({
+        "module": args.module,
+        "median_ms": round(median_ms, 1),
+        "min_ms": round(min(timings) * 1000, 1),
+        "budget_ms": args.budget_ms,
+        "eager_heavy_modules": eager
+    }, indent=2))
+
+    failed = False
+    if median_ms > args.budget_ms:
+        print(f"OVER BUDGET: import {args.module} took {median_ms:.1f}ms (budget {args.budget_ms:.0f}ms)",
+              file=sys.stderr)
+        failed = True
+    for name in eager:
+        print(f"EAGER IMPORT: {name} is loaded by import {args.module}", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
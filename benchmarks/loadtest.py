@@ -0,0 +1,176 @@
+"""
+Load driver for the API
+
+Replays a weighted mix of endpoint requests from concurrent clients against a
+running instance and reports throughput and tail latency. Run the app against
+the MTA stand-in (benchmarks/mta_standin.py) so no load reaches the real API:
+
+    python -m benchmarks.loadtest --target http://127.0.0.1:5000 --concurrency 32 --duration 60
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+
+# (weight, path template); {subway}, {route}, {station} etc. are drawn per request
+DEFAULT_MIX = [
+    (2, '/api/health'),
+    (8, '/api/routes'),
+    (8, '/api/stations'),
+    (25, '/api/subway/feeds/{subway}'),
+    (3, '/api/lirr/feeds/lirr'),
+    (3, '/api/mnr/feeds/mnr'),
+    (10, '/api/routes/{route}/stops'),
+    (5, '/api/routes/{route}/shape'),
+    (12, '/api/alerts/active?route_id={route}'),
+    (4, '/api/alerts/subway_alerts'),
+    (6, '/api/accessibility/station/{station}'),
+    (2, '/api/accessibility/stations/outages'),
+    (6, '/api/stations/{station}/routes'),
+    (3, '/api/line/{route}'),
+    (1, '/api/station-route-map')
+]
+
+SUBWAY_FEED_IDS = ['ace', 'bdfm', 'g', 'jz', 'nqrw', 'l', 'num_s', 'sir']
+ROUTE_IDS = ['1', '2', '3', '4', '5', '6', '7', 'A', 'C', 'E', 'B', 'D', 'F', 'M', 'G', 'J', 'Z', 'L',
+             'N', 'Q', 'R', 'W']
+STATION_IDS = ['127', '631', 'A27', 'R16', 'D14', 'L08', '725', 'A32', 'R20', '635']
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"count": 0}
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2)
+    }
+
+
+class LoadTest:
+    """
+    Closed-loop load test: each client issues its next request when the previous one completes
+    """
+
+    def __init__(self, target, mix, concurrency, duration, timeout, rate=None, seed=0):
+        self.target = target.rstrip('/')
+        self.paths = [path for _, path in mix]
+        self.weights = [weight for weight, _ in mix]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.timeout = timeout
+        self.rate = rate  # Requests per second per client, None for as fast as possible
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.latencies = {}  # Path template -> list of seconds
+        self.statuses = {}
+        self.errors = {}
+
+    def _render(self, rng, template):
+        return template.format(subway=rng.choice(SUBWAY_FEED_IDS), route=rng.choice(ROUTE_IDS),
+                               station=rng.choice(STATION_IDS))
+
+    def _client(self, index, deadline):
+        import requests
+
+        rng = random.Random(self.seed + index)
+        session = requests.Session()
+        latencies = {}
+        statuses = {}
+        errors = {}
+
+        while time.monotonic() < deadline:
+            template = rng.choices(self.paths, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                response = session.get(self.target + self._render(rng, template), timeout=self.timeout)
+                response.content
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            except requests.RequestException as e:
+                name = type(e).__name__
+                errors[name] = errors.get(name, 0) + 1
+            elapsed = time.perf_counter() - start
+            latencies.setdefault(template, []).append(elapsed)
+
+            if self.rate:
+                time.sleep(max(0.0, 1 / self.rate - elapsed))
+
+        with self.lock:
+            for template, values in latencies.items():
+                self.latencies.setdefault(template, []).extend(values)
+            for status, count in statuses.items():
+                self.statuses[status] = self.statuses.get(status, 0) + count
+            for name, count in errors.items():
+                self.errors[name] = self.errors.get(name, 0) + count
+
+    def run(self):
+        """
+        Run the load test
+
+        Returns:
+            dict: Throughput and latency report
+        """
+        start = time.monotonic()
+        deadline = start + self.duration
+        clients = [threading.Thread(target=self._client, args=(index, deadline), daemon=True)
+                   for index in range(self.concurrency)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - start
+
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        return {
+            "target": self.target,
+            "concurrency": self.concurrency,
+            "duration_s": round(elapsed, 2),
+            "requests": len(all_latencies),
+            "throughput_rps": round(len(all_latencies) / elapsed, 2) if elapsed else None,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "errors": self.errors,
+            "latency": summarize(all_latencies),
+            "endpoints": {template: summarize(values) for template, values in sorted(self.latencies.items())}
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a realistic endpoint mix against the API")
+    parser.add_argument('--target', default='http://127.0.0.1:5000', help="Base URL of the API")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients (default 16)")
+    parser.add_argument('--duration', type=float, default=30.0, help="Test duration in seconds (default 30)")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument('--rate', type=float, help="Requests per second per client (default: unthrottled)")
+    parser.add_argument('--mix', help="JSON file of [weight, path] pairs replacing the default mix")
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    mix = DEFAULT_MIX
+    if args.mix:
+        with open(args.mix, 'r', encoding='utf-8') as f:
+            mix = [tuple(pair) for pair in json.load(f)]
+
+    report = LoadTest(args.target, mix, args.concurrency, args.duration, args.timeout, args.rate).run()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0 if report["requests"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Local stand-in for the MTA feed API
+
+Serves recorded or synthetic GTFS-RT protobuf and accessibility JSON payloads
+at the same paths as the feed URLs in config.py, with configurable latency,
+error rate and update cadence. Point the app at it with MTA_FEED_BASE_URL:
+
+    python -m benchmarks.mta_standin serve --port 8765 --latency-ms 80 --cadence 30
+    MTA_FEED_BASE_URL=http://127.0.0.1:8765 python app.py
+
+Recordings are captured from the real API with:
+
+    python -m benchmarks.mta_standin record --output recordings/
+
+and served with `serve --recordings recordings/`. A feed can have a single
+recording (<feed_id>.pb / <feed_id>.json) or a directory of them
+(<feed_id>/*.pb), which are replayed in order, one per cadence period.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configured_feeds():
+    """
+    Get every configured feed
+
+    Returns:
+        dict: Feed ID -> (URL path, is_json)
+    """
+    from config import SUBWAY_FEEDS, LIRR_FEEDS, MNR_FEEDS, SERVICE_ALERT_FEEDS, ELEVATOR_ESCALATOR_FEEDS
+
+    feeds = {}
+    for group in (SUBWAY_FEEDS, LIRR_FEEDS, MNR_FEEDS, SERVICE_ALERT_FEEDS):
+        for feed_id, url in group.items():
+            feeds[feed_id] = (urlsplit(url.strip()).path, False)
+    for data_type, url in ELEVATOR_ESCALATOR_FEEDS.items():
+        feeds[data_type] = (urlsplit(url.strip()).path, True)
+    return feeds
+
+
+class FeedSource:
+    """
+    Payloads for one feed, advancing one snapshot per cadence period
+    """
+
+    def __init__(self, feed_id, is_json, cadence, recordings=None):
+        self.feed_id = feed_id
+        self.is_json = is_json
+        self.cadence = cadence
+        self.recordings = recordings or []
+        self.lock = threading.Lock()
+        self.generation = None
+        self.payload = None
+
+    def _build(self, generation):
+        if self.recordings:
+            path = self.recordings[generation % len(self.recordings)]
+            with open(path, 'rb') as f:
+                return f.read()
+
+        from benchmarks.synthetic_feed import generate_feed_bytes, generate_accessibility_payloads
+
+        seed = zlib.crc32(f"{self.feed_id}:{generation}".encode())
+        if self.is_json:
+            return json.dumps(generate_accessibility_payloads(seed=seed)[self.feed_id]).encode()
+        if 'alerts' in self.feed_id:
+            return generate_feed_bytes(trips=0, vehicles=0, alerts=300, seed=seed, timestamp=int(time.time()))
+        return generate_feed_bytes(trips=300, stop_time_updates=20, seed=seed, timestamp=int(time.time()))
+
+    def get(self):
+        """
+        Get the current snapshot
+
+        Returns:
+            bytes: Payload
+        """
+        generation = int(time.time() // self.cadence) if self.cadence else 0
+        with self.lock:
+            if generation != self.generation:
+                self.payload = self._build(generation)
+                self.generation = generation
+            return self.payload
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, sources, latency_ms=0, jitter_ms=0, error_rate=0.0, hang_rate=0.0,
+                 hang_seconds=30.0):
+        super().__init__(address, StandInHandler)
+        self.sources = sources  # URL path -> FeedSource
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "hangs": 0, "not_found": 0}
+
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        server.count("requests")
+
+        path = urlsplit(self.path).path
+        if path == '/_stats':
+            with server.stats_lock:
+                body = json.dumps(server.stats).encode()
+            return self._send(200, body, 'application/json')
+
+        source = server.sources.get(path)
+        if source is None:
+            server.count("not_found")
+            return self._send(404, b'Not found', 'text/plain')
+
+        delay = server.latency_ms + random.uniform(-server.jitter_ms, server.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        roll = random.random()
+        if roll < server.hang_rate:
+            server.count("hangs")
+            time.sleep(server.hang_seconds)
+        elif roll < server.hang_rate + server.error_rate:
+            server.count("errors")
+            return self._send(503, b'Service Unavailable', 'text/plain')
+
+        payload = source.get()
+        self._send(200, payload, 'application/json' if source.is_json else 'application/x-protobuf')
+
+
+def load_recordings(directory, feed_id, is_json):
+    extension = 'json' if is_json else 'pb'
+    single = os.path.join(directory, f"{feed_id}.{extension}")
+    if os.path.exists(single):
+        return [single]
+    return sorted(glob.glob(os.path.join(directory, feed_id, f"*.{extension}")))
+
+
+def serve(args):
+    sources = {}
+    for feed_id, (path, is_json) in configured_feeds().items():
+        recordings = load_recordings(args.recordings, feed_id, is_json) if args.recordings else None
+        sources[path] = FeedSource(feed_id, is_json, args.cadence, recordings)
+
+    server = StandInServer((args.host, args.port), sources, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           error_rate=args.error_rate, hang_rate=args.hang_rate, hang_seconds=args.hang_seconds)
+    print(f"MTA stand-in serving {len(sources)} feeds on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def record(args):
+    import requests
+    from config import SUBWAY_FEEDS, LIRR_FEEDS, MNR_FEEDS, SERVICE_ALERT_FEEDS, ELEVATOR_ESCALATOR_FEEDS
+
+    urls = {}
+    for group in (SUBWAY_FEEDS, LIRR_FEEDS, MNR_FEEDS, SERVICE_ALERT_FEEDS, ELEVATOR_ESCALATOR_FEEDS):
+        urls.update(group)
+
+    stamp = time.strftime('%Y%m%dT%H%M%S')
+    for feed_id, (_, is_json) in configured_feeds().items():
+        response = requests.get(urls[feed_id].strip(), timeout=30)
+        if response.status_code != 200:
+            print(f"{feed_id}: HTTP {response.status_code}, skipped", file=sys.stderr)
+            continue
+
+        directory = os.path.join(args.output, feed_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{stamp}.{'json' if is_json else 'pb'}")
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        print(f"{feed_id}: {len(response.content)} bytes -> {path}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the MTA feed API")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help="Serve recorded or synthetic feeds")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--recordings', help="Directory of recorded payloads (default: synthetic)")
+    serve_parser.add_argument('--cadence', type=float, default=30.0,
+                              help="Seconds between feed snapshots (default 30, 0 = never change)")
+    serve_parser.add_argument('--latency-ms', type=float, default=0.0, help="Added response latency")
+    serve_parser.add_argument('--jitter-ms', type=float, default=0.0, help="Uniform jitter around the latency")
+    serve_parser.add_argument('--error-rate', type=float, default=0.0, help="Share of 503 responses")
+    serve_parser.add_argument('--hang-rate', type=float, default=0.0, help="Share of requests that hang")
+    serve_parser.add_argument('--hang-seconds', type=float, default=30.0, help="How long hanging requests hang")
+
+    record_parser = commands.add_parser('record', help="Record one snapshot of every feed from the MTA")
+    record_parser.add_argument('--output', required=True, help="Recordings directory")
+
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, ROOT_DIR)
+    if args.command == 'serve':
+        serve(args)
+    else:
+        record(args)
+
+
+if __name__ == '__main__':
+    main()
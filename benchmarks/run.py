@@ -0,0 +1,294 @@
+"""
+Offline benchmark runner
+
+Times the GTFS-RT parser on synthetic feeds, JSON encoding of parsed feeds
+with each available backend, every static GTFS loader on a cold cache, and
+key API endpoints through the Flask test client with upstream
+fetches served from synthetic payloads. Results are written as JSON and can be
+compared against a previous run:
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --baseline bench.json --threshold 1.25
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Synthetic feed sizes: (trips, stop_time_updates per trip, alerts)
+FEED_SIZES = {
+    'small': (50, 10, 0),
+    'medium': (300, 20, 0),
+    'large': (1000, 40, 0),
+    'alerts': (0, 0, 500)
+}
+
+# Endpoints timed through the Flask test client
+ENDPOINTS = [
+    '/api/health',
+    '/api/routes',
+    '/api/stations',
+    '/api/routes/A/stops',
+    '/api/routes/A/shape',
+    '/api/stations/A27/routes',
+    '/api/subway/feeds/ace',
+    '/api/subway/feeds/num_s',
+    '/api/lirr/feeds/lirr',
+    '/api/alerts/all_alerts',
+    '/api/alerts/active?route_id=A',
+    '/api/accessibility/station/A27',
+    '/api/accessibility/stations/outages',
+    '/api/metrics'
+]
+
+
+class FakeResponse:
+    """Stand-in for requests.Response carrying a synthetic payload"""
+
+    def __init__(self, content=b'', payload=None, status_code=200):
+        self.content = content if payload is None else json.dumps(payload).encode()
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+
+def build_upstream_payloads():
+    """
+    Build a synthetic payload for every configured feed URL
+
+    Returns:
+        dict: Feed ID -> FakeResponse
+    """
+    from config import SUBWAY_FEEDS, LIRR_FEEDS, MNR_FEEDS, SERVICE_ALERT_FEEDS
+    from benchmarks.synthetic_feed import generate_feed_bytes, generate_accessibility_payloads
+
+    responses = {}
+    for seed, feed_id in enumerate(list(SUBWAY_FEEDS) + list(LIRR_FEEDS) + list(MNR_FEEDS)):
+        responses[feed_id] = FakeResponse(generate_feed_bytes(trips=300, stop_time_updates=20, seed=seed))
+    for seed, feed_id in enumerate(SERVICE_ALERT_FEEDS):
+        responses[feed_id] = FakeResponse(generate_feed_bytes(trips=0, vehicles=0, alerts=300, seed=seed))
+    for data_type, payload in generate_accessibility_payloads().items():
+        responses[data_type] = FakeResponse(payload=payload)
+
+    return responses
+
+
+def measure(function, repeat, setup=None):
+    """
+    Time a function
+
+    Args:
+        function (callable): Code under test
+        repeat (int): Number of timed runs
+        setup (callable): Called before each run, untimed
+
+    Returns:
+        dict: Timing summary in milliseconds
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    summary = {
+        "runs": repeat,
+        "min_ms": round(timings[0], 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4)
+    }
+    if isinstance(result, dict) and "error" in result:
+        summary["error"] = result["error"]
+    elif hasattr(result, 'status_code'):
+        summary["status"] = result.status_code
+    return summary
+
+
+def bench_parser(repeat):
+    from benchmarks.synthetic_feed import generate_feed_bytes
+    from services.data_service import DataService
+
+    data_service = DataService()
+    results = {}
+    for size, (trips, stop_time_updates, alerts) in FEED_SIZES.items():
+        content = generate_feed_bytes(trips=trips, stop_time_updates=stop_time_updates, alerts=alerts)
+        summary = measure(lambda: data_service.parse_gtfs_rt(content, size), repeat)
+        summary["bytes"] = len(content)
+        results[f"parser.parse_gtfs_rt.{size}"] = summary
+
+        if alerts:
+            continue
+        snapshot = data_service.parse_gtfs_rt_columnar(content, size)
+        summary = measure(lambda: data_service.parse_gtfs_rt_columnar(content, size), repeat)
+        summary["snapshot_bytes"] = snapshot.nbytes
+        results[f"parser.parse_gtfs_rt_columnar.{size}"] = summary
+        results[f"parser.columnar_to_dict.{size}"] = measure(snapshot.to_dict, repeat)
+    return results
+
+
+def bench_json(repeat):
+    from flask import Flask
+    from benchmarks.synthetic_feed import generate_feed_bytes
+    from services.data_service import DataService
+    from utils.json_provider import FastJSONProvider, orjson
+
+    data_service = DataService()
+    documents = {'stations': data_service.get_stations()}
+    for size, (trips, stop_time_updates, alerts) in FEED_SIZES.items():
+        content = generate_feed_bytes(trips=trips, stop_time_updates=stop_time_updates, alerts=alerts)
+        documents[size] = data_service.parse_gtfs_rt(content, size)
+
+    backends = ['stdlib'] + (['orjson'] if orjson is not None else [])
+    results = {}
+    for backend in backends:
+        provider = FastJSONProvider(Flask(__name__), backend=backend)
+        for name, document in documents.items():
+            summary = measure(lambda: provider.encode(document), repeat)
+            summary["bytes"] = len(provider.encode(document))
+            results[f"json.{backend}.{name}"] = summary
+            results[f"json.{backend}.pretty.{name}"] = measure(lambda: provider.encode(document, pretty=True), repeat)
+    return results
+
+
+def bench_static_loaders(repeat):
+    from services.data_service import DataService
+    from utils.cache import cache
+
+    data_service = DataService()
+    loaders = {
+        'get_stations': data_service.get_stations,
+        'get_routes': data_service.get_routes,
+        'get_line_shape': lambda: data_service.get_line_shape('A'),
+        'get_line': lambda: data_service.get_line('A'),
+        'get_stops_for_route': lambda: data_service.get_stops_for_route('A'),
+        'get_station_route_map': data_service.get_station_route_map,
+        'get_routes_for_station': lambda: data_service.get_routes_for_station('A27')
+    }
+    return {f"static.{name}": measure(loader, repeat, setup=cache.clear) for name, loader in loaders.items()}
+
+
+def bench_endpoints(repeat):
+    from app import create_app
+    from services.data_service import DataService
+    from utils.cache import cache
+
+    responses = build_upstream_payloads()
+
+    def fake_fetch(self, feed_id, url, *args, **kwargs):
+        return responses[feed_id]
+
+    app = create_app()
+    client = app.test_client()
+    results = {}
+    with mock.patch.object(DataService, '_fetch', fake_fetch):
+        for path in ENDPOINTS:
+            def request():
+                response = client.get(path)
+                response.get_data()
+                return response
+
+            cache.clear()
+            results[f"endpoint.cold.{path}"] = measure(request, 1)
+            results[f"endpoint.warm.{path}"] = measure(request, repeat)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare median timings against a baseline run
+
+    Args:
+        results (dict): Current results
+        baseline (dict): Baseline results
+        threshold (float): Ratio above which a benchmark counts as a regression
+
+    Returns:
+        list: Regressions as (name, baseline_ms, current_ms, ratio)
+    """
+    regressions = []
+    for name, summary in sorted(results.items()):
+        previous = baseline.get(name)
+        if not previous or not previous.get("median_ms"):
+            continue
+        ratio = summary["median_ms"] / previous["median_ms"]
+        summary["baseline_median_ms"] = previous["median_ms"]
+        summary["ratio"] = round(ratio, 3)
+        if ratio > threshold:
+            regressions.append((name, previous["median_ms"], summary["median_ms"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run offline benchmarks")
+    parser.add_argument('--output', help="Write JSON results to this file")
+    parser.add_argument('--baseline', help="Compare against a previous JSON results file")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Median slowdown ratio that counts as a regression (default 1.25)")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed runs per benchmark (default 20)")
+    parser.add_argument('--only', choices=('parser', 'json', 'static', 'endpoints'), action='append',
+                        help="Run only these groups (repeatable)")
+    args = parser.parse_args(argv)
+
+    # DataService reads static GTFS relative to the project root
+    os.chdir(ROOT_DIR)
+    sys.path.insert(0, ROOT_DIR)
+
+    groups = {'parser': bench_parser, 'json': bench_json, 'static': bench_static_loaders, 'endpoints': bench_endpoints}
+    results = {}
+    for name, bench in groups.items():
+        if not args.only or name in args.only:
+            results.update(bench(args.repeat))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat
+        },
+        "results": results
+    }
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    for name, previous, current, ratio in regressions:
+        print(f"REGRESSION {name}: {previous:.3f}ms -> {current:.3f}ms ({ratio:.2f}x)", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Synthetic GTFS-RT feed generator
+
+Builds realistic-looking NYCT FeedMessage protobufs (trip updates with
+stop_time_updates, vehicle positions and service alerts) without network
+access. Route and stop IDs come from the static GTFS in data/gtfs_subway when
+it is available, so the synthetic feeds join against the static data.
+"""
+import csv
+import os
+import random
+import time
+from google.transit import gtfs_realtime_pb2
+
+STATIC_DIR = os.path.join('data', 'gtfs_subway')
+
+# Fallbacks when the static GTFS is not available
+DEFAULT_ROUTE_IDS = ['1', '2', '3', '4', '5', '6', '7', 'A', 'C', 'E', 'B', 'D', 'F', 'M', 'G', 'J', 'Z',
+                     'L', 'N', 'Q', 'R', 'W', 'GS', 'SI']
+DEFAULT_STATION_IDS = [f"{line}{number:02d}" for line in 'ABDFGLMNR' for number in range(1, 41)]
+
+
+def load_static_ids(static_dir=STATIC_DIR):
+    """
+    Load route IDs and parent station IDs from a static GTFS directory
+
+    Args:
+        static_dir (str): Static GTFS directory
+
+    Returns:
+        tuple: (route_ids, station_ids)
+    """
+    try:
+        with open(os.path.join(static_dir, 'routes.txt'), 'r', encoding='utf-8') as f:
+            route_ids = [row['route_id'] for row in csv.DictReader(f)]
+        with open(os.path.join(static_dir, 'stops.txt'), 'r', encoding='utf-8') as f:
+            station_ids = [row['stop_id'] for row in csv.DictReader(f) if row.get('location_type') == '1']
+    except OSError:
+        return DEFAULT_ROUTE_IDS, DEFAULT_STATION_IDS
+
+    return route_ids or DEFAULT_ROUTE_IDS, station_ids or DEFAULT_STATION_IDS
+
+
+def generate_feed(trips=300, stop_time_updates=20, vehicles=None, alerts=0, timestamp=None, seed=0,
+                  route_ids=None, station_ids=None):
+    """
+    Generate a synthetic GTFS-RT FeedMessage
+
+    Args:
+        trips (int): Number of trip_update entities
+        stop_time_updates (int): Stop time updates per trip
+        vehicles (int): Number of vehicle entities (defaults to one per trip)
+        alerts (int): Number of alert entities
+        timestamp (int): Header timestamp (defaults to now)
+        seed (int): Random seed, so runs are reproducible
+        route_ids (list): Route IDs to draw from
+        station_ids (list): Parent station IDs to draw from
+
+    Returns:
+        FeedMessage: Synthetic feed
+    """
+    rng = random.Random(seed)
+    if route_ids is None or station_ids is None:
+        static_routes, static_stations = load_static_ids()
+        route_ids = route_ids or static_routes
+        station_ids = station_ids or static_stations
+    if vehicles is None:
+        vehicles = trips
+    if timestamp is None:
+        timestamp = int(time.time())
+
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = '1.0'
+    feed.header.incrementality = gtfs_realtime_pb2.FeedHeader.FULL_DATASET
+    feed.header.timestamp = timestamp
+
+    trip_descriptors = []
+    for index in range(trips):
+        route_id = rng.choice(route_ids)
+        direction = rng.choice('NS')
+        start_minutes = rng.randrange(0, 24 * 60 * 100)
+        trip_id = f"{start_minutes:06d}_{route_id}..{direction}{rng.randrange(1, 99):02d}R"
+        trip_descriptors.append((trip_id, route_id, direction))
+
+        entity = feed.entity.add()
+        entity.id = f"{index + 1:06d}"
+        trip_update = entity.trip_update
+        trip_update.trip.trip_id = trip_id
+        trip_update.trip.route_id = route_id
+        trip_update.trip.start_date = time.strftime('%Y%m%d', time.localtime(timestamp))
+        trip_update.timestamp = timestamp - rng.randrange(0, 60)
+
+        first_stop = rng.randrange(0, max(1, len(station_ids) - stop_time_updates))
+        arrival = timestamp + rng.randrange(0, 300)
+        for offset in range(stop_time_updates):
+            stop_time = trip_update.stop_time_update.add()
+            stop_time.stop_id = station_ids[(first_stop + offset) % len(station_ids)] + direction
+            stop_time.arrival.time = arrival
+            stop_time.departure.time = arrival + rng.choice((0, 15, 30))
+            if rng.random() < 0.2:
+                stop_time.arrival.delay = rng.randrange(-60, 600)
+            arrival = stop_time.departure.time + rng.randrange(60, 180)
+
+    for index in range(vehicles):
+        trip_id, route_id, direction = trip_descriptors[index % len(trip_descriptors)] if trip_descriptors else (
+            f"vehicle_{index}", rng.choice(route_ids), rng.choice('NS'))
+
+        entity = feed.entity.add()
+        entity.id = f"{trips + index + 1:06d}"
+        vehicle = entity.vehicle
+        vehicle.trip.trip_id = trip_id
+        vehicle.trip.route_id = route_id
+        vehicle.timestamp = timestamp - rng.randrange(0, 60)
+        vehicle.current_status = rng.choice((0, 1, 2))
+        vehicle.stop_id = rng.choice(station_ids) + direction
+        vehicle.current_stop_sequence = rng.randrange(1, 40)
+
+    for index in range(alerts):
+        entity = feed.entity.add()
+        entity.id = f"alert:{index + 1}"
+        alert = entity.alert
+
+        start = timestamp - rng.randrange(0, 7 * 86400)
+        for _ in range(rng.randrange(1, 4)):
+            period = alert.active_period.add()
+            period.start = start
+            period.end = start + rng.randrange(3600, 3 * 86400)
+            start = period.end + rng.randrange(3600, 86400)
+
+        for _ in range(rng.randrange(1, 4)):
+            informed = alert.informed_entity.add()
+            informed.agency_id = 'MTASBWY'
+            if rng.random() < 0.7:
+                informed.route_id = rng.choice(route_ids)
+            else:
+                informed.stop_id = rng.choice(station_ids)
+
+        alert.cause = rng.choice((1, 2, 3, 6, 9))
+        alert.effect = rng.choice((1, 2, 3, 4, 6))
+        alert.header_text.translation.add(text=f"Synthetic alert {index + 1}", language='en')
+        alert.description_text.translation.add(
+            text="Trains are running with delays while crews address a synthetic condition.", language='en')
+
+    return feed
+
+
+def generate_feed_bytes(**kwargs):
+    """
+    Generate a serialized synthetic GTFS-RT feed
+
+    Args:
+        **kwargs: Arguments for generate_feed
+
+    Returns:
+        bytes: Serialized FeedMessage
+    """
+    return generate_feed(**kwargs).SerializeToString()
+
+
+def generate_accessibility_payloads(equipment=600, outage_ratio=0.1, upcoming_ratio=0.05, seed=0, station_ids=None):
+    """
+    Generate synthetic ELEVATOR_ESCALATOR_FEEDS payloads
+
+    Args:
+        equipment (int): Number of elevators/escalators
+        outage_ratio (float): Share of equipment currently out of service
+        upcoming_ratio (float): Share of equipment with a planned outage
+        seed (int): Random seed
+        station_ids (list): Parent station IDs to draw from
+
+    Returns:
+        dict: Payloads keyed by data type ('equipment', 'current', 'upcoming')
+    """
+    rng = random.Random(seed)
+    if station_ids is None:
+        station_ids = load_static_ids()[1]
+
+    equipment_records = []
+    current = []
+    upcoming = []
+    for index in range(equipment):
+        station_id = rng.choice(station_ids)
+        equipment_type = rng.choice(('EL', 'ES'))
+        equipment_id = f"{equipment_type}{index:03d}"
+        equipment_records.append({
+            "station": f"Station {station_id}",
+            "equipmentno": equipment_id,
+            "equipmenttype": equipment_type,
+            "serving": "Street to mezzanine",
+            "ADA": "Y" if equipment_type == 'EL' else "N",
+            "isactive": "Y",
+            "elevatorsgtfsstopid": station_id,
+            "stationcomplexid": str(rng.randrange(1, 450))
+        })
+
+        outage = {
+            "station": f"Station {station_id}",
+            "equipment": equipment_id,
+            "equipmenttype": equipment_type,
+            "outagedate": "01/01/2025 12:00:00 AM",
+            "estimatedreturntoservice": "01/02/2025 11:00:00 PM",
+            "reason": "Repair",
+            "ismaintenanceoutage": "N"
+        }
+        if rng.random() < outage_ratio:
+            current.append(dict(outage, isupcomingoutage="N"))
+        if rng.random() < upcoming_ratio:
+            upcoming.append(dict(outage, isupcomingoutage="Y"))
+
+    return {"equipment": equipment_records, "current": current, "upcoming": upcoming}
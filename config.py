@@ -1,9 +1,20 @@
 """Application configuration"""
+import os
 
 # Database configuration
 SQLALCHEMY_DATABASE_URI = 'sqlite:///nyc_transit.db'  # Use SQLite for development
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# Applied to every SQLite connection: WAL lets readers run while a write is in progress
+SQLITE_PRAGMAS = {
+   'journal_mode': 'WAL',
+   'synchronous': 'NORMAL',     # Safe with WAL; fsync at checkpoints only
+   'busy_timeout': 5000,        # Wait up to 5s for a competing writer instead of failing
+   'foreign_keys': 'ON',
+   'cache_size': -16000,        # 16 MiB page cache
+   'temp_store': 'MEMORY'
+}
+
 # If password protection is needed, add a secret key
 SECRET_KEY = 'your-secret-key-here'  # Use environment variables in production
 
@@ -21,6 +32,19 @@ SUBWAY_FEEDS = {
    'sir': 'https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-si'
 }
 
+# Subway route ID -> SUBWAY_FEEDS key of the feed carrying its trips
+SUBWAY_ROUTE_FEEDS = {
+   'A': 'ace', 'C': 'ace', 'E': 'ace', 'H': 'ace', 'FS': 'ace',
+   'B': 'bdfm', 'D': 'bdfm', 'F': 'bdfm', 'FX': 'bdfm', 'M': 'bdfm',
+   'G': 'g',
+   'J': 'jz', 'Z': 'jz',
+   'N': 'nqrw', 'Q': 'nqrw', 'R': 'nqrw', 'W': 'nqrw',
+   'L': 'l',
+   '1': 'num_s', '2': 'num_s', '3': 'num_s', '4': 'num_s', '5': 'num_s', '5X': 'num_s',
+   '6': 'num_s', '6X': 'num_s', '7': 'num_s', '7X': 'num_s', 'GS': 'num_s',
+   'SI': 'sir'
+}
+
 LIRR_FEEDS = {
    'lirr': ' https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/lirr%2Fgtfs-lirr'
 }
@@ -63,4 +87,124 @@ CACHE_TIMEOUT = {
    'routes_default': 86400,      # Route data: 24 hours
    'lines_default': 86400,       # Line shape data: 24 hours
    'route_stops_default': 86400, # Route stop data: 24 hours
-}
\ No newline at end of file
+   'archive_default': 3600,      # Decoded archived snapshots: 1 hour
+   'analytics_default': 300,     # Headway/delay aggregates: 5 minutes
+}
+
+# Batch API settings
+BATCH_MAX_REQUESTS = 50   # Maximum sub-requests per /api/batch call
+BATCH_MAX_WORKERS = 8     # Sub-requests dispatched concurrently
+
+# Profiling settings
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')  # Enables ?_profile=<token> / X-Profile header; unset disables
+SLOW_REQUEST_THRESHOLD = 1.0     # Requests slower than this (seconds) are sampled
+SLOW_REQUEST_BUFFER_SIZE = 100   # Slow requests kept for /api/admin/slow-requests
+PROFILING_SAMPLE_INTERVAL = float(os.environ.get('PROFILING_SAMPLE_INTERVAL', 0))  # Stack sampling interval in seconds, e.g. 0.05 (0 disables sampling)
+
+# Learned feed cadence: (min, max) seconds between fetches per category. Each feed's publish
+# interval is learned from its header timestamps and cached data expires when the next publish
+# is expected; until then CACHE_TIMEOUT applies
+FEED_CADENCE_BOUNDS = {
+   'subway': (10, 60),
+   'lirr': (15, 120),
+   'mnr': (15, 120),
+   'alerts': (30, 300)
+}
+FEED_CADENCE_SAMPLES = 8              # Recent publish intervals the estimate is the median of
+FEED_CADENCE_PROBE_EVERY = 8          # Every this many publishes, fetch after half the interval to detect faster publishing
+# Background refresher fetching each feed just after its expected publish (one per process)
+FEED_REFRESHER_ENABLED = os.environ.get('FEED_REFRESHER_ENABLED', '0') == '1'
+FEED_REFRESHER_WORKERS = 4            # Feeds fetched concurrently
+
+# Merged realtime trip view across subway, LIRR and MNR feeds
+REALTIME_VIEW_MAX_AGE_SECONDS = 600   # Skip trips from feed snapshots older than this
+
+# Upstream fetches: (connect, read) timeouts in seconds, looked up like CACHE_TIMEOUT
+UPSTREAM_TIMEOUTS = {
+   'default': (3.05, 5),
+   'accessibility_default': (3.05, 20),   # Accessibility JSON is large and slow to generate
+   'equipment': (3.05, 30)
+}
+UPSTREAM_RETRIES = 2                    # Retries of connection errors, timeouts, 429 and 5xx
+UPSTREAM_BACKOFF_BASE = 0.2             # Seconds; full-jitter backoff ceiling doubles per retry
+UPSTREAM_BACKOFF_MAX = 2.0              # Largest backoff ceiling
+UPSTREAM_BREAKER_FAILURES = 5           # Consecutive failed fetches that open a feed's circuit breaker
+UPSTREAM_BREAKER_RESET_SECONDS = 30     # Open breakers let one probe fetch through after this long
+UPSTREAM_STALE_MAX_SECONDS = 900        # Serve the last good data this old while a feed is failing
+REQUEST_DEADLINE_SECONDS = 10           # Upstream time budget of one API request (0 disables)
+ACCESSIBILITY_DEADLINE_SECONDS = 40     # Budget of accessibility requests, above the 'equipment' read timeout
+
+# Upstream override: serve every feed URL's path from this base instead of the MTA
+# (e.g. 'http://127.0.0.1:8765' for the stand-in server in benchmarks/mta_standin.py)
+MTA_FEED_BASE_URL = os.environ.get('MTA_FEED_BASE_URL')
+
+# Realtime snapshot archive (raw GTFS-RT payloads, queried with ?at=<timestamp>)
+ARCHIVE_ENABLED = os.environ.get('ARCHIVE_ENABLED', '0') == '1'
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', 'archive')
+ARCHIVE_RETENTION_SECONDS = 7 * 86400          # Keep one week of snapshots
+ARCHIVE_MAX_BYTES_PER_FEED = 512 * 1024 ** 2   # Size budget per feed
+ARCHIVE_SEGMENT_SECONDS = 3600                 # One segment file per hour
+
+# Headway analytics over archived snapshots
+ANALYTICS_MAX_WINDOW_SECONDS = 7 * 86400    # Longest from/to range per request
+ANALYTICS_BUNCHING_RATIO = 0.25             # Headway below this share of the stop's median counts as bunching
+ANALYTICS_OPEN_END_STEP = 60                # Ranges without ?to= end on a multiple of this many seconds (one cache entry per step)
+ANALYTICS_ROLLUP_SECONDS = 300              # Bucket size of the headway rollups kept next to archive segments
+
+# Preload static GTFS data when the app is created, then gc.freeze() it (wsgi.py always sets this)
+PRELOAD_STATIC_DATA = os.environ.get('PRELOAD_STATIC_DATA', '0') == '1'
+
+# ASGI serving mode (asgi.py): pooled async upstream client and parse executor
+ASYNC_MAX_CONNECTIONS = 100            # Upstream connection pool size
+ASYNC_MAX_KEEPALIVE_CONNECTIONS = 20   # Idle connections kept open
+ASYNC_UPSTREAM_TIMEOUT = 30            # Client default; feed fetches use UPSTREAM_TIMEOUTS
+ASYNC_EXECUTOR_WORKERS = 4             # Threads parsing and encoding feeds off the event loop
+
+# Process pool for parsing large realtime feeds outside the GIL
+# Each gunicorn worker starts its own pool: workers * PARSE_POOL_WORKERS extra processes
+PARSE_POOL_WORKERS = int(os.environ.get('PARSE_POOL_WORKERS', 0))   # 0 parses everything in-process
+PARSE_POOL_MIN_BYTES = 256 * 1024                                  # Smaller payloads are parsed in-process
+
+# Personalized dashboard (/api/users/<user_id>/dashboard)
+DASHBOARD_BUDGET_SECONDS = 2.0        # Wait this long for live data, then report missing sources
+DASHBOARD_ARRIVALS_PER_STATION = 6    # Upcoming arrivals listed per favorite station
+DASHBOARD_WORKERS = 8                 # Threads fetching feeds and indexes in parallel
+
+# Notification matching against users' NotificationSetting rows
+NOTIFICATIONS_ENABLED = os.environ.get('NOTIFICATIONS_ENABLED', '0') == '1'
+NOTIFICATION_SINK = os.environ.get('NOTIFICATION_SINK', 'log')   # 'log', 'memory' or 'module:Class'
+NOTIFICATION_DELAY_THRESHOLD = 300    # Predicted delay in seconds that counts as a "delay" event
+NOTIFICATION_BATCH_SIZE = 500         # Notifications per sink.send() call
+NOTIFICATION_QUEUE_SIZE = 100         # Refreshes' events waiting for the sender thread; more are dropped
+NOTIFICATION_SETTINGS_RELOAD_SECONDS = 60   # Reload settings changed by other processes this often
+# Only the process holding this lock notifies; unset to notify from every process (single-process runs)
+NOTIFICATION_LOCK_FILE = os.environ.get('NOTIFICATION_LOCK_FILE', 'notifications.lock')
+
+# Static GTFS releases per agency (each loaded on first use), optionally watched and hot-swapped
+STATIC_GTFS_DIRS = {
+   'subway': os.environ.get('STATIC_GTFS_DIR', os.path.join('data', 'gtfs_subway')),
+   'lirr': os.environ.get('STATIC_GTFS_LIRR_DIR', os.path.join('data', 'gtfs_lirr')),
+   'mnr': os.environ.get('STATIC_GTFS_MNR_DIR', os.path.join('data', 'gtfs_mnr'))
+}
+DEFAULT_AGENCY = 'subway'   # Agency of static endpoints called without ?agency=
+STATIC_DATASET_WATCH = os.environ.get('STATIC_DATASET_WATCH', '0') == '1'
+STATIC_DATASET_SNAPSHOT_DIR = os.environ.get('STATIC_DATASET_SNAPSHOT_DIR', os.path.join('data', '.gtfs_versions'))
+STATIC_DATASET_POLL_SECONDS = 300     # How often to check for a new release
+STATIC_DATASET_SETTLE_SECONDS = 30    # Wait until the release's files are this old before loading
+
+# JSON responses: 'orjson', 'stdlib', or 'auto' for orjson when installed (?pretty=1 indents a response)
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+
+# Admission control: per-client token buckets and per-cost-class concurrency (see utils/admission.py)
+ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', '0') == '1'
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('GUNICORN_THREADS', 4))   # Request threads per process
+ADMISSION_CLIENT_HEADER = os.environ.get('ADMISSION_CLIENT_HEADER')    # e.g. 'X-Forwarded-For' behind one proxy (last hop)
+ADMISSION_CLIENT_RATE = 20     # Tokens per second per client
+ADMISSION_CLIENT_BURST = 100   # Token bucket size per client
+ADMISSION_CLASSES = {
+   # cost: tokens per request, concurrency: running requests, queue/queue_timeout: waiting requests and seconds,
+   # share: fraction of ADMISSION_MAX_IN_FLIGHT that may be taken when the class is admitted
+   'cheap': {'cost': 1, 'concurrency': 64, 'queue': 0, 'queue_timeout': 0, 'share': 1.0},
+   'standard': {'cost': 2, 'concurrency': 3, 'queue': 4, 'queue_timeout': 2.0, 'share': 0.75},
+   'expensive': {'cost': 10, 'concurrency': 1, 'queue': 2, 'queue_timeout': 3.0, 'share': 0.5}
+}
@@ -1,6 +1,26 @@
-import firebase_admin
-from firebase_admin import credentials, auth
+import os
 
-# 初始化 Firebase Admin SDK
-cred = credentials.Certificate('path/to/your-firebase-adminsdk.json')
-firebase_app = firebase_admin.initialize_app(cred)
\ No newline at end of file
+# Firebase Admin SDK 凭据路径
+FIREBASE_CREDENTIALS = os.environ.get('FIREBASE_CREDENTIALS', 'path/to/your-firebase-adminsdk.json')
+
+_firebase_app = None
+
+
+def get_firebase_app():
+    """Get the Firebase Admin app, initializing the SDK on first use"""
+    global _firebase_app
+    if _firebase_app is None:
+        # 首次使用时才导入并初始化 Firebase Admin SDK
+        import firebase_admin
+        from firebase_admin import credentials
+
+        cred = credentials.Certificate(FIREBASE_CREDENTIALS)
+        _firebase_app = firebase_admin.initialize_app(cred)
+    return _firebase_app
+
+
+def get_firebase_auth():
+    """Get the firebase_admin.auth module bound to the initialized app"""
+    get_firebase_app()
+    from firebase_admin import auth
+    return auth
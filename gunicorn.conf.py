@@ -0,0 +1,11 @@
+import multiprocessing
+import os
+
+# 入口：wsgi.py 在主进程中预加载静态数据
+wsgi_app = 'wsgi:app'
+preload_app = True
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
@@ -0,0 +1,64 @@
+"""favorite unique indexes
+
+Adds the (user_id, item) unique indexes that favorite inserts rely on
+(INSERT ... ON CONFLICT DO NOTHING) and the notification_setting.user_id
+index. Duplicate favorites are removed first, keeping the oldest row.
+
+Databases created by db.create_all() with the current models already have
+these constraints; they are detected and left as they are, so the
+revision can be applied (or stamped) on any existing database.
+
+Revision ID: 57f167beb70d
+Revises:
+Create Date: 2026-10-19 16:59:15.064771
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '57f167beb70d'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (table, index name, columns, unique)
+INDEXES = (
+    ('favorite_route', 'uq_favorite_route_user_route', ['user_id', 'route_id'], True),
+    ('favorite_station', 'uq_favorite_station_user_station', ['user_id', 'station_id'], True),
+    ('notification_setting', 'ix_notification_setting_user_id', ['user_id'], False)
+)
+
+
+def _covered(inspector, table, columns, unique):
+    """Whether an index or unique constraint on exactly these columns exists"""
+    candidates = [index for index in inspector.get_indexes(table) if index['unique'] or not unique]
+    if unique:
+        candidates += inspector.get_unique_constraints(table)
+    return any(list(candidate['column_names']) == columns for candidate in candidates)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for table, name, columns, unique in INDEXES:
+        if table not in tables or _covered(inspector, table, columns, unique):
+            continue
+        if unique:
+            # Keep the first row of each duplicate group so the unique index can be built
+            op.execute(
+                f"DELETE FROM {table} WHERE id NOT IN "
+                f"(SELECT MIN(id) FROM {table} GROUP BY {', '.join(columns)})"
+            )
+        op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for table, name, _, _ in INDEXES:
+        if table in tables and any(index['name'] == name for index in inspector.get_indexes(table)):
+            op.drop_index(name, table_name=table)
@@ -1,10 +1,25 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import SQLITE_PRAGMAS
 
 # 初始化SQLAlchemy实例
 db = SQLAlchemy()
 
 
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS (WAL journal, foreign keys, ...) to each new SQLite connection"""
+    import sqlite3
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
 class User(db.Model):
     """User model"""
     id = db.Column(db.Integer, primary_key=True)
@@ -20,6 +35,9 @@ class User(db.Model):
 
 class FavoriteRoute(db.Model):
     """User's favorite routes"""
+    # The unique index also serves lookups by user_id alone
+    __table_args__ = (db.UniqueConstraint('user_id', 'route_id', name='uq_favorite_route_user_route'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     route_id = db.Column(db.String(20), nullable=False)
@@ -28,6 +46,9 @@ class FavoriteRoute(db.Model):
 
 class FavoriteStation(db.Model):
     """User's favorite stations"""
+    # The unique index also serves lookups by user_id alone
+    __table_args__ = (db.UniqueConstraint('user_id', 'station_id', name='uq_favorite_station_user_station'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     station_id = db.Column(db.String(20), nullable=False)
@@ -37,7 +58,7 @@ class FavoriteStation(db.Model):
 class NotificationSetting(db.Model):
     """User notification settings"""
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     notification_type = db.Column(db.String(20), nullable=False)  # delay, service_change, etc.
     route_id = db.Column(db.String(20), nullable=True)  # Can be null for global settings
     station_id = db.Column(db.String(20), nullable=True)  # Can be null
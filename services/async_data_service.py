@@ -0,0 +1,125 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    ASYNC_MAX_CONNECTIONS, ASYNC_MAX_KEEPALIVE_CONNECTIONS, ASYNC_UPSTREAM_TIMEOUT, ASYNC_EXECUTOR_WORKERS
+)
+from services.data_service import (
+    DataService, FEED_CATEGORIES, UPSTREAM_LATENCY, UPSTREAM_BYTES, UPSTREAM_RESPONSES, upstream
+)
+
+
+class AsyncDataService(DataService):
+    """
+    Data service with non-blocking upstream fetches for the feed getters
+
+    Upstream requests go through one pooled httpx.AsyncClient, so waiting on
+    the MTA does not hold a thread. Parsing and caching reuse
+    DataService._store_feed in a thread pool, keeping the event loop free.
+    Concurrent cache misses for the same feed share a single fetch.
+    """
+
+    def __init__(self):
+        self.client = None
+        self.executor = ThreadPoolExecutor(max_workers=ASYNC_EXECUTOR_WORKERS, thread_name_prefix='feed-worker')
+        self.inflight = {}  # (category, feed_id) -> task refreshing it
+
+    def _get_client(self):
+        if self.client is None:
+            import httpx
+
+            self.client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS,
+                                    max_keepalive_connections=ASYNC_MAX_KEEPALIVE_CONNECTIONS),
+                timeout=ASYNC_UPSTREAM_TIMEOUT
+            )
+        return self.client
+
+    async def aclose(self):
+        """Close pooled upstream connections"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def run_in_executor(self, function, *args):
+        """
+        Run blocking work (parsing, encoding) off the event loop
+
+        Args:
+            function (callable): Function to run
+            *args: Arguments
+
+        Returns:
+            any: Function result
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def _fetch_async(self, feed_id, url, category=None):
+        """
+        Fetch a feed from the MTA without blocking, recording latency and size of each attempt
+
+        Goes through the same upstream policy as DataService._fetch.
+
+        Args:
+            feed_id (str): Feed ID, used as the metrics label
+            url (str): Feed URL
+            category (str): Feed category, selects the default timeouts
+
+        Returns:
+            httpx.Response: Upstream response
+        """
+        import httpx
+
+        url = self.resolve_feed_url(url)
+
+        async def request_once(timeout):
+            connect, read = timeout
+            start = time.perf_counter()
+            try:
+                response = await self._get_client().get(url, timeout=httpx.Timeout(read, connect=connect))
+            except Exception:
+                UPSTREAM_RESPONSES.inc(feed_id, 'exception')
+                raise
+            finally:
+                UPSTREAM_LATENCY.observe(time.perf_counter() - start, feed_id)
+
+            UPSTREAM_RESPONSES.inc(feed_id, str(response.status_code))
+            UPSTREAM_BYTES.inc(feed_id, amount=len(response.content))
+            return response
+
+        return await upstream.call_async(category, feed_id, request_once)
+
+    async def _refresh_async(self, category, feed_id):
+        try:
+            response = await self._fetch_async(feed_id, FEED_CATEGORIES[category][0][feed_id], category)
+            result = await self.run_in_executor(self._store_feed, category, feed_id, response)
+        except Exception as e:
+            result = {"error": str(e)}
+        if isinstance(result, dict) and "error" in result:
+            return self._last_known_good(category, feed_id, result)
+        return result
+
+    async def get_feed_async(self, category, feed_id):
+        """
+        Async counterpart of DataService.get_feed
+
+        Args:
+            category (str): Category (key of FEED_CATEGORIES)
+            feed_id (str): Feed ID
+
+        Returns:
+            ColumnarFeed, dict or list: Feed data, or error dict
+        """
+        cached_data, error = self.get_cached_feed(category, feed_id)
+        if error or cached_data:
+            return error or cached_data
+
+        key = (category, feed_id)
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh_async(category, feed_id))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+
+        # Shielded so a disconnecting client does not cancel the fetch others wait on
+        return await asyncio.shield(task)
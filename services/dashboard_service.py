@@ -0,0 +1,182 @@
+import contextvars
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import (
+    SUBWAY_FEEDS, SUBWAY_ROUTE_FEEDS,
+    DASHBOARD_BUDGET_SECONDS, DASHBOARD_ARRIVALS_PER_STATION, DASHBOARD_WORKERS
+)
+from utils.metrics import metrics
+
+DASHBOARD_DURATION = metrics.histogram('dashboard_build_duration_seconds', 'Time to build a user dashboard')
+DASHBOARD_UNAVAILABLE = metrics.counter(
+    'dashboard_sources_unavailable_total', 'Dashboard data sources that failed or missed the budget', ('source',))
+
+
+class DashboardService:
+    """
+    Joins a user's favorite routes and stations with live data
+
+    Favorites are loaded in one query. The subway snapshots, alert index and
+    accessibility index they need are then fetched in parallel, and every
+    favorite is answered from those in-memory structures. Sources that fail
+    or are not ready within the request budget are reported in
+    "unavailable" instead of holding up the response; their fetches carry
+    on in the background and warm the cache for the next request.
+    """
+
+    def __init__(self, data_service, user_service, budget=DASHBOARD_BUDGET_SECONDS):
+        """
+        Args:
+            data_service (DataService): Live data source
+            user_service (UserService): Favorites source
+            budget (float): Seconds to wait for live data per request
+        """
+        self.data_service = data_service
+        self.user_service = user_service
+        self.budget = budget
+        self.executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+
+    def _station_feeds(self, station_ids):
+        """Get subway feed IDs serving the given stations, all feeds when unknown"""
+        station_route_map = self.data_service.get_station_route_map()
+        if "error" in station_route_map:
+            return set(SUBWAY_FEEDS)
+
+        feed_ids = set()
+        for station_id in station_ids:
+            route_ids = set()
+            for stop_id in (station_id, f"{station_id}N", f"{station_id}S"):
+                route_ids.update(station_route_map.get(stop_id, []))
+            if not route_ids:
+                return set(SUBWAY_FEEDS)
+            feed_ids.update(SUBWAY_ROUTE_FEEDS[route_id] for route_id in route_ids if route_id in SUBWAY_ROUTE_FEEDS)
+        return feed_ids
+
+    def _gather(self, sources):
+        """
+        Run source loaders in parallel within the budget
+
+        Args:
+            sources (dict): Source name -> zero-argument loader
+
+        Returns:
+            tuple: (source name -> result, source name -> reason it is unavailable)
+        """
+        # Loaders inherit the request's upstream deadline
+        futures = {
+            name: self.executor.submit(contextvars.copy_context().run, loader) for name, loader in sources.items()
+        }
+        wait(futures.values(), timeout=self.budget)
+
+        results = {}
+        unavailable = {}
+        for name, future in futures.items():
+            if not future.done():
+                unavailable[name] = "timed out"
+                continue
+            try:
+                result = future.result()
+            except Exception as e:
+                unavailable[name] = str(e)
+                continue
+            if isinstance(result, dict) and "error" in result:
+                unavailable[name] = result["error"]
+            else:
+                results[name] = result
+
+        for name in unavailable:
+            DASHBOARD_UNAVAILABLE.inc(name.split(':')[0])
+        return results, unavailable
+
+    def get_dashboard(self, user_id):
+        """
+        Get live arrivals, alerts and outages for a user's favorites
+
+        Args:
+            user_id (int): User ID
+
+        Returns:
+            dict: Dashboard with "routes", "stations" and "unavailable" sources
+        """
+        start = time.perf_counter()
+        favorites = self.user_service.get_user_favorites(user_id)
+        route_ids = [favorite["id"] for favorite in favorites["routes"]]
+        station_ids = [favorite["id"] for favorite in favorites["stations"]]
+
+        feed_ids = {SUBWAY_ROUTE_FEEDS[route_id] for route_id in route_ids if route_id in SUBWAY_ROUTE_FEEDS}
+        if station_ids:
+            feed_ids |= self._station_feeds(station_ids)
+
+        sources = {f"subway:{feed_id}": (lambda feed_id=feed_id: self.data_service.get_realtime_snapshot('subway', feed_id))
+                   for feed_id in sorted(feed_ids)}
+        if route_ids or station_ids:
+            sources["alerts"] = lambda: self.data_service.get_alert_index('all_alerts')
+        if station_ids:
+            sources["accessibility"] = self.data_service.get_accessibility_index
+
+        results, unavailable = self._gather(sources)
+        snapshots = [results[name] for name in sources if name.startswith('subway:') and name in results]
+        alert_index = results.get("alerts")
+        accessibility_index = results.get("accessibility")
+        now = int(datetime.datetime.now().timestamp())
+
+        routes = []
+        for favorite in favorites["routes"]:
+            route_id = favorite["id"]
+            snapshot = results.get(f"subway:{SUBWAY_ROUTE_FEEDS.get(route_id)}")
+            routes.append({
+                "route_id": route_id,
+                "added_at": favorite["added_at"].isoformat(),
+                "alerts": alert_index.query(route_id=route_id, at=now) if alert_index else None,
+                "vehicle_count": len(snapshot.vehicles_for_route(route_id)) if snapshot is not None else None
+            })
+
+        stations = []
+        for favorite in favorites["stations"]:
+            station_id = favorite["id"]
+            stop_ids = (station_id, f"{station_id}N", f"{station_id}S")
+
+            arrivals = None
+            if snapshots:
+                arrivals = []
+                for snapshot in snapshots:
+                    for stop_id in stop_ids[1:]:
+                        for arrival in snapshot.arrivals_at(stop_id, after=now, limit=DASHBOARD_ARRIVALS_PER_STATION):
+                            arrival["stop_id"] = stop_id
+                            arrivals.append(arrival)
+                arrivals.sort(key=lambda arrival: arrival["time"])
+                del arrivals[DASHBOARD_ARRIVALS_PER_STATION:]
+
+            alerts = None
+            if alert_index:
+                # An alert may inform the parent station and both platforms; report it once
+                alerts = []
+                seen = set()
+                for stop_id in stop_ids:
+                    for alert in alert_index.query(stop_id=stop_id, at=now):
+                        if id(alert) not in seen:
+                            seen.add(id(alert))
+                            alerts.append(alert)
+
+            outages = None
+            if accessibility_index:
+                entry = accessibility_index.get_station(station_id)
+                outages = [equipment for equipment in entry["equipment"] if equipment["status"] == "out_of_service"]
+
+            stations.append({
+                "station_id": station_id,
+                "added_at": favorite["added_at"].isoformat(),
+                "arrivals": arrivals,
+                "alerts": alerts,
+                "elevator_outages": outages
+            })
+
+        DASHBOARD_DURATION.observe(time.perf_counter() - start)
+        return {
+            "user_id": user_id,
+            "generated_at": now,
+            "routes": routes,
+            "stations": stations,
+            "unavailable": unavailable
+        }
@@ -1,19 +1,141 @@
-import requests
+import bisect
 import datetime
+import time
+from urllib.parse import urlsplit
 import csv
 import os
 import json
-import pyproj
-from shapely.geometry import LineString
-from shapely.ops import transform
-import functools
-from google.transit import gtfs_realtime_pb2
+import sys
 from config import (
-    SUBWAY_FEEDS, LIRR_FEEDS, MNR_FEEDS,
+    SUBWAY_FEEDS, SUBWAY_ROUTE_FEEDS, LIRR_FEEDS, MNR_FEEDS,
     SERVICE_ALERT_FEEDS, ELEVATOR_ESCALATOR_FEEDS,
-    CACHE_TIMEOUT
+    CACHE_TIMEOUT, MTA_FEED_BASE_URL,
+    ARCHIVE_ENABLED, ARCHIVE_DIR, ARCHIVE_RETENTION_SECONDS, ARCHIVE_MAX_BYTES_PER_FEED, ARCHIVE_SEGMENT_SECONDS,
+    ANALYTICS_MAX_WINDOW_SECONDS, ANALYTICS_BUNCHING_RATIO, ANALYTICS_OPEN_END_STEP, ANALYTICS_ROLLUP_SECONDS,
+    PARSE_POOL_WORKERS, PARSE_POOL_MIN_BYTES,
+    STATIC_GTFS_DIRS, DEFAULT_AGENCY, STATIC_DATASET_WATCH, STATIC_DATASET_SNAPSHOT_DIR,
+    STATIC_DATASET_POLL_SECONDS, STATIC_DATASET_SETTLE_SECONDS,
+    UPSTREAM_TIMEOUTS, UPSTREAM_RETRIES, UPSTREAM_BACKOFF_BASE, UPSTREAM_BACKOFF_MAX,
+    UPSTREAM_BREAKER_FAILURES, UPSTREAM_BREAKER_RESET_SECONDS, UPSTREAM_STALE_MAX_SECONDS,
+    FEED_CADENCE_BOUNDS, FEED_CADENCE_SAMPLES, FEED_CADENCE_PROBE_EVERY,
+    REALTIME_VIEW_MAX_AGE_SECONDS
 )
 from utils.cache import cache
+from utils.metrics import metrics
+from utils.alert_index import AlertIndex
+from utils.accessibility_index import AccessibilityIndex
+from utils.archive import SnapshotArchive
+from utils.static_dataset import StaticDatasetRegistry
+from utils.wire_formats import EncodedSnapshots
+from utils.upstream import UpstreamPolicy
+from utils.feed_cadence import FeedCadences
+from utils.realtime_view import MergedRealtimeView
+
+UPSTREAM_LATENCY = metrics.histogram(
+    'upstream_request_duration_seconds', 'Upstream MTA feed fetch latency', ('feed',))
+UPSTREAM_BYTES = metrics.counter('upstream_response_bytes_total', 'Bytes received from upstream feeds', ('feed',))
+UPSTREAM_RESPONSES = metrics.counter('upstream_responses_total', 'Upstream responses by status', ('feed', 'status'))
+PARSE_DURATION = metrics.histogram('gtfs_rt_parse_duration_seconds', 'GTFS-RT parse duration', ('feed',))
+PARSE_ENTITIES = metrics.gauge('gtfs_rt_entities', 'Entities in the last parsed GTFS-RT snapshot', ('feed',))
+SNAPSHOT_BYTES = metrics.gauge('gtfs_rt_snapshot_bytes', 'Memory held by the last columnar snapshot', ('feed',))
+STATIC_LOAD_DURATION = metrics.histogram(
+    'static_load_duration_seconds', 'Static GTFS data load time on cache miss', ('loader',))
+STALE_SERVED = metrics.counter(
+    'upstream_stale_served_total', 'Responses served from last-known-good data after a failed fetch', ('feed',))
+
+# Upstream feeds: category -> (feeds, cache key prefix, invalid ID message)
+# subway, lirr and mnr are kept as ColumnarFeed snapshots
+FEED_CATEGORIES = {
+    'subway': (SUBWAY_FEEDS, 'subway', "Invalid subway feed: {}"),
+    'lirr': (LIRR_FEEDS, 'lirr', "Invalid LIRR feed: {}"),
+    'mnr': (MNR_FEEDS, 'mnr', "Invalid MNR feed: {}"),
+    'alerts': (SERVICE_ALERT_FEEDS, 'alert', "Invalid alert type: {}"),
+    'accessibility': (ELEVATOR_ESCALATOR_FEEDS, 'accessibility', "Invalid accessibility data type: {}")
+}
+
+# Callbacks run after a feed refresh: listener(category, feed_id, data), see add_feed_listener
+_feed_listeners = []
+
+
+def add_feed_listener(listener):
+    """
+    Register a callback for refreshed alerts indexes and realtime snapshots
+
+    Args:
+        listener (callable): Called as listener(category, feed_id, data), with an
+            AlertIndex for 'alerts' and a ColumnarFeed for realtime categories
+    """
+    _feed_listeners.append(listener)
+
+
+def _notify_feed_listeners(category, feed_id, data):
+    for listener in _feed_listeners:
+        try:
+            listener(category, feed_id, data)
+        except Exception as e:
+            # A failing listener must not fail the feed request
+            print(f"Feed listener error for {category}/{feed_id}: {str(e)}")
+
+
+# Encoded response bodies (protobuf, msgpack, JSON) of each feed's current snapshot
+encoded_snapshots = EncodedSnapshots()
+
+# Timeouts, retries and circuit breakers of upstream fetches
+upstream = UpstreamPolicy(
+    UPSTREAM_TIMEOUTS,
+    retries=UPSTREAM_RETRIES,
+    backoff_base=UPSTREAM_BACKOFF_BASE,
+    backoff_max=UPSTREAM_BACKOFF_MAX,
+    failure_threshold=UPSTREAM_BREAKER_FAILURES,
+    reset_seconds=UPSTREAM_BREAKER_RESET_SECONDS
+)
+
+# Publish cadence of each realtime and alerts feed, learned from header timestamps
+feed_cadences = FeedCadences(FEED_CADENCE_BOUNDS, samples=FEED_CADENCE_SAMPLES, probe_every=FEED_CADENCE_PROBE_EVERY)
+
+# Last successfully stored data of each feed: (category, feed_id) -> (data, stored at)
+# Unlike cache entries, these are kept past expiry to serve while upstream is failing
+last_known_good = {}
+
+# Process pool for large realtime payloads, created on first use
+_parse_pool = None
+
+
+def get_parse_pool():
+    """
+    Get the shared GTFS-RT parse pool
+
+    Returns:
+        ParsePool: Parse pool
+    """
+    global _parse_pool
+    if _parse_pool is None:
+        from utils.parse_pool import ParsePool
+        _parse_pool = ParsePool(PARSE_POOL_WORKERS, PARSE_POOL_MIN_BYTES)
+    return _parse_pool
+
+
+# Static GTFS releases per agency, hot-swapped by a watcher when STATIC_DATASET_WATCH is set
+static_datasets = StaticDatasetRegistry(
+    STATIC_GTFS_DIRS,
+    watch=STATIC_DATASET_WATCH,
+    snapshot_dir=STATIC_DATASET_SNAPSHOT_DIR,
+    poll_interval=STATIC_DATASET_POLL_SECONDS,
+    settle_seconds=STATIC_DATASET_SETTLE_SECONDS
+)
+
+
+# Raw snapshot archive, shared by all DataService instances
+archive = SnapshotArchive(
+    ARCHIVE_DIR,
+    retention_seconds=ARCHIVE_RETENTION_SECONDS,
+    max_bytes=ARCHIVE_MAX_BYTES_PER_FEED,
+    segment_seconds=ARCHIVE_SEGMENT_SECONDS
+) if ARCHIVE_ENABLED else None
+
+# Trips of all realtime feeds merged by (agency, start_date, trip_id), updated on every refresh
+realtime_view = MergedRealtimeView(max_age=REALTIME_VIEW_MAX_AGE_SECONDS)
+add_feed_listener(realtime_view.on_feed)
 
 
 class DataService:
@@ -21,6 +143,8 @@ class DataService:
     Data service - handles all data retrieval and processing
     """
 
+    dataset = None  # Static GTFS release to read instead of the current one (see get_static_dataset)
+
     def get_cache_timeout(self, category, item_id):
         """
         Get cache timeout for a specific item
@@ -32,6 +156,11 @@ class DataService:
         Returns:
             int: Cache timeout in seconds
         """
+        # Feeds with a learned cadence stay cached until their next publish is expected
+        learned = feed_cadences.cache_timeout(category, item_id)
+        if learned is not None:
+            return learned
+
         # Check for item-specific timeout
         specific_key = f"{item_id}"
         if specific_key in CACHE_TIMEOUT:
@@ -45,6 +174,98 @@ class DataService:
         # Return global default
         return 60  # Default 1 minute
 
+    def preload_static_data(self, all_routes=False):
+        """
+        Warm the static GTFS caches and import realtime dependencies
+
+        Meant to run once in the master process before workers fork, so the
+        loaded data and modules are shared copy-on-write instead of being
+        rebuilt by every worker on its first request.
+
+        Args:
+            all_routes (bool): Also warm stops and shapes of every route in routes.txt
+
+        Returns:
+            dict: Loader name -> error message for loaders that failed
+        """
+        import requests  # noqa: F401
+        from google.transit import gtfs_realtime_pb2  # noqa: F401
+        import utils.columnar_feed  # noqa: F401
+
+        errors = {}
+        for agency in static_datasets.agencies:
+            # Agencies without static data on disk are skipped, not reported as failures
+            if agency != DEFAULT_AGENCY and not os.path.isdir(static_datasets.get(agency).source_dir):
+                continue
+            prefix = '' if agency == DEFAULT_AGENCY else f"{agency}."
+            dataset = self.get_static_dataset(agency)
+
+            if all_routes:
+                # One pass over each GTFS file instead of one per route
+                from utils.static_index import StaticGTFSIndex
+
+                start = time.perf_counter()
+                index = StaticGTFSIndex(dataset.directory)
+                STATIC_LOAD_DURATION.observe(time.perf_counter() - start, 'static_index')
+                errors.update({prefix + name: error for name, error in index.errors.items()})
+                self.cache_static_index(index, agency, dataset)
+
+            for name, loader in (('stations', self.get_stations), ('routes', self.get_routes),
+                                 ('station_route_map', self.get_station_route_map)):
+                result = loader(agency, dataset)
+                if isinstance(result, dict) and "error" in result:
+                    errors[prefix + name] = result["error"]
+        return errors
+
+    def cache_static_index(self, index, agency=DEFAULT_AGENCY, dataset=None):
+        """
+        Cache per-route stops and shapes and the station-route map from a StaticGTFSIndex
+
+        Args:
+            index (StaticGTFSIndex): Index over the agency's static dataset
+            agency (str): Agency
+            dataset (StaticDataset): Release to read, defaults to get_static_dataset(agency)
+        """
+        dataset = self.get_static_dataset(agency) if dataset is None else dataset
+        station_route_map = index.station_route_map()
+        if station_route_map is not None:
+            self._cache_static(dataset, dataset.key("station_route_map"), station_route_map)
+        for route_id in index.route_ids:
+            route_stops = index.route_stops(route_id)
+            if route_stops is not None:
+                self._cache_static(dataset, dataset.key(f"route_stops_{route_id}"), route_stops)
+            line_shape = index.line_shape(route_id)
+            if line_shape is not None:
+                self._cache_static(dataset, dataset.key(f"line_shape_{route_id}"), line_shape)
+
+    def get_static_dataset(self, agency=DEFAULT_AGENCY):
+        """
+        Get the static GTFS release this service reads for an agency
+
+        Loaders call this once and use the result for every file path and
+        cache key, so a release swapped in mid-request is never mixed with
+        the one the request started on.
+
+        Args:
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+
+        Returns:
+            StaticDataset: Pinned dataset, else the agency's current release
+
+        Raises:
+            ValueError: If the agency is not configured
+        """
+        if self.dataset is not None and self.dataset.agency == agency:
+            return self.dataset
+        return static_datasets.current(agency)
+
+    def _cache_static(self, dataset, cache_key, data):
+        """Cache data derived from a static release, unless that release was swapped out meanwhile"""
+        if dataset is self.dataset or dataset is static_datasets.current(dataset.agency):
+            # Versioned keys are dropped when the release is swapped out, so they never expire
+            cache.set(cache_key, data, expires=False)
+            dataset.track(cache_key, data)
+
     def get_available_feeds(self):
         """
         Get all available data feeds
@@ -69,6 +290,61 @@ class DataService:
         """
         return SUBWAY_FEEDS
 
+    def resolve_feed_url(self, url):
+        """
+        Apply the MTA_FEED_BASE_URL override to a configured feed URL
+
+        Args:
+            url (str): Feed URL from config
+
+        Returns:
+            str: URL to fetch
+        """
+        url = url.strip()
+        if not MTA_FEED_BASE_URL:
+            return url
+
+        parts = urlsplit(url)
+        return MTA_FEED_BASE_URL.rstrip('/') + parts.path + (f"?{parts.query}" if parts.query else '')
+
+    def _fetch(self, feed_id, url, category=None):
+        """
+        Fetch a feed from the MTA, recording latency and size of each attempt
+
+        Goes through the upstream policy: per-feed timeouts capped by the
+        request deadline, retries with backoff, and the feed's circuit breaker.
+
+        Args:
+            feed_id (str): Feed ID, used as the metrics label
+            url (str): Feed URL
+            category (str): Feed category, selects the default timeouts
+
+        Returns:
+            requests.Response: Upstream response
+
+        Raises:
+            UpstreamUnavailable: If the feed's breaker is open or the deadline has passed
+        """
+        import requests
+
+        url = self.resolve_feed_url(url)
+
+        def request_once(timeout):
+            start = time.perf_counter()
+            try:
+                response = requests.get(url, timeout=timeout)
+            except Exception:
+                UPSTREAM_RESPONSES.inc(feed_id, 'exception')
+                raise
+            finally:
+                UPSTREAM_LATENCY.observe(time.perf_counter() - start, feed_id)
+
+            UPSTREAM_RESPONSES.inc(feed_id, str(response.status_code))
+            UPSTREAM_BYTES.inc(feed_id, amount=len(response.content))
+            return response
+
+        return upstream.call(category, feed_id, request_once)
+
     def parse_gtfs_rt(self, content, feed_id):
         """
         Parse GTFS-RT data
@@ -80,6 +356,9 @@ class DataService:
         Returns:
             dict: Parsed data
         """
+        from google.transit import gtfs_realtime_pb2
+
+        start = time.perf_counter()
         try:
             # Parse GTFS-RT data
             feed = gtfs_realtime_pb2.FeedMessage()
@@ -253,84 +532,500 @@ class DataService:
 
                 result["entities"].append(entity_data)
 
+            PARSE_DURATION.observe(time.perf_counter() - start, feed_id)
+            PARSE_ENTITIES.set(len(result["entities"]), feed_id)
             return result
 
         except Exception as e:
             return {"error": f"Error parsing GTFS-RT data: {str(e)}"}
 
-    def get_subway_feed(self, feed_id):
+    def parse_gtfs_rt_columnar(self, content, feed_id):
         """
-        Get data for specific subway line group
+        Parse GTFS-RT vehicle and trip update data into a compact columnar snapshot
 
         Args:
-            feed_id (str): Subway line group ID
+            content (bytes): GTFS-RT binary content
+            feed_id (str): Feed ID
 
         Returns:
-            dict: Processed subway data or error
+            ColumnarFeed: Parsed snapshot, or error dict
         """
-        # Validate feed_id
-        if feed_id not in SUBWAY_FEEDS:
-            return {"error": f"Invalid subway feed: {feed_id}"}
+        start = time.perf_counter()
+        try:
+            snapshot = get_parse_pool().parse_columnar(content, feed_id)
+        except Exception as e:
+            return {"error": f"Error parsing GTFS-RT data: {str(e)}"}
 
-        # Check cache
-        cache_key = f"subway_{feed_id}"
-        cached_data = cache.get(cache_key, self.get_cache_timeout('subway', feed_id))
-        if cached_data:
-            return cached_data
+        PARSE_DURATION.observe(time.perf_counter() - start, feed_id)
+        PARSE_ENTITIES.set(len(snapshot.entities), feed_id)
+        SNAPSHOT_BYTES.set(snapshot.nbytes, feed_id)
+        return snapshot
+
+    @staticmethod
+    def materialize(data):
+        """
+        Convert a columnar snapshot to its JSON-serializable dict form
+
+        Args:
+            data (ColumnarFeed, dict or list): Snapshot, other feed data or error dict
+
+        Returns:
+            dict: Parsed data or error (other data is returned as is)
+        """
+        if isinstance(data, (dict, list)):
+            return data
+        return data.to_dict()
+
+    def _archive_snapshot(self, feed_id, header_timestamp, content, snapshot=None):
+        """
+        Archive a raw realtime snapshot when archiving is enabled
+
+        Args:
+            feed_id (str): Feed ID
+            header_timestamp (int): FeedMessage header timestamp
+            content (bytes): Raw GTFS-RT payload
+            snapshot (ColumnarFeed): Parsed payload of a subway feed, folded into
+                                     the segment's headway rollups
+        """
+        if archive is None:
+            return
 
-        # Fetch data
         try:
-            response = requests.get(SUBWAY_FEEDS[feed_id])
+            if not archive.append(feed_id, header_timestamp, content) or snapshot is None:
+                return
+            # Keep the segment's rollups current so analytics never decode a whole segment
+            for segment_path, timestamps in archive.segments(feed_id, header_timestamp, header_timestamp):
+                self._headway_rollups(feed_id, segment_path, timestamps, (header_timestamp, snapshot))
+        except (OSError, ValueError) as e:
+            print(f"Failed to archive {feed_id} snapshot: {str(e)}")
+
+    def _headway_rollups(self, feed_id, segment_path, timestamps, latest=None):
+        """
+        Get the headway rollups of an archive segment, bringing them up to date
 
-            if response.status_code == 200:
-                # Parse GTFS-RT data
-                result = self.parse_gtfs_rt(response.content, feed_id)
+        Rollups are stored next to the segment and extended with the snapshots
+        archived since they were written. They are rebuilt when a snapshot was
+        archived out of order (or by another process in between).
 
-                # Cache result
-                cache.set(cache_key, result)
-                return result
-            else:
-                return {"error": f"HTTP error: {response.status_code}"}
+        Args:
+            feed_id (str): Subway feed ID
+            segment_path (str): Archive segment
+            timestamps (list): Header timestamps of all snapshots in the segment
+            latest (tuple): (header_timestamp, ColumnarFeed) of a snapshot parsed already
 
-        except Exception as e:
-            return {"error": str(e)}
+        Returns:
+            dict: "buckets", a rollup per ANALYTICS_ROLLUP_SECONDS bucket, and
+                  "segment", the rollup of the whole segment
+        """
+        from utils.headways import (
+            flatten_trip_updates, rollup_trip_updates, merge_rollups, append_rollup, load_rollups, save_rollups
+        )
 
-    def get_lirr_feed(self, feed_id):
+        path = archive.sidecar_path(segment_path, 'headways.npz')
+        try:
+            rollups = load_rollups(path)
+            covered = bisect.bisect_right(timestamps, rollups["segment"]["last"])
+            if covered != rollups["segment"]["group_snapshots"].sum():
+                rollups, covered = None, 0
+        except (OSError, ValueError, KeyError):
+            rollups, covered = None, 0
+        if covered == len(timestamps):
+            return rollups
+
+        snapshots = archive.iter_range(feed_id, timestamps[covered], timestamps[-1])
+        if latest is not None:
+            snapshots = ((header_timestamp, latest[1] if header_timestamp == latest[0] else content)
+                         for header_timestamp, content in snapshots)
+        added = rollup_trip_updates(flatten_trip_updates(snapshots), ANALYTICS_ROLLUP_SECONDS)
+        if rollups is None:
+            rollups = {"buckets": added, "segment": merge_rollups([added], group=0)}
+        else:
+            rollups = {
+                "buckets": append_rollup(rollups["buckets"], added),
+                "segment": merge_rollups([rollups["segment"], added], group=0)
+            }
+        save_rollups(path, rollups)
+        return rollups
+
+    def _find_archived(self, category, feed_id, at):
+        """Get (header timestamp, None) of the archived snapshot at or before `at`, or (None, error)"""
+        feeds = {
+            'subway': SUBWAY_FEEDS,
+            'lirr': LIRR_FEEDS,
+            'mnr': MNR_FEEDS,
+            'alerts': SERVICE_ALERT_FEEDS
+        }.get(category, {})
+        if feed_id not in feeds:
+            return None, {"error": f"Invalid {category} feed: {feed_id}"}
+
+        if archive is None:
+            return None, {"error": "Snapshot archive is not enabled"}
+
+        header_timestamp = archive.find(feed_id, at)
+        if header_timestamp is None:
+            return None, {"error": f"No archived snapshot of {feed_id} at or before {at}"}
+        return header_timestamp, None
+
+    def get_archived_payload(self, category, feed_id, at):
         """
-        Get LIRR data
+        Get the raw GTFS-RT payload of the archived snapshot as of a point in time
 
         Args:
-            feed_id (str): LIRR feed ID
+            category (str): Category ('subway', 'lirr', 'mnr', 'alerts')
+            feed_id (str): Feed ID
+            at (int): POSIX timestamp
 
         Returns:
-            dict: Processed LIRR data or error
+            tuple: (bytes, None), or (None, error dict)
         """
-        # Validate feed_id
-        if feed_id not in LIRR_FEEDS:
-            return {"error": f"Invalid LIRR feed: {feed_id}"}
+        header_timestamp, error = self._find_archived(category, feed_id, at)
+        if error:
+            return None, error
 
-        # Check cache
-        cache_key = f"lirr_{feed_id}"
-        cached_data = cache.get(cache_key, self.get_cache_timeout('lirr', feed_id))
+        try:
+            content = archive.read(feed_id, header_timestamp)
+        except (OSError, ValueError) as e:
+            return None, {"error": f"Failed to read archived snapshot: {str(e)}"}
+        if content is None:
+            return None, {"error": f"Archived snapshot of {feed_id} at {header_timestamp} was dropped"}
+        return content, None
+
+    def get_archived_feed(self, category, feed_id, at):
+        """
+        Get the archived snapshot of a realtime feed as of a point in time
+
+        Args:
+            category (str): Category ('subway', 'lirr', 'mnr', 'alerts')
+            feed_id (str): Feed ID
+            at (int): POSIX timestamp
+
+        Returns:
+            dict: Latest snapshot at or before `at`, parsed like a live feed, or error
+        """
+        header_timestamp, error = self._find_archived(category, feed_id, at)
+        if error:
+            return error
+
+        # Archived snapshots never change, so decoded ones are cached by header timestamp
+        cache_key = f"archive_{feed_id}_{header_timestamp}"
+        cached_data = cache.get(cache_key, self.get_cache_timeout('archive', feed_id))
+        if cached_data:
+            return self.materialize(cached_data)
+
+        try:
+            content = archive.read(feed_id, header_timestamp)
+        except (OSError, ValueError) as e:
+            return {"error": f"Failed to read archived snapshot: {str(e)}"}
+        if content is None:
+            return {"error": f"Archived snapshot of {feed_id} at {header_timestamp} was dropped"}
+
+        if category == 'alerts':
+            result = self.parse_gtfs_rt(content, feed_id)
+        else:
+            result = self.parse_gtfs_rt_columnar(content, feed_id)
+        if not isinstance(result, dict) or "error" not in result:
+            cache.set(cache_key, result)
+        return self.materialize(result)
+
+    def get_headway_analytics(self, route_id, start=None, end=None):
+        """
+        Get headway regularity, delay and bunching statistics for a subway route
+
+        Args:
+            route_id (str): Route ID
+            start (int): Range start as a POSIX timestamp (defaults to one hour before end)
+            end (int): Range end as a POSIX timestamp (defaults to now, rounded down to ANALYTICS_OPEN_END_STEP)
+
+        Returns:
+            dict: Route-wide and per-stop statistics from archived snapshots, or error
+        """
+        feed_id = SUBWAY_ROUTE_FEEDS.get(route_id)
+        if feed_id is None:
+            return {"error": f"Unknown subway route: {route_id}"}
+
+        if archive is None:
+            return {"error": "Snapshot archive is not enabled"}
+
+        if end is None:
+            # Open-ended ranges end on a step boundary so that repeated queries share a cache entry
+            now = int(time.time())
+            end = now - now % ANALYTICS_OPEN_END_STEP
+        if start is None:
+            start = end - 3600
+        if start >= end:
+            return {"error": "from must be earlier than to"}
+        if end - start > ANALYTICS_MAX_WINDOW_SECONDS:
+            return {"error": f"Range exceeds {ANALYTICS_MAX_WINDOW_SECONDS} seconds"}
+
+        cache_key = f"headways_{route_id}_{start}_{end}"
+        cached_data = cache.get(cache_key, self.get_cache_timeout('analytics', route_id))
         if cached_data:
             return cached_data
 
-        # Fetch data
+        from utils.headways import (
+            flatten_trip_updates, rollup_trip_updates, merge_rollups, select_buckets, rollup_columns,
+            final_arrivals, analyze_headways
+        )
+
+        # Whole rollup buckets of the range; snapshots before and after them are decoded
+        step = ANALYTICS_ROLLUP_SECONDS
+        inner_start = -(-start // step) * step
+        inner_end = (end + 1) // step * step
+
+        def decode(first, last):
+            return rollup_trip_updates(flatten_trip_updates(archive.iter_range(feed_id, first, last), route_id), step)
+
         try:
-            response = requests.get(LIRR_FEEDS[feed_id])
+            parts = [decode(start, end)] if inner_start >= inner_end else [
+                decode(start, inner_start - 1), decode(inner_end, end)
+            ]
+            for segment_path, timestamps in archive.segments(feed_id, inner_start, inner_end - 1):
+                rollups = self._headway_rollups(feed_id, segment_path, timestamps)
+                if inner_start <= timestamps[0] and timestamps[-1] < inner_end:
+                    parts.append(rollups["segment"])
+                else:
+                    parts.append(select_buckets(rollups["buckets"], inner_start, inner_end))
+        except (OSError, ValueError) as e:
+            return {"error": f"Failed to read archived snapshots: {str(e)}"}
+
+        rollup = merge_rollups(parts, route_id, group=0)
+        columns = rollup_columns(rollup)
+        result = {
+            "route_id": route_id,
+            "feed_id": feed_id,
+            "from": start,
+            "to": end,
+            "snapshots": int(rollup["group_snapshots"].sum()),
+            "observations": int(rollup["observations"].sum())
+        }
+        result.update(analyze_headways(final_arrivals(columns), columns["stop_ids"], ANALYTICS_BUNCHING_RATIO))
 
-            if response.status_code == 200:
-                # Parse GTFS-RT data
-                result = self.parse_gtfs_rt(response.content, feed_id)
+        cache.set(cache_key, result)
+        return result
 
-                # Cache result
-                cache.set(cache_key, result)
-                return result
-            else:
-                return {"error": f"HTTP error: {response.status_code}"}
+    def get_cached_feed(self, category, feed_id):
+        """
+        Validate a feed ID and look up its cached data
+
+        Args:
+            category (str): Category (key of FEED_CATEGORIES)
+            feed_id (str): Feed ID
+
+        Returns:
+            tuple: (cached data or None, error dict or None)
+        """
+        feeds, prefix, invalid_message = FEED_CATEGORIES[category]
+
+        # Validate feed_id
+        if feed_id not in feeds:
+            return None, {"error": invalid_message.format(feed_id)}
+
+        # Check cache
+        cached_data = cache.get(f"{prefix}_{feed_id}", self.get_cache_timeout(category, feed_id))
+        return cached_data or None, None
+
+    def _store_feed(self, category, feed_id, response):
+        """
+        Parse and cache a fetched upstream response
+
+        Shared by the sync getters and AsyncDataService, which fetches
+        asynchronously and runs this in an executor.
+
+        Args:
+            category (str): Category (key of FEED_CATEGORIES)
+            feed_id (str): Feed ID
+            response: Upstream response with status_code, content and json()
 
+        Returns:
+            ColumnarFeed, dict or list: Stored data, or error dict
+        """
+        if response.status_code != 200:
+            return {"error": f"HTTP error: {response.status_code}"}
+
+        if category == 'accessibility':
+            data = response.json()
+            cache.set(f"accessibility_{feed_id}", data)
+            encoded_snapshots.put(category, feed_id, data)
+            last_known_good[(category, feed_id)] = (data, time.time())
+
+            # The station index joins all accessibility feeds; rebuild on next lookup
+            cache.remove("accessibility_index")
+            return data
+
+        if category == 'alerts':
+            result = self.parse_gtfs_rt(response.content, feed_id)
+            if "error" not in result:
+                self._archive_snapshot(feed_id, result["header"]["timestamp"], response.content)
+            cache.set(f"alert_{feed_id}", result)
+            encoded_snapshots.put(category, feed_id, result, response.content)
+
+            # Rebuild the alert index for this refresh
+            if "error" not in result:
+                last_known_good[(category, feed_id)] = (result, time.time())
+                feed_cadences.observe(category, feed_id, result["header"]["timestamp"])
+                index = AlertIndex(result)
+                cache.set(f"alert_index_{feed_id}", index)
+                _notify_feed_listeners(category, feed_id, index)
+            return result
+
+        result = self.parse_gtfs_rt_columnar(response.content, feed_id)
+        if isinstance(result, dict):
+            return result
+        self._archive_snapshot(feed_id, result.timestamp, response.content,
+                               result if feed_id in SUBWAY_FEEDS else None)
+        cache.set(f"{category}_{feed_id}", result)
+        encoded_snapshots.put(category, feed_id, result, response.content)
+        last_known_good[(category, feed_id)] = (result, time.time())
+        feed_cadences.observe(category, feed_id, result.timestamp)
+        _notify_feed_listeners(category, feed_id, result)
+        return result
+
+    def _last_known_good(self, category, feed_id, error):
+        """
+        Fall back to a feed's last stored data after a failed refresh
+
+        Args:
+            category (str): Category (key of FEED_CATEGORIES)
+            feed_id (str): Feed ID
+            error (dict): Error of the failed refresh
+
+        Returns:
+            ColumnarFeed, dict or list: Last good data if recent enough, else the error
+        """
+        entry = last_known_good.get((category, feed_id))
+        if entry is None or time.time() - entry[1] > UPSTREAM_STALE_MAX_SECONDS:
+            return error
+        STALE_SERVED.inc(feed_id)
+        return entry[0]
+
+    def refresh_feed(self, category, feed_id):
+        """
+        Fetch and store a feed, bypassing the cache
+
+        Args:
+            category (str): Category (key of FEED_CATEGORIES)
+            feed_id (str): Feed ID
+
+        Returns:
+            ColumnarFeed, dict or list: Fresh data, last-known-good data if the fetch failed, or error dict
+        """
+        try:
+            response = self._fetch(feed_id, FEED_CATEGORIES[category][0][feed_id], category)
+            result = self._store_feed(category, feed_id, response)
         except Exception as e:
-            return {"error": str(e)}
+            result = {"error": str(e)}
+        if isinstance(result, dict) and "error" in result:
+            return self._last_known_good(category, feed_id, result)
+        return result
+
+    def get_feed(self, category, feed_id):
+        """
+        Get a feed from the cache, fetching it from upstream when stale
+
+        Args:
+            category (str): Category (key of FEED_CATEGORIES)
+            feed_id (str): Feed ID
+
+        Returns:
+            ColumnarFeed, dict or list: Feed data, or error dict
+        """
+        cached_data, error = self.get_cached_feed(category, feed_id)
+        if error or cached_data:
+            return error or cached_data
+
+        # Fetch data
+        return self.refresh_feed(category, feed_id)
+
+    def get_encoded_feed(self, category, feed_id, wire_format, encoder=None, route_id=None, variant=None):
+        """
+        Get a feed's current snapshot as a response body, encoded at most once per snapshot
+
+        Args:
+            category (str): Category (key of FEED_CATEGORIES)
+            feed_id (str): Feed ID
+            wire_format (str): 'protobuf' for the upstream GTFS-RT payload, else the encoder's format
+            encoder (callable): Encodes the parsed data (dict or list) for non-protobuf formats
+            route_id (str): protobuf only: keep just the entities of this route
+            variant (str): Other formats: distinguishes encodings of the same data (e.g. 'pretty')
+
+        Returns:
+            tuple: (bytes, None), or (None, error dict)
+        """
+        return self.encode_feed(category, feed_id, self.get_feed(category, feed_id), wire_format, encoder,
+                                route_id=route_id, variant=variant)
+
+    def encode_feed(self, category, feed_id, data, wire_format, encoder=None, route_id=None, variant=None):
+        """
+        Encode feed data already fetched by the caller, reusing the snapshot's cached body
+
+        Args:
+            category (str): Category (key of FEED_CATEGORIES)
+            feed_id (str): Feed ID
+            data: Result of get_feed() (or its async counterpart)
+            wire_format (str): See get_encoded_feed()
+            encoder (callable): See get_encoded_feed()
+            route_id (str): See get_encoded_feed()
+            variant (str): See get_encoded_feed()
+
+        Returns:
+            tuple: (bytes, None), or (None, error dict)
+        """
+        if isinstance(data, dict) and "error" in data:
+            return None, data
+
+        key = (wire_format, route_id if wire_format == 'protobuf' else variant)
+        body = encoded_snapshots.get(category, feed_id, data, key)
+        if body is not None:
+            return body, None
+
+        if wire_format == 'protobuf':
+            raw = encoded_snapshots.get(category, feed_id, data, ('protobuf', None))
+            if raw is None:
+                return None, {"error": f"{category} feed {feed_id} is not available as GTFS-RT protobuf"}
+            from utils.wire_formats import filter_feed_message
+            body = filter_feed_message(raw, route_id)
+        else:
+            body = encoder(self.materialize(data))
+
+        encoded_snapshots.set(category, feed_id, data, key, body)
+        return body, None
+
+    def get_realtime_snapshot(self, category, feed_id):
+        """
+        Get the cached columnar snapshot of a realtime feed, fetching it when stale
+
+        Args:
+            category (str): Category ('subway', 'lirr', 'mnr')
+            feed_id (str): Feed ID
+
+        Returns:
+            ColumnarFeed: Snapshot, or error dict
+        """
+        return self.get_feed(category, feed_id)
+
+    def get_subway_feed(self, feed_id):
+        """
+        Get data for specific subway line group
+
+        Args:
+            feed_id (str): Subway line group ID
+
+        Returns:
+            dict: Processed subway data or error
+        """
+        return self.materialize(self.get_realtime_snapshot('subway', feed_id))
+
+    def get_lirr_feed(self, feed_id):
+        """
+        Get LIRR data
+
+        Args:
+            feed_id (str): LIRR feed ID
+
+        Returns:
+            dict: Processed LIRR data or error
+        """
+        return self.materialize(self.get_realtime_snapshot('lirr', feed_id))
 
     def get_mnr_feed(self, feed_id):
         """
@@ -342,32 +1037,62 @@ class DataService:
         Returns:
             dict: Processed Metro-North data or error
         """
-        # Validate feed_id
-        if feed_id not in MNR_FEEDS:
-            return {"error": f"Invalid MNR feed: {feed_id}"}
+        return self.materialize(self.get_realtime_snapshot('mnr', feed_id))
 
-        # Check cache
-        cache_key = f"mnr_{feed_id}"
-        cached_data = cache.get(cache_key, self.get_cache_timeout('mnr', feed_id))
-        if cached_data:
-            return cached_data
+    def _refresh_realtime_feeds(self, agency):
+        """
+        Make sure the merged view holds current data of every feed of an agency
 
-        # Fetch data
-        try:
-            response = requests.get(MNR_FEEDS[feed_id])
+        Args:
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+
+        Returns:
+            dict: Feed ID -> error, for feeds that could not be refreshed
+        """
+        errors = {}
+        for feed_id in FEED_CATEGORIES[agency][0]:
+            data = self.get_feed(agency, feed_id)
+            if isinstance(data, dict) and "error" in data:
+                errors[feed_id] = data["error"]
+        return errors
+
+    def get_route_trips(self, route_id, agency=DEFAULT_AGENCY):
+        """
+        Get the active trips of a route across all of an agency's feeds, deduplicated
 
-            if response.status_code == 200:
-                # Parse GTFS-RT data
-                result = self.parse_gtfs_rt(response.content, feed_id)
+        Args:
+            route_id (str): Route ID
+            agency (str): Agency ('subway', 'lirr', 'mnr')
 
-                # Cache result
-                cache.set(cache_key, result)
-                return result
-            else:
-                return {"error": f"HTTP error: {response.status_code}"}
+        Returns:
+            dict: Trips of the route and the feeds that were unavailable
+        """
+        errors = self._refresh_realtime_feeds(agency)
+        trips = realtime_view.trips_for_route(agency, route_id)
+        return {
+            "agency": agency,
+            "route_id": route_id,
+            "count": len(trips),
+            "trips": trips,
+            "unavailable_feeds": errors
+        }
 
-        except Exception as e:
-            return {"error": str(e)}
+    def get_realtime_trip(self, trip_id, agency=DEFAULT_AGENCY):
+        """
+        Get the merged realtime state of a trip
+
+        Args:
+            trip_id (str): Trip ID
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+
+        Returns:
+            dict: Trip entries (one per start date) and unavailable feeds, or error
+        """
+        errors = self._refresh_realtime_feeds(agency)
+        trips = realtime_view.get_trip(agency, trip_id)
+        if not trips:
+            return {"error": f"No realtime data for trip {trip_id}"}
+        return {"agency": agency, "trip_id": trip_id, "trips": trips, "unavailable_feeds": errors}
 
     def get_service_alerts(self, alert_type):
         """
@@ -379,31 +1104,66 @@ class DataService:
         Returns:
             dict: Service alert data or error
         """
-        # Validate alert_type
-        if alert_type not in SERVICE_ALERT_FEEDS:
-            return {"error": f"Invalid alert type: {alert_type}"}
+        return self.get_feed('alerts', alert_type)
 
-        # Check cache
-        cache_key = f"alert_{alert_type}"
-        cached_data = cache.get(cache_key, self.get_cache_timeout('alerts', alert_type))
-        if cached_data:
-            return cached_data
+    def get_alert_index(self, alert_type):
+        """
+        Get the inverted index over a service alerts feed
 
-        try:
-            response = requests.get(SERVICE_ALERT_FEEDS[alert_type])
+        Args:
+            alert_type (str): Alert type
 
-            if response.status_code == 200:
-                # Parse GTFS-RT data
-                result = self.parse_gtfs_rt(response.content, alert_type)
+        Returns:
+            AlertIndex or dict: Alert index, or error
+        """
+        timeout = self.get_cache_timeout('alerts', alert_type)
+        cache_key = f"alert_index_{alert_type}"
+        index = cache.get(cache_key, timeout)
+        if index:
+            return index
+
+        # Refreshing the feed rebuilds the index
+        data = self.get_service_alerts(alert_type)
+        if "error" in data:
+            return data
+
+        index = cache.get(cache_key, timeout)
+        if not index:
+            # Feed was served from cache without an index (e.g. index evicted)
+            index = AlertIndex(data)
+            cache.set(cache_key, index)
+
+        return index
+
+    def get_active_alerts(self, alert_type, route_id=None, stop_id=None, at=None):
+        """
+        Get service alerts affecting a route and/or stop at a point in time
 
-                # Cache result
-                cache.set(cache_key, result)
-                return result
-            else:
-                return {"error": f"HTTP error: {response.status_code}"}
+        Args:
+            alert_type (str): Alert type
+            route_id (str): Route ID filter
+            stop_id (str): Stop ID filter
+            at (int): POSIX timestamp, defaults to now
 
-        except Exception as e:
-            return {"error": str(e)}
+        Returns:
+            dict: Matching alerts or error
+        """
+        index = self.get_alert_index(alert_type)
+        if isinstance(index, dict):
+            return index
+
+        if at is None:
+            at = int(datetime.datetime.now().timestamp())
+
+        alerts = index.query(route_id=route_id, stop_id=stop_id, at=at)
+        return {
+            "header": index.header,
+            "at": at,
+            "route_id": route_id,
+            "stop_id": stop_id,
+            "alert_count": len(alerts),
+            "alerts": alerts
+        }
 
     def get_accessibility_data(self, data_type):
         """
@@ -415,34 +1175,36 @@ class DataService:
         Returns:
             dict: Accessibility data or error
         """
-        # Validate data type
-        if data_type not in ELEVATOR_ESCALATOR_FEEDS:
-            return {"error": f"Invalid accessibility data type: {data_type}"}
+        return self.get_feed('accessibility', data_type)
 
-        # Check cache
-        cache_key = f"accessibility_{data_type}"
-        cached_data = cache.get(cache_key, self.get_cache_timeout('accessibility', data_type))
-        if cached_data:
-            return cached_data
+    def get_accessibility_index(self):
+        """
+        Get the station accessibility index joined with live outages
 
-        # Fetch data
-        try:
-            response = requests.get(ELEVATOR_ESCALATOR_FEEDS[data_type])
+        Returns:
+            AccessibilityIndex or dict: Accessibility index, or error
+        """
+        cache_key = "accessibility_index"
+        index = cache.get(cache_key, self.get_cache_timeout('accessibility', cache_key))
+        if index:
+            return index
 
-            if response.status_code == 200:
-                data = response.json()
-                # Cache result
-                cache.set(cache_key, data)
-                return data
-            else:
-                return {"error": f"HTTP error: {response.status_code}"}
+        # Equipment info is required, outage feeds are joined when available
+        equipment_data = self.get_accessibility_data('equipment')
+        if "error" in equipment_data:
+            return equipment_data
 
-        except Exception as e:
-            return {"error": str(e)}
+        index = AccessibilityIndex(
+            equipment_data,
+            self.get_accessibility_data('current'),
+            self.get_accessibility_data('upcoming')
+        )
+        cache.set(cache_key, index)
+        return index
 
     def get_station_accessibility(self, station_id):
         """
-        Get station accessibility info
+        Get station accessibility info with live equipment status
 
         Args:
             station_id (str): Station ID
@@ -450,46 +1212,51 @@ class DataService:
         Returns:
             dict: Station accessibility info
         """
-        # Get equipment info
-        equipment_data = self.get_accessibility_data('equipment')
+        index = self.get_accessibility_index()
+        if isinstance(index, dict):
+            return index
 
-        # Check for errors
-        if "error" in equipment_data:
-            return equipment_data
+        return index.get_station(station_id)
 
-        # Filter station-specific equipment
-        # Note: Adjust based on actual data structure
-        station_equipment = []
+    def get_stations_with_outages(self):
+        """
+        Get all stations with equipment currently out of service
 
-        # Assuming equipment_data is a dict with an equipment list
-        if "equipment" in equipment_data:
-            for item in equipment_data["equipment"]:
-                if item.get("station_id") == station_id:
-                    station_equipment.append(item)
+        Returns:
+            dict: Stations with outages
+        """
+        index = self.get_accessibility_index()
+        if isinstance(index, dict):
+            return index
 
-        # Return result
         return {
-            "station_id": station_id,
-            "equipment_count": len(station_equipment),
-            "equipment": station_equipment
+            "station_count": len(index.outage_stations),
+            "stations": index.outage_stations,
+            "errors": index.errors
         }
 
-    def get_stations(self):
+    def get_stations(self, agency=DEFAULT_AGENCY, dataset=None):
         """
         Get all stations data from GTFS stops.txt file
 
+        Args:
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+            dataset (StaticDataset): Release to read, defaults to get_static_dataset(agency)
+
         Returns:
             list: List of station objects
         """
         # Check cache
-        cache_key = "stations"
+        dataset = self.get_static_dataset(agency) if dataset is None else dataset
+        cache_key = dataset.key("stations")
         cached_data = cache.get(cache_key, self.get_cache_timeout('stations', 'stations'))
         if cached_data:
             return cached_data
 
+        start = time.perf_counter()
         try:
             # Load station data from stops.txt
-            stops_file = os.path.join('data', 'gtfs_subway', 'stops.txt')
+            stops_file = dataset.path('stops.txt')
 
             stations = []
 
@@ -500,36 +1267,43 @@ class DataService:
                     # In GTFS, location_type=0 or unspecified means a stop or station
                     if row.get('location_type', '0') == '0' or not row.get('location_type'):
                         station = {
-                            "id": row['stop_id'],
-                            "name": row['stop_name'],
+                            "id": sys.intern(row['stop_id']),
+                            "name": sys.intern(row['stop_name']),
                             "lat": float(row['stop_lat']),
                             "lng": float(row['stop_lon'])
                         }
                         stations.append(station)
 
             # Cache results
-            cache.set(cache_key, stations)
+            STATIC_LOAD_DURATION.observe(time.perf_counter() - start, 'stations')
+            self._cache_static(dataset, cache_key, stations)
             return stations
 
         except Exception as e:
             return {"error": f"Failed to load stations data: {str(e)}"}
 
-    def get_routes(self):
+    def get_routes(self, agency=DEFAULT_AGENCY, dataset=None):
         """
         Get all routes (subway lines) data
 
+        Args:
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+            dataset (StaticDataset): Release to read, defaults to get_static_dataset(agency)
+
         Returns:
             list: List of route objects
         """
         # Check cache
-        cache_key = "routes"
+        dataset = self.get_static_dataset(agency) if dataset is None else dataset
+        cache_key = dataset.key("routes")
         cached_data = cache.get(cache_key, self.get_cache_timeout('routes', 'routes'))
         if cached_data:
             return cached_data
 
+        start = time.perf_counter()
         try:
             # Load routes data from routes.txt
-            routes_file = os.path.join('data', 'gtfs_subway', 'routes.txt')
+            routes_file = dataset.path('routes.txt')
 
             routes = []
 
@@ -537,45 +1311,50 @@ class DataService:
                 reader = csv.DictReader(f)
                 for row in reader:
                     route = {
-                        "id": row['route_id'],
-                        "short_name": row['route_short_name'],
-                        "long_name": row['route_long_name'],
-                        "color": row.get('route_color', ''),
-                        "text_color": row.get('route_text_color', '')
+                        "id": sys.intern(row['route_id']),
+                        "short_name": sys.intern(row.get('route_short_name', '')),
+                        "long_name": sys.intern(row.get('route_long_name', '')),
+                        "color": sys.intern(row.get('route_color', '')),
+                        "text_color": sys.intern(row.get('route_text_color', ''))
                     }
                     routes.append(route)
 
             # Cache results
-            cache.set(cache_key, routes)
+            STATIC_LOAD_DURATION.observe(time.perf_counter() - start, 'routes')
+            self._cache_static(dataset, cache_key, routes)
             return routes
 
         except Exception as e:
             return {"error": f"Failed to load routes data: {str(e)}"}
 
-    def get_line_shape(self, route_id):
+    def get_line_shape(self, route_id, agency=DEFAULT_AGENCY, dataset=None):
         """
         Get shape coordinates for a specific route
 
         Args:
             route_id (str): Route ID
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+            dataset (StaticDataset): Release to read, defaults to get_static_dataset(agency)
 
         Returns:
             list: List of coordinate points along the route
         """
         # Check cache
-        cache_key = f"line_shape_{route_id}"
+        dataset = self.get_static_dataset(agency) if dataset is None else dataset
+        cache_key = dataset.key(f"line_shape_{route_id}")
         cached_data = cache.get(cache_key, self.get_cache_timeout('lines', route_id))
         if cached_data:
             return cached_data
 
+        start = time.perf_counter()
         try:
             # Process steps:
             # 1. Get trips for this route from trips.txt
             # 2. Extract shape_ids from trips
             # 3. Get coordinates for these shapes from shapes.txt
 
-            trips_file = os.path.join('data', 'gtfs_subway', 'trips.txt')
-            shapes_file = os.path.join('data', 'gtfs_subway', 'shapes.txt')
+            trips_file = dataset.path('trips.txt')
+            shapes_file = dataset.path('shapes.txt')
 
             # Get shape_ids for this route_id
             shape_ids = set()
@@ -617,37 +1396,42 @@ class DataService:
             }
 
             # Cache results
-            cache.set(cache_key, result)
+            STATIC_LOAD_DURATION.observe(time.perf_counter() - start, 'line_shape')
+            self._cache_static(dataset, cache_key, result)
             return result
 
         except Exception as e:
             return {"error": f"Failed to load shape data: {str(e)}"}
 
-    def get_line(self, line_id):
+    def get_line(self, line_id, agency=DEFAULT_AGENCY, dataset=None):
         """
         Get geographic coordinates for a specific line
 
         Args:
             line_id (str or int): Line ID
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+            dataset (StaticDataset): Release to read, defaults to get_static_dataset(agency)
 
         Returns:
             list: List of coordinate points along the line
         """
         # Check cache
-        cache_key = f"line_{line_id}"
+        dataset = self.get_static_dataset(agency) if dataset is None else dataset
+        cache_key = dataset.key(f"line_{line_id}")
         cached_data = cache.get(cache_key, self.get_cache_timeout('lines', line_id))
         if cached_data:
             return cached_data
 
+        start = time.perf_counter()
         try:
             # Initialize empty result list
             coordinates = []
 
             # Path to GTFS files
-            trips_file = os.path.join('data', 'gtfs_subway', 'trips.txt')
-            shapes_file = os.path.join('data', 'gtfs_subway', 'shapes.txt')
-            stops_file = os.path.join('data', 'gtfs_subway', 'stops.txt')
-            stop_times_file = os.path.join('data', 'gtfs_subway', 'stop_times.txt')
+            trips_file = dataset.path('trips.txt')
+            shapes_file = dataset.path('shapes.txt')
+            stops_file = dataset.path('stops.txt')
+            stop_times_file = dataset.path('stop_times.txt')
 
             # Check if files exist
             if not os.path.exists(trips_file) or not os.path.exists(shapes_file):
@@ -740,7 +1524,8 @@ class DataService:
 
             # Cache and return results
             if coordinates:
-                cache.set(cache_key, coordinates)
+                STATIC_LOAD_DURATION.observe(time.perf_counter() - start, 'line')
+                self._cache_static(dataset, cache_key, coordinates)
                 return coordinates
             else:
                 return {"error": f"No data found for line {line_id}"}
@@ -751,22 +1536,28 @@ class DataService:
             print(traceback.format_exc())
             return {"error": f"Failed to load line data: {str(e)}"}
 
-    def get_station_route_map(self):
+    def get_station_route_map(self, agency=DEFAULT_AGENCY, dataset=None):
         """
         Get mapping between stations and routes
 
+        Args:
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+            dataset (StaticDataset): Release to read, defaults to get_static_dataset(agency)
+
         Returns:
             dict: Mapping of station IDs to route IDs
         """
         # Check cache
-        cache_key = "station_route_map"
+        dataset = self.get_static_dataset(agency) if dataset is None else dataset
+        cache_key = dataset.key("station_route_map")
         cached_data = cache.get(cache_key, 86400)  # Cache for 24 hours
         if cached_data:
             return cached_data
 
+        start = time.perf_counter()
         try:
-            stop_times_file = os.path.join('data', 'gtfs_subway', 'stop_times.txt')
-            trips_file = os.path.join('data', 'gtfs_subway', 'trips.txt')
+            stop_times_file = dataset.path('stop_times.txt')
+            trips_file = dataset.path('trips.txt')
 
             # Create stop_id to trip_id mapping from stop_times.txt
             stop_to_trips = {}
@@ -793,27 +1584,30 @@ class DataService:
                 for trip_id in trips:
                     if trip_id in trip_to_route:
                         route_ids.add(trip_to_route[trip_id])
-                station_route_map[stop_id] = list(route_ids)
+                station_route_map[sys.intern(stop_id)] = [sys.intern(route_id) for route_id in route_ids]
 
             # Cache the result
-            cache.set(cache_key, station_route_map)
+            STATIC_LOAD_DURATION.observe(time.perf_counter() - start, 'station_route_map')
+            self._cache_static(dataset, cache_key, station_route_map)
             return station_route_map
 
         except Exception as e:
             return {"error": f"Failed to create station-route map: {str(e)}"}
 
-    def get_routes_for_station(self, station_id):
+    def get_routes_for_station(self, station_id, agency=DEFAULT_AGENCY):
         """
         Get all routes serving a specific station with details
 
         Args:
             station_id (str): Station ID
+            agency (str): Agency ('subway', 'lirr', 'mnr')
 
         Returns:
             dict: Routes information for the station
         """
         # Get station-route mapping
-        mapping = self.get_station_route_map()
+        dataset = self.get_static_dataset(agency)
+        mapping = self.get_station_route_map(agency, dataset)
         if "error" in mapping:
             return mapping
 
@@ -824,7 +1618,7 @@ class DataService:
 
         # Get route details
         routes = []
-        routes_file = os.path.join('data', 'gtfs_subway', 'routes.txt')
+        routes_file = dataset.path('routes.txt')
 
         try:
             with open(routes_file, 'r', encoding='utf-8') as f:
@@ -833,8 +1627,8 @@ class DataService:
                     if row['route_id'] in route_ids:
                         route = {
                             "id": row['route_id'],
-                            "short_name": row['route_short_name'],
-                            "long_name": row['route_long_name'],
+                            "short_name": row.get('route_short_name', ''),
+                            "long_name": row.get('route_long_name', ''),
                             "color": row.get('route_color', ''),
                             "text_color": row.get('route_text_color', '')
                         }
@@ -849,22 +1643,26 @@ class DataService:
             return {"error": f"Failed to get routes for station: {str(e)}"}
 
 
-    def get_stops_for_route(self, route_id):
+    def get_stops_for_route(self, route_id, agency=DEFAULT_AGENCY, dataset=None):
         """
         Get all stops for a specific route
 
         Args:
             route_id (str): Route ID
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+            dataset (StaticDataset): Release to read, defaults to get_static_dataset(agency)
 
         Returns:
             list: List of stops for the route
         """
         # Check cache
-        cache_key = f"route_stops_{route_id}"
+        dataset = self.get_static_dataset(agency) if dataset is None else dataset
+        cache_key = dataset.key(f"route_stops_{route_id}")
         cached_data = cache.get(cache_key, self.get_cache_timeout('route_stops', route_id))
         if cached_data:
             return cached_data
 
+        start = time.perf_counter()
         try:
             # Process steps:
             # 1. Get trips for this route from trips.txt
@@ -872,9 +1670,9 @@ class DataService:
             # 3. Get stops for each trip from stop_times.txt
             # 4. Get stop details from stops.txt
 
-            trips_file = os.path.join('data', 'gtfs_subway', 'trips.txt')
-            stop_times_file = os.path.join('data', 'gtfs_subway', 'stop_times.txt')
-            stops_file = os.path.join('data', 'gtfs_subway', 'stops.txt')
+            trips_file = dataset.path('trips.txt')
+            stop_times_file = dataset.path('stop_times.txt')
+            stops_file = dataset.path('stops.txt')
 
             # Get trip_ids for this route_id
             trip_ids = set()
@@ -902,8 +1700,8 @@ class DataService:
                 for row in reader:
                     if row['stop_id'] in stop_ids:
                         stop = {
-                            "id": row['stop_id'],
-                            "name": row['stop_name'],
+                            "id": sys.intern(row['stop_id']),
+                            "name": sys.intern(row['stop_name']),
                             "lat": float(row['stop_lat']),
                             "lng": float(row['stop_lon'])
                         }
@@ -915,8 +1713,24 @@ class DataService:
             }
 
             # Cache results
-            cache.set(cache_key, result)
+            STATIC_LOAD_DURATION.observe(time.perf_counter() - start, 'route_stops')
+            self._cache_static(dataset, cache_key, result)
             return result
 
         except Exception as e:
-            return {"error": f"Failed to load stops for route: {str(e)}"}
\ No newline at end of file
+            return {"error": f"Failed to load stops for route: {str(e)}"}
+
+
+def _warm_static_dataset(dataset, index):
+    """Build a new release's cached data before it is swapped in"""
+    service = DataService()
+    service.dataset = dataset
+    service.cache_static_index(index, dataset.agency)
+    for loader in (service.get_stations, service.get_routes):
+        loader(dataset.agency)
+
+
+static_datasets.set_hooks(
+    warm=_warm_static_dataset,
+    on_retire=lambda dataset: cache.remove_version(dataset.tag)
+)
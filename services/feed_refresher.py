@@ -0,0 +1,117 @@
+import heapq
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from services.data_service import DataService, FEED_CATEGORIES, feed_cadences
+from utils.metrics import metrics
+
+REFRESH_DURATION = metrics.histogram(
+    'feed_refresh_duration_seconds', 'Background feed refresh duration', ('category',))
+REFRESH_DELAY = metrics.gauge(
+    'feed_refresh_next_seconds', 'Seconds until the next scheduled background refresh', ('category', 'feed'))
+
+
+class FeedRefresher:
+    """
+    Background refresher fetching each feed just after its expected publish
+
+    Feeds are kept in a schedule ordered by due time. After every refresh,
+    the feed is rescheduled from its learned cadence (see FeedCadence): one
+    interval after the last publish when the fetch found a new one, or the
+    category's minimum interval while the publish is overdue. Fetches run
+    on a small pool so one slow feed does not hold up the others. While the
+    refresher runs, cached feeds stay valid for `grace` seconds past their
+    expected publish, so requests keep hitting the cache while the refresh
+    is in flight.
+
+    Threads don't survive fork, so the refresher starts on the first
+    request of each process, and every process refreshes its own cache.
+    """
+
+    def __init__(self, categories=('subway', 'lirr', 'mnr', 'alerts')):
+        """
+        Args:
+            categories (tuple): Feed categories to refresh (keys of FEED_CATEGORIES with header timestamps)
+        """
+        self.categories = categories
+        self.data_service = DataService()
+        self.condition = threading.Condition()
+        self.schedule = []  # heap of (due time, category, feed_id)
+        self.due = {}       # (category, feed_id) -> due time, for metrics
+        self.enabled = False
+        self.workers = 4
+        self.grace = 5
+        self.pid = None
+        self.executor = None
+
+    def init_app(self, app):
+        """
+        Start refreshing on the first request of each process when FEED_REFRESHER_ENABLED is set
+
+        Args:
+            app (Flask): Application
+        """
+        self.enabled = app.config.get('FEED_REFRESHER_ENABLED', False)
+        if not self.enabled:
+            return
+        self.workers = app.config.get('FEED_REFRESHER_WORKERS', 4)
+
+        @app.before_request
+        def start_feed_refresher():
+            self.start()
+
+    def start(self):
+        """Start the refresher thread in this process, unless it is running"""
+        if self.pid == os.getpid():
+            return
+        with self.condition:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='feed-refresher')
+            now = time.time()
+            self.schedule = [(now, category, feed_id)
+                             for category in self.categories for feed_id in FEED_CATEGORIES[category][0]]
+            heapq.heapify(self.schedule)
+            self.due = {(category, feed_id): due for due, category, feed_id in self.schedule}
+
+        feed_cadences.grace = self.grace
+        REFRESH_DELAY.set_function(lambda: {key: max(0, due - time.time()) for key, due in list(self.due.items())})
+        threading.Thread(target=self._run, name='feed-refresher', daemon=True).start()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while True:
+                    delay = self.schedule[0][0] - time.time() if self.schedule else None
+                    if delay is not None and delay <= 0:
+                        break
+                    self.condition.wait(delay)
+                _, category, feed_id = heapq.heappop(self.schedule)
+            self.executor.submit(self.refresh, category, feed_id)
+
+    def refresh(self, category, feed_id):
+        """
+        Refresh one feed and schedule its next refresh
+
+        Args:
+            category (str): Feed category
+            feed_id (str): Feed ID
+        """
+        start = time.perf_counter()
+        try:
+            self.data_service.refresh_feed(category, feed_id)
+        except Exception as e:
+            print(f"Refreshing {category}/{feed_id} failed: {str(e)}")
+        REFRESH_DURATION.observe(time.perf_counter() - start, category)
+
+        now = time.time()
+        due = now + feed_cadences.get(category, feed_id).next_fetch_delay(now)
+        with self.condition:
+            heapq.heappush(self.schedule, (due, category, feed_id))
+            self.due[(category, feed_id)] = due
+            self.condition.notify()
+
+
+feed_refresher = FeedRefresher()
@@ -0,0 +1,417 @@
+import datetime
+import importlib
+import os
+import queue
+import threading
+import time
+from utils.metrics import metrics
+from utils.notification_index import NotificationIndex
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows: every process notifies there
+    fcntl = None
+
+NOTIFICATION_EVENTS = metrics.counter(
+    'notification_events_total', 'Alert and delay events evaluated for notifications', ('source',))
+NOTIFICATIONS_SENT = metrics.counter('notifications_sent_total', 'Notifications handed to the sink', ('sink',))
+NOTIFICATION_SETTINGS = metrics.gauge('notification_settings_indexed', 'Enabled notification settings in the index')
+NOTIFICATION_EVENTS_DROPPED = metrics.counter(
+    'notification_events_dropped_total', 'Events dropped because the notification queue was full', ('source',))
+
+# GTFS-RT Alert.Effect values reported as "delay"; every other effect is a "service_change"
+DELAY_EFFECTS = {3}  # SIGNIFICANT_DELAYS
+
+
+class LogNotificationSink:
+    """Sink that logs each batch of notifications"""
+
+    name = 'log'
+
+    def __init__(self, logger=None):
+        self.logger = logger
+
+    def send(self, notifications):
+        """
+        Deliver a batch of notifications
+
+        Args:
+            notifications (list): Notification dicts
+        """
+        for notification in notifications:
+            message = (f"Notify user {notification['user_id']}: {notification['notification_type']} "
+                       f"({len(notification['events'])} events)")
+            if self.logger is not None:
+                self.logger.info(message)
+            else:
+                print(message)
+
+
+class MemoryNotificationSink:
+    """Sink that keeps every batch in memory, for local runs and tests"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.batches = []
+
+    def send(self, notifications):
+        """
+        Deliver a batch of notifications
+
+        Args:
+            notifications (list): Notification dicts
+        """
+        with self.lock:
+            self.batches.append(list(notifications))
+
+    def drain(self):
+        """
+        Take the notifications sent so far
+
+        Returns:
+            list: Notification dicts, oldest first
+        """
+        with self.lock:
+            batches, self.batches = self.batches, []
+        return [notification for batch in batches for notification in batch]
+
+
+SINKS = {
+    'log': LogNotificationSink,
+    'memory': MemoryNotificationSink
+}
+
+
+def create_sink(name):
+    """
+    Create a notification sink
+
+    Args:
+        name (str): 'log', 'memory', or 'package.module:ClassName' for a custom sink
+
+    Returns:
+        object: Sink with a send(notifications) method
+    """
+    if name in SINKS:
+        return SINKS[name]()
+    module_name, _, class_name = name.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def _parent_station(stop_id):
+    """Strip the N/S direction suffix of a subway platform stop ID"""
+    if stop_id and stop_id[-1] in 'NS' and len(stop_id) > 1:
+        return stop_id[:-1]
+    return stop_id
+
+
+class NotificationService:
+    """
+    Matches feed refreshes against users' NotificationSetting rows
+
+    The enabled settings are held in a NotificationIndex, loaded once and
+    then updated from SQLAlchemy commit events, so a feed refresh never
+    queries the users table. Each refresh is diffed against the previous one
+    of the same feed: alerts that became active produce "service_change" or
+    "delay" events, and routes and stations whose predicted delay crossed
+    NOTIFICATION_DELAY_THRESHOLD produce "delay" events. All events of a
+    refresh are matched in one pass and delivered to the sink in batches.
+
+    Every process keeps its own index and diff state, so only the process
+    holding an exclusive flock on NOTIFICATION_LOCK_FILE evaluates refreshes;
+    the other workers skip them, and one of them takes over if the owner
+    exits. The owner reloads the settings every
+    NOTIFICATION_SETTINGS_RELOAD_SECONDS to pick up changes committed by
+    other processes. Matching and sink.send() run on a sender thread, so a
+    slow sink never holds up a feed refresh.
+    """
+
+    def __init__(self):
+        self.index = NotificationIndex()
+        self.sink = None
+        self.enabled = False
+        self.listening = False
+        self.delay_threshold = 300
+        self.batch_size = 500
+        self.queue_size = 100
+        self.reload_seconds = 60
+        self.lock_path = None
+        self.app = None
+        self.lock = threading.Lock()
+        self.active_alerts = {}    # feed ID -> alert IDs active at the last refresh
+        self.delayed_stops = {}    # feed ID -> (route_id, stop_id) pairs delayed at the last refresh
+        self.lock_file = None      # Open NOTIFICATION_LOCK_FILE of lock_file_pid
+        self.lock_file_pid = None
+        self.owner_pid = None      # Process holding the lock
+        self.loaded_at = None      # time.monotonic() of the last settings load by the owner
+        self.queue = None
+        self.sender_pid = None
+
+    def init_app(self, app):
+        """
+        Load settings, track their changes and subscribe to feed refreshes
+
+        Args:
+            app (Flask): Application
+        """
+        self.enabled = app.config.get('NOTIFICATIONS_ENABLED', False)
+        if not self.enabled:
+            return
+        self.delay_threshold = app.config.get('NOTIFICATION_DELAY_THRESHOLD', 300)
+        self.batch_size = app.config.get('NOTIFICATION_BATCH_SIZE', 500)
+        self.queue_size = app.config.get('NOTIFICATION_QUEUE_SIZE', 100)
+        self.reload_seconds = app.config.get('NOTIFICATION_SETTINGS_RELOAD_SECONDS', 60)
+        self.lock_path = app.config.get('NOTIFICATION_LOCK_FILE')
+        self.app = app
+        self.sink = create_sink(app.config.get('NOTIFICATION_SINK', 'log'))
+        if isinstance(self.sink, LogNotificationSink):
+            self.sink.logger = app.logger
+
+        if not self.listening:
+            # Session events and feed listeners are process-wide; register them once
+            self._listen_for_setting_changes()
+            from services.data_service import add_feed_listener
+            add_feed_listener(self.on_feed)
+            self.listening = True
+
+        with app.app_context():
+            try:
+                self.load_settings()
+            except Exception as e:
+                app.logger.warning("Loading notification settings failed: %s", e)
+
+    def load_settings(self):
+        """Rebuild the index from the database (needs an app context)"""
+        from models import db, NotificationSetting
+
+        rows = db.session.query(
+            NotificationSetting.id, NotificationSetting.user_id, NotificationSetting.notification_type,
+            NotificationSetting.route_id, NotificationSetting.station_id, NotificationSetting.is_enabled
+        ).all()
+        self.index.load(rows)
+        NOTIFICATION_SETTINGS.set(len(self.index.settings))
+
+    def is_owner(self):
+        """
+        Whether this process delivers notifications, taking the owner lock when it is free
+
+        Returns:
+            bool: True if this process holds NOTIFICATION_LOCK_FILE (or no lock is configured)
+        """
+        if not self.lock_path or fcntl is None:
+            return True
+        pid = os.getpid()
+        with self.lock:
+            if self.owner_pid == pid:
+                return True
+            # A descriptor inherited across fork shares the parent's lock, so each process opens its own
+            if self.lock_file_pid != pid:
+                self.lock_file = open(self.lock_path, 'a')
+                self.lock_file_pid = pid
+            try:
+                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return False
+            self.owner_pid = pid
+            # Diff baselines and settings of a previous stint as owner are stale
+            self.active_alerts = {}
+            self.delayed_stops = {}
+            self.loaded_at = None
+            return True
+
+    def _reload_settings(self):
+        """Reload the settings when the owner's copy is older than NOTIFICATION_SETTINGS_RELOAD_SECONDS"""
+        now = time.monotonic()
+        if self.app is None or (self.loaded_at is not None and now - self.loaded_at < self.reload_seconds):
+            return
+        self.loaded_at = now
+        with self.app.app_context():
+            try:
+                self.load_settings()
+            except Exception as e:
+                self.app.logger.warning("Reloading notification settings failed: %s", e)
+
+    def _listen_for_setting_changes(self):
+        from sqlalchemy import event
+        from sqlalchemy.orm import Session
+        from models import NotificationSetting
+
+        def record(session, target, deleted=False):
+            changes = session.info.setdefault('notification_setting_changes', [])
+            changes.append((target.id, None) if deleted else (target.id, (
+                target.id, target.user_id, target.notification_type,
+                target.route_id, target.station_id, target.is_enabled
+            )))
+
+        @event.listens_for(Session, 'after_flush')
+        def after_flush(session, flush_context):
+            for target in session.new | session.dirty:
+                if isinstance(target, NotificationSetting):
+                    record(session, target)
+            for target in session.deleted:
+                if isinstance(target, NotificationSetting):
+                    record(session, target, deleted=True)
+
+        # Only committed changes reach the index
+        @event.listens_for(Session, 'after_commit')
+        def after_commit(session):
+            for setting_id, setting in session.info.pop('notification_setting_changes', []):
+                if setting is None:
+                    self.index.remove(setting_id)
+                else:
+                    self.index.apply(setting)
+            NOTIFICATION_SETTINGS.set(len(self.index.settings))
+
+        @event.listens_for(Session, 'after_rollback')
+        def after_rollback(session):
+            session.info.pop('notification_setting_changes', None)
+
+    def alert_events(self, feed_id, alert_index, at=None):
+        """
+        Get events for alerts that became active since the feed's last refresh
+
+        Args:
+            feed_id (str): Alerts feed ID
+            alert_index (AlertIndex): Index of the refreshed feed
+            at (int): POSIX timestamp, defaults to now
+
+        Returns:
+            list: Event dicts
+        """
+        if at is None:
+            at = int(datetime.datetime.now().timestamp())
+
+        active = {}
+        for position in alert_index.active_at(at):
+            entity = alert_index.alerts[position]
+            active[entity.get("id")] = entity
+
+        with self.lock:
+            previous = self.active_alerts.get(feed_id)
+            self.active_alerts[feed_id] = set(active)
+        if previous is None:
+            # First refresh seen by this process: record the baseline, don't notify
+            return []
+
+        events = []
+        for alert_id in active.keys() - previous:
+            alert = active[alert_id]["alert"]
+            notification_type = 'delay' if alert.get("effect") in DELAY_EFFECTS else 'service_change'
+            for informed in alert.get("informed_entity", []):
+                if "route_id" not in informed and "stop_id" not in informed:
+                    continue
+                events.append({
+                    "notification_type": notification_type,
+                    "route_id": informed.get("route_id"),
+                    "station_id": _parent_station(informed.get("stop_id")),
+                    "source": feed_id,
+                    "alert_id": alert_id,
+                    "header_text": alert.get("header_text")
+                })
+        return events
+
+    def delay_events(self, feed_id, snapshot):
+        """
+        Get events for stops that became delayed since the feed's last refresh
+
+        Args:
+            feed_id (str): Realtime feed ID
+            snapshot (ColumnarFeed): Refreshed snapshot
+
+        Returns:
+            list: Event dicts
+        """
+        delayed = snapshot.delayed_stops(self.delay_threshold)
+        with self.lock:
+            previous = self.delayed_stops.get(feed_id)
+            self.delayed_stops[feed_id] = delayed
+        if previous is None:
+            return []
+
+        return [{
+            "notification_type": 'delay',
+            "route_id": route_id,
+            "station_id": _parent_station(stop_id),
+            "source": feed_id
+        } for route_id, stop_id in delayed - previous]
+
+    def dispatch(self, events):
+        """
+        Match events against the index and send the resulting notifications
+
+        Args:
+            events (list): Event dicts
+
+        Returns:
+            int: Notifications sent
+        """
+        if not events or self.sink is None:
+            return 0
+
+        notifications = []
+        for user_id, user_events in self.index.match(events).items():
+            by_type = {}
+            for event in user_events:
+                by_type.setdefault(event["notification_type"], []).append(event)
+            for notification_type, type_events in by_type.items():
+                notifications.append({
+                    "user_id": user_id,
+                    "notification_type": notification_type,
+                    "events": type_events
+                })
+
+        for start in range(0, len(notifications), self.batch_size):
+            self.sink.send(notifications[start:start + self.batch_size])
+        NOTIFICATIONS_SENT.inc(getattr(self.sink, 'name', type(self.sink).__name__), amount=len(notifications))
+        return len(notifications)
+
+    def _enqueue(self, category, events):
+        """Hand events to this process's sender thread, starting it on first use"""
+        if self.sender_pid != os.getpid():
+            with self.lock:
+                if self.sender_pid != os.getpid():
+                    # Threads don't survive fork, so each process starts its own sender
+                    self.queue = queue.Queue(self.queue_size)
+                    threading.Thread(target=self._send_loop, args=(self.queue, ),
+                                     name='notification-sender', daemon=True).start()
+                    self.sender_pid = os.getpid()
+        try:
+            self.queue.put_nowait(events)
+        except queue.Full:
+            NOTIFICATION_EVENTS_DROPPED.inc(category, amount=len(events))
+
+    def _send_loop(self, events_queue):
+        while True:
+            events = events_queue.get()
+            try:
+                self.dispatch(events)
+            except Exception as e:
+                print(f"Notification dispatch failed: {str(e)}")
+            finally:
+                events_queue.task_done()
+
+    def on_feed(self, category, feed_id, data):
+        """
+        Feed listener: evaluate a refreshed alerts index or realtime snapshot
+
+        Args:
+            category (str): Feed category
+            feed_id (str): Feed ID
+            data: AlertIndex for 'alerts', ColumnarFeed for realtime categories
+        """
+        if category not in ('alerts', 'subway', 'lirr', 'mnr') or not self.is_owner():
+            return
+        self._reload_settings()
+
+        if category == 'alerts':
+            events = self.alert_events(feed_id, data)
+        else:
+            events = self.delay_events(feed_id, data)
+        NOTIFICATION_EVENTS.inc(category, amount=len(events))
+        if events:
+            self._enqueue(category, events)
+
+
+notification_service = NotificationService()
@@ -1,3 +1,5 @@
+from sqlalchemy import literal, or_, select
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
 from models import db, User, FavoriteRoute, FavoriteStation, NotificationSetting
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -8,7 +10,7 @@ class UserService:
     def create_user(self, username, email, password):
         """Create a new user"""
         # Check if username or email already exists
-        if User.query.filter_by(username=username).first() or User.query.filter_by(email=email).first():
+        if User.query.filter(or_(User.username == username, User.email == email)).first():
             return None, "Username or email already exists"
 
         # Create new user
@@ -23,27 +25,137 @@ class UserService:
 
         return user, None
 
+    def _insert_favorites(self, model, column, user_id, item_ids):
+        """
+        Insert favorites, skipping ones the user already has, in one statement
+
+        Args:
+            model: FavoriteRoute or FavoriteStation
+            column (str): Item column ('route_id' or 'station_id')
+            user_id (int): User ID
+            item_ids (list): Item IDs
+
+        Returns:
+            tuple: (list of inserted favorites, error message or None)
+        """
+        item_ids = list(dict.fromkeys(item_ids))
+        if not item_ids:
+            return [], None
+
+        rows = [{"user_id": user_id, column: item_id} for item_id in item_ids]
+        dialect = db.session.get_bind().dialect.name
+        for _ in range(2):
+            try:
+                inserted = None
+                if dialect in ('sqlite', 'postgresql'):
+                    inserted = self._insert_on_conflict(model, column, rows, dialect)
+                if inserted is None:
+                    existing = set(db.session.scalars(select(getattr(model, column)).where(
+                        model.user_id == user_id, getattr(model, column).in_(item_ids))))
+                    inserted = [model(**row) for row in rows if row[column] not in existing]
+                    db.session.add_all(inserted)
+                    db.session.flush()
+                db.session.commit()
+                return inserted, None
+            except IntegrityError:
+                db.session.rollback()
+                # Foreign key violation: no such user
+                if db.session.get(User, user_id) is None:
+                    return [], "User not found"
+                # Unique violation: a concurrent request added some of these; retry so they are skipped
+
+        return [], "Favorites were changed concurrently, please retry"
+
+    def _insert_on_conflict(self, model, column, rows, dialect):
+        """
+        INSERT ... ON CONFLICT DO NOTHING RETURNING the new favorites
+
+        Returns:
+            list: Inserted favorites, or None when the database lacks the
+                  (user_id, item) unique index (migrations not applied)
+        """
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        # The (user_id, item) unique constraint turns duplicates into no-ops
+        statement = insert(model).values(rows).on_conflict_do_nothing(
+            index_elements=['user_id', column]).returning(model)
+        try:
+            return list(db.session.scalars(statement))
+        except (OperationalError, ProgrammingError):
+            # No unique index matches the conflict target; run `flask db upgrade`
+            db.session.rollback()
+            return None
+
+    def _delete_favorites(self, model, column, user_id, item_ids):
+        """Delete favorites in one statement; returns the number removed"""
+        result = db.session.execute(db.delete(model).where(
+            model.user_id == user_id, getattr(model, column).in_(list(item_ids))))
+        db.session.commit()
+        return result.rowcount
+
     def add_favorite_route(self, user_id, route_id):
         """Add a favorite route"""
-        # Check if user exists
-        user = User.query.get(user_id)
-        if not user:
-            return None, "User not found"
-
-        # Check if route is already favorited
-        existing = (FavoriteRoute.query.
-                    filter_by(user_id=user_id, route_id=route_id).first())
-        if existing:
+        inserted, error = self._insert_favorites(FavoriteRoute, 'route_id', user_id, [route_id])
+        if error:
+            return None, error
+        if not inserted:
+            existing = FavoriteRoute.query.filter_by(user_id=user_id, route_id=route_id).first()
             return existing, "Route already favorited"
 
-        # Add new favorite
-        favorite = FavoriteRoute(user_id=user_id, route_id=route_id)
-        db.session.add(favorite)
-        db.session.commit()
+        return inserted[0], None
+
+    def add_favorite_routes(self, user_id, route_ids):
+        """Add several favorite routes; already favorited ones are skipped"""
+        return self._insert_favorites(FavoriteRoute, 'route_id', user_id, route_ids)
+
+    def remove_favorite_routes(self, user_id, route_ids):
+        """Remove favorite routes; returns the number removed"""
+        return self._delete_favorites(FavoriteRoute, 'route_id', user_id, route_ids)
+
+    def add_favorite_station(self, user_id, station_id):
+        """Add a favorite station"""
+        inserted, error = self._insert_favorites(FavoriteStation, 'station_id', user_id, [station_id])
+        if error:
+            return None, error
+        if not inserted:
+            existing = FavoriteStation.query.filter_by(user_id=user_id, station_id=station_id).first()
+            return existing, "Station already favorited"
+
+        return inserted[0], None
 
-        return favorite, None
+    def add_favorite_stations(self, user_id, station_ids):
+        """Add several favorite stations; already favorited ones are skipped"""
+        return self._insert_favorites(FavoriteStation, 'station_id', user_id, station_ids)
+
+    def remove_favorite_stations(self, user_id, station_ids):
+        """Remove favorite stations; returns the number removed"""
+        return self._delete_favorites(FavoriteStation, 'station_id', user_id, station_ids)
 
     def get_user_favorite_routes(self, user_id):
         """Get user's favorite routes"""
         return FavoriteRoute.query.filter_by(user_id=user_id).all()
 
+    def get_user_favorite_stations(self, user_id):
+        """Get user's favorite stations"""
+        return FavoriteStation.query.filter_by(user_id=user_id).all()
+
+    def get_user_favorites(self, user_id):
+        """Get user's favorite routes and stations in one query"""
+        routes = db.session.query(
+            literal('route').label('kind'),
+            FavoriteRoute.route_id.label('item_id'),
+            FavoriteRoute.added_at.label('added_at')
+        ).filter(FavoriteRoute.user_id == user_id)
+        stations = db.session.query(
+            literal('station').label('kind'),
+            FavoriteStation.station_id.label('item_id'),
+            FavoriteStation.added_at.label('added_at')
+        ).filter(FavoriteStation.user_id == user_id)
+
+        favorites = {"routes": [], "stations": []}
+        for kind, item_id, added_at in routes.union_all(stations).order_by('added_at'):
+            favorites[f"{kind}s"].append({"id": item_id, "added_at": added_at})
+        return favorites
+
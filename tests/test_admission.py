@@ -0,0 +1,47 @@
+import pytest
+from flask import request
+from app import create_app
+from utils.admission import admission
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'JWT_SECRET_KEY': 'test-secret-key-of-at-least-32-bytes',
+        'ADMISSION_ENABLED': True,
+        'ADMISSION_CLIENT_HEADER': 'X-Forwarded-For'
+    })
+    yield app
+    admission.enabled = False
+
+
+def tokens_left(client):
+    return admission.buckets.buckets[client][0]
+
+
+def test_client_is_the_proxy_appended_hop(app):
+    client = app.test_client()
+    client.get('/api/feeds', headers={'X-Forwarded-For': '10.0.0.1, 203.0.113.7'})
+    client.get('/api/feeds', headers={'X-Forwarded-For': '10.0.0.2, 203.0.113.7'})
+
+    # Spoofed left-most entries don't give the client fresh buckets
+    assert set(admission.buckets.buckets) == {'203.0.113.7'}
+    assert tokens_left('203.0.113.7') == pytest.approx(admission.buckets.burst - 2, abs=0.5)
+
+
+def test_batch_takes_the_tokens_of_its_sub_requests(app):
+    costs = {name: settings['cost'] for name, settings in admission.classes.items()}
+    requests = [
+        {"path": "/api/feeds"},
+        {"path": "/api/feeds"},
+        {"path": "/api/realtime/trips/123"},
+        {"path": "/api/stations"},
+    ]
+
+    assert admission.path_cost(app, '/api/realtime/trips/123') == costs['expensive']
+    with app.test_request_context('/api/batch', method='POST', json={"requests": requests}):
+        # Duplicates are dispatched once and charged once
+        tokens = app.view_functions['api.batch'].admission_tokens(request)
+    assert tokens == costs['cheap'] + costs['expensive'] + costs['cheap']
@@ -0,0 +1,20 @@
+import pytest
+from utils.cache import key_prefix
+
+
+@pytest.mark.parametrize('key, prefix', [
+    ('subway_ace', 'subway'),
+    ('alert_all_alerts', 'alert'),
+    ('alert_index_all_alerts', 'alert_index'),
+    ('accessibility_equipment', 'accessibility'),
+    ('accessibility_index', 'accessibility_index'),
+    ('stations@subway:abc123', 'stations'),
+    ('station_route_map@subway:abc123', 'station_route_map'),
+    ('routes@subway:abc123', 'routes'),
+    ('route_stops_A@subway:abc123', 'route_stops'),
+    ('line_A@subway:abc123', 'line'),
+    ('line_shape_A@subway:abc123', 'line_shape'),
+    ('headways_A_0_3600', 'headways')
+])
+def test_key_prefix_separates_cache_families(key, prefix):
+    assert key_prefix(key) == prefix
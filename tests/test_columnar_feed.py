@@ -0,0 +1,13 @@
+from benchmarks.synthetic_feed import generate_feed_bytes
+from services.data_service import DataService
+from utils.columnar_feed import ColumnarFeed
+
+
+def test_to_dict_matches_parse_gtfs_rt_including_alerts():
+    content = generate_feed_bytes(trips=200, stop_time_updates=10, vehicles=200, alerts=5, seed=31)
+
+    expected = DataService().parse_gtfs_rt(content, '1')
+    snapshot = ColumnarFeed.from_bytes(content, '1')
+
+    assert len(snapshot.alerts) == 5
+    assert snapshot.to_dict() == expected
@@ -0,0 +1,34 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from models import db
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'JWT_SECRET_KEY': 'test-secret-key-of-at-least-32-bytes'
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+def test_dashboard_without_token_is_unauthorized(app):
+    response = app.test_client().get('/api/users/1/dashboard')
+
+    assert response.status_code == 401
+
+
+def test_dashboard_with_token(app):
+    token = create_access_token(identity='1')
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+
+    response = client.get('/api/users/1/dashboard', headers=headers)
+    assert response.status_code == 200
+    assert response.json["routes"] == [] and response.json["stations"] == []
+
+    assert client.get('/api/users/2/dashboard', headers=headers).status_code == 403
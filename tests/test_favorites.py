@@ -0,0 +1,90 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from models import db, User
+
+
+@pytest.fixture
+def app():
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'JWT_SECRET_KEY': 'test-secret-key-of-at-least-32-bytes'
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, username='rider', email='rider@example.com'))
+        db.session.commit()
+        yield app
+
+
+@pytest.mark.parametrize('method, path', [
+    ('get', '/api/users/1/favorites/routes'),
+    ('post', '/api/users/1/favorites/routes'),
+    ('delete', '/api/users/1/favorites/routes'),
+    ('get', '/api/users/1/favorites/stations'),
+    ('post', '/api/users/1/favorites/stations'),
+    ('delete', '/api/users/1/favorites/stations')
+])
+def test_favorites_without_token_are_unauthorized(app, method, path):
+    response = getattr(app.test_client(), method)(path, json={})
+
+    assert response.status_code == 401
+
+
+def test_favorite_routes_with_token(app):
+    headers = {'Authorization': f"Bearer {create_access_token(identity='1')}"}
+    client = app.test_client()
+
+    response = client.post('/api/users/1/favorites/routes', json={"route_ids": ["A", "C"]}, headers=headers)
+    assert response.status_code == 201
+    assert response.json == {"added": ["A", "C"]}
+
+    response = client.post('/api/users/1/favorites/routes', json={"route_ids": ["A", "E"]}, headers=headers)
+    assert response.json == {"added": ["E"]}
+
+    routes = client.get('/api/users/1/favorites/routes', headers=headers).json
+    assert sorted(favorite["route_id"] for favorite in routes) == ["A", "C", "E"]
+
+    response = client.delete('/api/users/1/favorites/routes', json={"route_ids": ["C"]}, headers=headers)
+    assert response.json == {"removed": 1}
+
+    assert client.get('/api/users/2/favorites/routes', headers=headers).status_code == 403
+
+
+def test_favorite_stations_with_token(app):
+    headers = {'Authorization': f"Bearer {create_access_token(identity='1')}"}
+    client = app.test_client()
+
+    response = client.post('/api/users/1/favorites/stations', json={"station_id": "127"}, headers=headers)
+    assert response.status_code == 201
+
+    stations = client.get('/api/users/1/favorites/stations', headers=headers).json
+    assert [favorite["station_id"] for favorite in stations] == ["127"]
+
+
+def test_concurrent_duplicate_on_fallback_is_not_a_missing_user(app, monkeypatch):
+    from models import FavoriteRoute
+    from services.user_service import UserService
+
+    service = UserService()
+    # Database without the unique index's conflict target: the select-then-insert fallback runs
+    monkeypatch.setattr(service, '_insert_on_conflict', lambda *args: None)
+    db.session.add(FavoriteRoute(user_id=1, route_id='A'))
+    db.session.commit()
+
+    # The first lookup misses the favorite, as if another request added it in between
+    scalars = db.session.scalars
+    calls = []
+
+    def racing_scalars(*args, **kwargs):
+        calls.append(args)
+        return iter(()) if len(calls) == 1 else scalars(*args, **kwargs)
+
+    monkeypatch.setattr(db.session, 'scalars', racing_scalars)
+
+    inserted, error = service.add_favorite_routes(1, ['A', 'C'])
+
+    assert error is None
+    assert [favorite.route_id for favorite in inserted] == ['C']
+    assert service.add_favorite_routes(2, ['A']) == ([], "User not found")
@@ -0,0 +1,52 @@
+import time
+import pytest
+import services.data_service as data_service
+from benchmarks.synthetic_feed import generate_feed_bytes
+from services.data_service import DataService
+from utils.archive import SnapshotArchive
+from utils.columnar_feed import ColumnarFeed
+from utils.headways import flatten_trip_updates, final_arrivals, analyze_headways
+
+STATION_IDS = [f"A{number:02d}" for number in range(1, 13)]
+
+
+@pytest.fixture(scope='module')
+def archived(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        archive = SnapshotArchive(str(tmp_path_factory.mktemp('archive')), codec='gzip')
+        monkeypatch.setattr(data_service, 'archive', archive)
+        yield _archive_snapshots(DataService())
+
+
+def _archive_snapshots(service):
+    """Archive 2h15m of minutely snapshots; trips change every ten minutes"""
+    now = int(time.time())
+    base = now - now % 3600 - 2 * 3600
+    snapshots = []
+    for offset in range(0, 2 * 3600 + 900, 60):
+        content = generate_feed_bytes(trips=20, stop_time_updates=5, vehicles=0, timestamp=base + offset,
+                                      seed=offset // 600, route_ids=['A', 'C'], station_ids=STATION_IDS)
+        snapshots.append((base + offset, content))
+        # Rollups follow the archive when the parsed snapshot is at hand, else catch up on query
+        parsed = ColumnarFeed.from_bytes(content, 'ace') if offset % 600 else None
+        service._archive_snapshot('ace', base + offset, content, parsed)
+    return service, base, snapshots
+
+
+@pytest.mark.parametrize('start_offset, end_offset', [
+    (17, 2 * 3600 + 800),   # Partial buckets at both ends, whole segments between
+    (3600, 7199),           # Exactly one segment
+    (100, 250),             # Within one bucket
+    (0, 5000)
+])
+def test_analytics_from_rollups_match_raw_snapshots(archived, start_offset, end_offset):
+    service, base, snapshots = archived
+    start, end = base + start_offset, base + end_offset
+
+    result = service.get_headway_analytics('A', start, end)
+
+    columns = flatten_trip_updates([snapshot for snapshot in snapshots if start <= snapshot[0] <= end], 'A')
+    expected = analyze_headways(final_arrivals(columns), columns["stop_ids"], data_service.ANALYTICS_BUNCHING_RATIO)
+    assert result["snapshots"] == columns["snapshots"]
+    assert result["observations"] == len(columns["time"])
+    assert {key: result[key] for key in expected} == expected
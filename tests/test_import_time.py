@@ -0,0 +1,11 @@
+from benchmarks.import_time import DEFAULT_BUDGET_MS, LAZY_MODULES, importtime
+
+
+def test_app_import_stays_within_budget_and_lazy():
+    # Best of three fresh interpreters, so a busy machine doesn't fail the budget
+    runs = [importtime('app') for _ in range(3)]
+    best_ms = min(run['app'] for run in runs) / 1000
+
+    assert best_ms <= DEFAULT_BUDGET_MS, f"import app took {best_ms:.1f}ms (budget {DEFAULT_BUDGET_MS:.0f}ms)"
+    eager = [name for name in LAZY_MODULES if any(name in run for run in runs)]
+    assert not eager, f"import app loads {eager} eagerly"
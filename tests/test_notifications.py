@@ -0,0 +1,36 @@
+from services.notification_service import NotificationService, MemoryNotificationSink
+
+
+class DelayedSnapshot:
+    """Stands in for a ColumnarFeed refresh with the given delayed (route_id, stop_id) pairs"""
+
+    def __init__(self, delayed):
+        self.delayed = set(delayed)
+
+    def delayed_stops(self, threshold):
+        return self.delayed
+
+
+def create_service(lock_path):
+    service = NotificationService()
+    service.enabled = True
+    service.lock_path = str(lock_path)
+    service.sink = MemoryNotificationSink()
+    service.index.load([(1, 7, 'delay', 'A', None, True)])
+    return service
+
+
+def test_only_the_lock_owner_notifies(tmp_path):
+    owner = create_service(tmp_path / 'notifications.lock')
+    other = create_service(tmp_path / 'notifications.lock')
+
+    for service in (owner, other):
+        service.on_feed('subway', 'ace', DelayedSnapshot([]))
+        service.on_feed('subway', 'ace', DelayedSnapshot([('A', 'A15N')]))
+
+    assert owner.is_owner()
+    assert not other.is_owner()
+    owner.queue.join()
+    notifications = owner.sink.drain()
+    assert [(n['user_id'], n['notification_type']) for n in notifications] == [(7, 'delay')]
+    assert other.queue is None and other.sink.drain() == []
@@ -0,0 +1,34 @@
+import os
+import time
+from utils.static_dataset import StaticDatasets, PRUNE_IDLE_POLLS
+
+
+def test_prune_keeps_snapshots_other_processes_still_touch(tmp_path):
+    datasets = StaticDatasets('subway', str(tmp_path / 'gtfs_subway'), watch=True,
+                              snapshot_dir=str(tmp_path / 'versions'), poll_interval=60)
+    for version in ('served', 'in_use_elsewhere', 'abandoned', 'previous'):
+        os.makedirs(tmp_path / 'versions' / version)
+    idle = time.time() - (PRUNE_IDLE_POLLS + 1) * 60
+    for version in ('abandoned', 'previous'):
+        os.utime(tmp_path / 'versions' / version, (idle, idle))
+
+    datasets._prune(keep=(str(tmp_path / 'versions' / 'previous'), str(tmp_path / 'versions' / 'served')))
+
+    assert sorted(os.listdir(tmp_path / 'versions')) == ['in_use_elsewhere', 'previous', 'served']
+
+
+def test_memory_counts_only_results_still_cached(tmp_path):
+    from utils.cache import cache
+    from utils.static_dataset import StaticDataset
+
+    dataset = StaticDataset('subway', 'v1', str(tmp_path))
+    for name in ('stations', 'routes'):
+        cache.set(dataset.key(name), [name] * 100)
+        dataset.track(dataset.key(name), [name] * 100)
+    both = dataset.memory_bytes
+
+    cache.remove(dataset.key('routes'))
+
+    assert list(dataset.cached_nbytes) == [dataset.key('stations')]
+    assert 0 < dataset.memory_bytes < both
+    cache.remove(dataset.key('stations'))
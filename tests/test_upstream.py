@@ -0,0 +1,136 @@
+import pytest
+import utils.upstream as upstream
+from app import create_app
+from utils.upstream import (CircuitBreaker, UpstreamPolicy, UpstreamUnavailable, set_deadline, reset_deadline,
+                            remaining_time)
+
+
+class FakeClock:
+    """Stands in for the time module so tests step through breaker timeouts"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(upstream, 'time', clock)
+    return clock
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def test_breaker_opens_probes_and_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+
+    breaker.record_failure('timeout')
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.record_failure('timeout')
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    # One probe after reset_seconds; concurrent callers keep waiting
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.get_stats()["consecutive_failures"] == 0
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure('HTTP 503')
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure('HTTP 503')
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    # A probe that never reports back is replaced after reset_seconds
+    clock.now += 30
+    assert breaker.allow()
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_policy_stops_calling_an_open_feed(clock):
+    policy = UpstreamPolicy({'default': (3.05, 5)}, retries=1, failure_threshold=1, reset_seconds=30)
+    attempts = []
+
+    def failing(timeout):
+        attempts.append(timeout)
+        return Response(503)
+
+    assert policy.call('subway', 'ace', failing).status_code == 503
+    assert len(attempts) == 2
+    with pytest.raises(UpstreamUnavailable):
+        policy.call('subway', 'ace', failing)
+    assert len(attempts) == 2
+
+    clock.now += 30
+    assert policy.call('subway', 'ace', lambda timeout: Response(200)).status_code == 200
+    assert policy.breaker('ace').state == CircuitBreaker.CLOSED
+
+
+def test_deadline_keeps_the_earlier_budget(clock):
+    assert remaining_time() is None
+    outer = set_deadline(5)
+    inner = set_deadline(60)
+    assert remaining_time() == 5
+    reset_deadline(inner)
+    reset_deadline(outer)
+    assert remaining_time() is None
+
+
+def test_attempt_timeouts_are_capped_by_the_deadline(clock):
+    policy = UpstreamPolicy({'default': (3.05, 5), 'equipment': (3.05, 30)})
+    timeouts = []
+
+    def record(timeout):
+        timeouts.append(timeout)
+        return Response(200)
+
+    token = set_deadline(10)
+    try:
+        clock.now += 8
+        policy.call('accessibility', 'equipment', record)
+        assert timeouts == [(2, 2)]
+
+        clock.now += 2
+        with pytest.raises(UpstreamUnavailable):
+            policy.call('accessibility', 'equipment', record)
+    finally:
+        reset_deadline(token)
+    # Running out of time before the first attempt is not the feed's failure
+    assert policy.breaker('equipment').failures == 0
+
+
+def test_accessibility_views_get_a_longer_deadline():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+                      'JWT_SECRET_KEY': 'test-secret-key-of-at-least-32-bytes', 'REQUEST_DEADLINE_SECONDS': 10})
+
+    with app.test_request_context('/api/accessibility/equipment'):
+        app.preprocess_request()
+        assert remaining_time() > 30
+    with app.test_request_context('/api/subway/feeds'):
+        app.preprocess_request()
+        assert remaining_time() <= 10
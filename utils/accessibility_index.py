@@ -0,0 +1,159 @@
+# Keys that identify a station on an equipment record, most specific first.
+# The MTA equipment feed uses `elevatorsgtfsstopid` (slash separated) and
+# `stationcomplexid`; older payloads carry a plain `station_id`.
+STATION_KEYS = ('station_id', 'elevatorsgtfsstopid', 'stationcomplexid')
+
+# Keys that identify a piece of equipment on equipment and outage records
+EQUIPMENT_KEYS = ('equipmentno', 'equipment', 'equipment_id')
+
+
+def _records(data, list_key):
+    """
+    Extract the record list from an accessibility payload
+
+    Args:
+        data (list or dict): Feed payload
+        list_key (str): Key holding the records when the payload is a dict
+
+    Returns:
+        list: Records
+    """
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and "error" not in data:
+        return data.get(list_key, [])
+    return []
+
+
+def _equipment_id(record):
+    for key in EQUIPMENT_KEYS:
+        value = record.get(key)
+        if isinstance(value, str) and value:
+            return value
+    return None
+
+
+def _station_ids(record):
+    station_ids = []
+    for key in STATION_KEYS:
+        value = record.get(key)
+        if not value:
+            continue
+        for station_id in str(value).split('/'):
+            station_id = station_id.strip()
+            if station_id and station_id not in station_ids:
+                station_ids.append(station_id)
+    return station_ids
+
+
+class AccessibilityIndex:
+    """
+    Station -> equipment index joined with current and upcoming outages
+
+    Station entries are fully materialized at build time, so a station lookup
+    is a single dict access.
+    """
+
+    def __init__(self, equipment_data, current_data=None, upcoming_data=None):
+        """
+        Build the index from the ELEVATOR_ESCALATOR_FEEDS payloads
+
+        Args:
+            equipment_data (list or dict): 'equipment' feed payload
+            current_data (list or dict): 'current' outages feed payload
+            upcoming_data (list or dict): 'upcoming' outages feed payload
+        """
+        self.errors = {}
+        for data_type, data in (('current', current_data), ('upcoming', upcoming_data)):
+            if isinstance(data, dict) and "error" in data:
+                self.errors[data_type] = data["error"]
+
+        # Equipment ID -> outages
+        self.current_outages = {}
+        self.upcoming_outages = {}
+        for data_type, data in (('current', current_data), ('upcoming', upcoming_data)):
+            for outage in _records(data, 'outages'):
+                equipment_id = _equipment_id(outage)
+                if equipment_id is None:
+                    continue
+                # The current feed also lists announced outages that have not started
+                if data_type == 'current' and outage.get('isupcomingoutage') != 'Y':
+                    self.current_outages.setdefault(equipment_id, []).append(outage)
+                else:
+                    self.upcoming_outages.setdefault(equipment_id, []).append(outage)
+
+        # Station ID -> station entry. Equipment is indexed under every ID it
+        # carries, so both stop IDs and complex IDs resolve in one lookup.
+        self.stations = {}
+        self.outage_stations = []
+        primary_ids = set()
+
+        for item in _records(equipment_data, 'equipment'):
+            station_ids = _station_ids(item)
+            if not station_ids:
+                continue
+
+            # Report each station once, under the first (most specific) ID of its equipment
+            primary_ids.add(station_ids[0])
+
+            equipment_id = _equipment_id(item)
+            current = self.current_outages.get(equipment_id, [])
+            equipment = dict(item)
+            equipment["status"] = "out_of_service" if current else "in_service"
+            equipment["current_outages"] = current
+            equipment["upcoming_outages"] = self.upcoming_outages.get(equipment_id, [])
+
+            for station_id in station_ids:
+                entry = self.stations.get(station_id)
+                if entry is None:
+                    entry = self._empty_entry(station_id)
+                    self.stations[station_id] = entry
+
+                entry["equipment"].append(equipment)
+                entry["equipment_count"] += 1
+                if current:
+                    entry["out_of_service_count"] += 1
+
+        for station_id in sorted(primary_ids):
+            entry = self.stations[station_id]
+            if entry["out_of_service_count"]:
+                self.outage_stations.append(entry)
+
+    @staticmethod
+    def _empty_entry(station_id):
+        return {
+            "station_id": station_id,
+            "equipment_count": 0,
+            "out_of_service_count": 0,
+            "equipment": []
+        }
+
+    def get_station(self, station_id):
+        """
+        Get equipment with live status for a station
+
+        Args:
+            station_id (str): Station ID (GTFS stop ID or station complex ID)
+
+        Returns:
+            dict: Station entry
+        """
+        entry = self.stations.get(station_id)
+        if entry is None:
+            return self._empty_entry(station_id)
+        return entry
+
+    def get_stats(self):
+        """
+        Get index statistics
+
+        Returns:
+            dict: Dictionary with index stats
+        """
+        return {
+            "stations": len(self.stations),
+            "stations_with_outages": len(self.outage_stations),
+            "current_outages": sum(len(outages) for outages in self.current_outages.values()),
+            "upcoming_outages": sum(len(outages) for outages in self.upcoming_outages.values()),
+            "errors": self.errors
+        }
@@ -0,0 +1,278 @@
+import math
+import threading
+import time
+from utils.metrics import metrics
+
+ADMISSION_REJECTED = metrics.counter(
+    'admission_rejected_total', 'Requests rejected by admission control', ('cost_class', 'reason'))
+ADMISSION_QUEUE_WAIT = metrics.histogram(
+    'admission_queue_wait_seconds', 'Time admitted requests waited for a slot', ('cost_class',))
+ADMISSION_QUEUE_DEPTH = metrics.gauge('admission_queue_depth', 'Requests waiting for a slot', ('cost_class',))
+ADMISSION_IN_FLIGHT = metrics.gauge('admission_in_flight', 'Requests holding a slot', ('cost_class',))
+
+# WSGI environ key marking batch sub-requests, which run inside their parent's admission
+BATCH_SUBREQUEST_ENVIRON = 'nyc_transit.batch_subrequest'
+
+DEFAULT_COST_CLASS = 'standard'
+
+
+class TokenBuckets:
+    """
+    Per-client token buckets
+
+    Each client's bucket holds up to `burst` tokens and refills at `rate`
+    tokens per second. A request takes its cost class's tokens, so one
+    expensive request uses up the budget of several cheap ones.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000):
+        """
+        Args:
+            rate (float): Tokens added per second
+            burst (float): Bucket size
+            max_clients (int): Buckets kept before idle (full) ones are dropped
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.lock = threading.Lock()
+        self.buckets = {}  # client -> [tokens, last refill time]
+
+    def take(self, client, cost):
+        """
+        Take tokens from a client's bucket
+
+        Args:
+            client (str): Client key
+            cost (float): Tokens the request costs
+
+        Returns:
+            float: 0 if the tokens were taken, else seconds until the bucket holds enough
+        """
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(client)
+            if bucket is None:
+                if len(self.buckets) >= self.max_clients:
+                    self._prune(now)
+                bucket = self.buckets[client] = [self.burst, now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            # A cost above the bucket size is admitted from a full bucket and left as debt
+            if bucket[0] >= min(cost, self.burst):
+                bucket[0] -= cost
+                return 0
+            return (min(cost, self.burst) - bucket[0]) / self.rate
+
+    def _prune(self, now):
+        """Drop buckets that have refilled completely; they hold no state"""
+        self.buckets = {
+            client: bucket for client, bucket in self.buckets.items()
+            if bucket[0] + (now - bucket[1]) * self.rate < self.burst
+        }
+
+
+class AdmissionController:
+    """
+    Cost-aware admission control for the Flask app
+
+    Every view belongs to a cost class: 'standard' by default, or the one
+    set with the cost() decorator. A request is admitted in two steps:
+
+    - Rate: the client's token bucket must hold the class's cost, else 429.
+    - Concurrency: the request runs when its class is below its concurrency
+      limit, or waits in the class's queue for a slot up to its timeout.
+
+    Running and queued requests both hold a server thread, so a class is
+    only admitted (to run or to queue) while fewer than its `share` of
+    ADMISSION_MAX_IN_FLIGHT threads are taken. Expensive classes get a
+    small share, so under overload they are queued and shed (503) first
+    and the remaining threads stay free for cheap cached endpoints.
+
+    Batch sub-requests are admitted with their batch request and skip both
+    steps, as do CORS preflights. The batch request takes the tokens of all
+    its sub-requests instead of its own class's cost.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.classes = {}
+        self.max_in_flight = 0
+        self.client_header = None
+        self.buckets = None
+        self.condition = threading.Condition()
+        self.active = {}   # cost class -> requests running
+        self.waiting = {}  # cost class -> requests queued
+
+    def init_app(self, app):
+        """
+        Register admission hooks on a Flask app when ADMISSION_ENABLED is set
+
+        Args:
+            app (Flask): Application
+        """
+        self.enabled = app.config.get('ADMISSION_ENABLED', False)
+        if not self.enabled:
+            return
+        self.classes = app.config['ADMISSION_CLASSES']
+        self.max_in_flight = app.config.get('ADMISSION_MAX_IN_FLIGHT', 4)
+        self.client_header = app.config.get('ADMISSION_CLIENT_HEADER')
+        self.buckets = TokenBuckets(app.config.get('ADMISSION_CLIENT_RATE', 20),
+                                    app.config.get('ADMISSION_CLIENT_BURST', 100))
+        self.active = {name: 0 for name in self.classes}
+        self.waiting = {name: 0 for name in self.classes}
+        ADMISSION_QUEUE_DEPTH.set_function(lambda: {(name, ): count for name, count in self.waiting.items()})
+        ADMISSION_IN_FLIGHT.set_function(lambda: {(name, ): count for name, count in self.active.items()})
+
+        from flask import g, jsonify, request
+
+        @app.before_request
+        def admit_request():
+            if request.method == 'OPTIONS' or request.environ.get(BATCH_SUBREQUEST_ENVIRON):
+                return None
+            view = app.view_functions.get(request.endpoint)
+            cost_class = getattr(view, 'admission_cost', DEFAULT_COST_CLASS)
+
+            tokens = getattr(view, 'admission_tokens', None)
+            cost = tokens(request) if tokens else self.classes[cost_class]['cost']
+            retry_after = self.buckets.take(self._client(request), cost)
+            if retry_after:
+                ADMISSION_REJECTED.inc(cost_class, 'rate_limited')
+                response = jsonify({"error": "Rate limit exceeded"})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(math.ceil(retry_after))
+                return response
+
+            reason = self.acquire(cost_class)
+            if reason:
+                ADMISSION_REJECTED.inc(cost_class, reason)
+                response = jsonify({"error": "Server is overloaded, please retry"})
+                response.status_code = 503
+                response.headers['Retry-After'] = '1'
+                return response
+            g.admission_class = cost_class
+            return None
+
+        @app.teardown_request
+        def release_request(exc=None):
+            cost_class = g.pop('admission_class', None)
+            if cost_class is not None:
+                self.release(cost_class)
+
+    def cost(self, cost_class, tokens=None):
+        """
+        Decorator assigning a view to a cost class
+
+        Args:
+            cost_class (str): Key of ADMISSION_CLASSES (e.g. 'cheap', 'expensive')
+            tokens (callable): tokens(request) returns the request's token cost, instead of the class's cost
+
+        Returns:
+            callable: Decorator returning the same view function
+        """
+        def decorator(view):
+            view.admission_cost = cost_class
+            if tokens is not None:
+                view.admission_tokens = tokens
+            return view
+        return decorator
+
+    def path_cost(self, app, path):
+        """
+        Get the token cost of a GET request, by the cost class of the view it routes to
+
+        Args:
+            app (Flask): Application
+            path (str): Request path
+
+        Returns:
+            float: Tokens (the default class's cost for paths that don't route to a view)
+        """
+        from werkzeug.exceptions import HTTPException
+
+        try:
+            endpoint, _ = app.url_map.bind('localhost').match(path, method='GET')
+        except HTTPException:
+            endpoint = None
+        view = app.view_functions.get(endpoint)
+        return self.classes[getattr(view, 'admission_cost', DEFAULT_COST_CLASS)]['cost']
+
+    def _client(self, request):
+        """
+        Client key: the peer address, or the last address of the configured
+        header when set (behind a proxy)
+
+        The proxy appends the address it received the request from, so the
+        last entry can't be spoofed; earlier ones are whatever the client sent.
+        """
+        if self.client_header:
+            forwarded = request.headers.get(self.client_header)
+            if forwarded:
+                return forwarded.split(',')[-1].strip()
+        return request.remote_addr or 'unknown'
+
+    def _occupied(self):
+        """Threads held by running and queued requests"""
+        return sum(self.active.values()) + sum(self.waiting.values())
+
+    def acquire(self, cost_class):
+        """
+        Take a slot of a cost class, queueing for one if allowed
+
+        Args:
+            cost_class (str): Cost class
+
+        Returns:
+            str: None once admitted, else the rejection reason ('overloaded' or 'queue_timeout')
+        """
+        settings = self.classes[cost_class]
+        with self.condition:
+            if self._occupied() >= self.max_in_flight * settings['share']:
+                return 'overloaded'
+            if self.active[cost_class] < settings['concurrency']:
+                self.active[cost_class] += 1
+                return None
+            if self.waiting[cost_class] >= settings['queue']:
+                return 'overloaded'
+
+            start = time.monotonic()
+            deadline = start + settings['queue_timeout']
+            self.waiting[cost_class] += 1
+            try:
+                while self.active[cost_class] >= settings['concurrency']:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return 'queue_timeout'
+                    self.condition.wait(remaining)
+            finally:
+                self.waiting[cost_class] -= 1
+            self.active[cost_class] += 1
+        ADMISSION_QUEUE_WAIT.observe(time.monotonic() - start, cost_class)
+        return None
+
+    def release(self, cost_class):
+        """
+        Give back a slot taken by acquire()
+
+        Args:
+            cost_class (str): Cost class
+        """
+        with self.condition:
+            self.active[cost_class] -= 1
+            self.condition.notify_all()
+
+    def get_stats(self):
+        """
+        Get admission statistics
+
+        Returns:
+            dict: Cost class -> {"in_flight", "queued"}
+        """
+        with self.condition:
+            return {name: {"in_flight": self.active[name], "queued": self.waiting[name]} for name in self.classes}
+
+
+# Create global admission controller
+admission = AdmissionController()
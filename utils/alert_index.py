@@ -0,0 +1,145 @@
+import bisect
+
+
+class AlertIndex:
+    """
+    Inverted index over a parsed service alerts feed
+
+    Alerts are indexed by route_id and stop_id, and their active periods are
+    flattened into sorted, non-overlapping segments so that "which alerts are
+    active at time t" is a single binary search.
+    """
+
+    def __init__(self, feed_data):
+        """
+        Build the index from a parsed GTFS-RT alerts feed
+
+        Args:
+            feed_data (dict): Output of DataService.parse_gtfs_rt
+        """
+        self.header = feed_data.get("header", {})
+        self.alerts = []  # Alert entities, addressed by position
+        self.by_route = {}  # route_id -> set of alert positions
+        self.by_stop = {}  # stop_id -> set of alert positions
+
+        # Active period segments: boundaries[i] is the start of segment i,
+        # segments[i] is the set of alerts active in [boundaries[i], boundaries[i + 1]),
+        # including the ones that are always active
+        self.boundaries = []
+        self.segments = []
+        self.always_active = frozenset()
+
+        self._build(feed_data.get("entities", []))
+
+    def _build(self, entities):
+        events = []
+        always_active = set()
+
+        for entity in entities:
+            alert = entity.get("alert")
+            if alert is None:
+                continue
+
+            position = len(self.alerts)
+            self.alerts.append(entity)
+
+            for informed in alert.get("informed_entity", []):
+                if "route_id" in informed:
+                    self.by_route.setdefault(informed["route_id"], set()).add(position)
+                if "stop_id" in informed:
+                    self.by_stop.setdefault(informed["stop_id"], set()).add(position)
+
+            periods = alert.get("active_period", [])
+            if not periods:
+                # GTFS-RT: no active period means the alert is always active
+                always_active.add(position)
+                continue
+
+            for period in periods:
+                start = period["start"]["timestamp"] if "start" in period else None
+                end = period["end"]["timestamp"] if "end" in period else None
+                if start is None and end is None:
+                    always_active.add(position)
+                    continue
+                events.append((start if start is not None else 0, 1, position))
+                if end is not None:
+                    events.append((end, -1, position))
+
+        self.always_active = frozenset(always_active)
+
+        # Sweep the period boundaries, snapshotting the active set at each one.
+        # An alert can have overlapping periods, so active alerts are counted.
+        events.sort()
+        counts = {}
+        index = 0
+        while index < len(events):
+            timestamp = events[index][0]
+            while index < len(events) and events[index][0] == timestamp:
+                _, delta, position = events[index]
+                counts[position] = counts.get(position, 0) + delta
+                if counts[position] == 0:
+                    del counts[position]
+                index += 1
+            self.boundaries.append(timestamp)
+            self.segments.append(self.always_active.union(counts))
+
+    def active_at(self, timestamp):
+        """
+        Get positions of alerts active at a point in time
+
+        Args:
+            timestamp (int): POSIX timestamp
+
+        Returns:
+            frozenset: Alert positions
+        """
+        segment = bisect.bisect_right(self.boundaries, timestamp) - 1
+        if segment < 0:
+            return self.always_active
+        return self.segments[segment]
+
+    def query(self, route_id=None, stop_id=None, at=None):
+        """
+        Find alerts matching all of the given filters
+
+        Args:
+            route_id (str): Only alerts informing this route
+            stop_id (str): Only alerts informing this stop
+            at (int): Only alerts active at this POSIX timestamp
+
+        Returns:
+            list: Matching alert entities, in feed order
+        """
+        candidates = None
+
+        if route_id is not None:
+            candidates = self.by_route.get(route_id, set())
+        if stop_id is not None:
+            stop_matches = self.by_stop.get(stop_id, set())
+            candidates = stop_matches if candidates is None else candidates & stop_matches
+
+        if at is not None:
+            if candidates is None:
+                candidates = self.active_at(at)
+            elif candidates:
+                active = self.active_at(at)
+                candidates = {position for position in candidates if position in active}
+
+        if candidates is None:
+            return list(self.alerts)
+
+        return [self.alerts[position] for position in sorted(candidates)]
+
+    def get_stats(self):
+        """
+        Get index statistics
+
+        Returns:
+            dict: Dictionary with index stats
+        """
+        return {
+            "alerts": len(self.alerts),
+            "routes": len(self.by_route),
+            "stops": len(self.by_stop),
+            "segments": len(self.segments)
+        }
@@ -0,0 +1,348 @@
+import bisect
+import contextlib
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows: only one process may archive there
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, gzip is used when missing
+    zstandard = None
+
+
+class SnapshotArchive:
+    """
+    Append-only on-disk archive of raw realtime feed snapshots
+
+    Layout: <root>/<feed_id>/<segment_start>.<codec>.seg holds individually
+    compressed snapshots back to back, and a matching .idx file holds one
+    "header_timestamp offset length sha1" line per snapshot. Snapshots are
+    deduplicated by header timestamp and content hash, segments roll over
+    every `segment_seconds`, and whole segments are dropped past the
+    retention window or size budget, together with any sidecar files
+    derived from them (see sidecar_path).
+
+    Several processes (e.g. gunicorn workers) may archive into the same
+    root: appends to a feed hold an exclusive flock on the feed's .lock
+    file, and each process reads the other processes' new index lines
+    before deduplicating or answering a query.
+    """
+
+    def __init__(self, root, retention_seconds=7 * 86400, max_bytes=2 * 1024 ** 3, segment_seconds=3600,
+                 codec=None):
+        """
+        Args:
+            root (str): Archive directory
+            retention_seconds (int): Drop segments whose newest snapshot is older than this
+            max_bytes (int): Drop oldest segments while a feed's archive is larger than this
+            segment_seconds (int): Time span covered by one segment file
+            codec (str): 'zstd' or 'gzip'; defaults to zstd when installed
+        """
+        self.root = root
+        self.retention_seconds = retention_seconds
+        self.max_bytes = max_bytes
+        self.segment_seconds = segment_seconds
+        self.codec = codec or ('zstd' if zstandard is not None else 'gzip')
+        if self.codec == 'zstd' and zstandard is None:
+            raise ValueError("zstd codec requires the zstandard package")
+
+        self.lock = threading.Lock()
+        # feed_id -> sorted list of (header_timestamp, segment_path, offset, length, digest)
+        self.indexes = {}
+        self.index_positions = {}  # .idx path -> bytes of it already in self.indexes
+
+    def _compress(self, content):
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=10).compress(content)
+        return gzip.compress(content, compresslevel=6, mtime=0)
+
+    @staticmethod
+    def _decompress(segment_path, data):
+        if segment_path.endswith('.zstd.seg'):
+            if zstandard is None:
+                raise ValueError("zstd segment requires the zstandard package")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _load_index(self, feed_id):
+        """
+        Bring a feed's snapshot index up to date with its .idx files (caller holds the lock)
+
+        Only lines appended since the last call are read, so lines written
+        by other processes are picked up cheaply. Index files removed by
+        another process's retention drop their entries.
+        """
+        index = self.indexes.setdefault(feed_id, [])
+        directory = os.path.join(self.root, feed_id)
+        names = os.listdir(directory) if os.path.isdir(directory) else []
+
+        present = set()
+        added = False
+        for name in names:
+            if not name.endswith('.idx'):
+                continue
+            idx_path = os.path.join(directory, name)
+            present.add(idx_path)
+            position = self.index_positions.get(idx_path, 0)
+            try:
+                with open(idx_path, 'rb') as f:
+                    f.seek(position)
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            # A line still being written is read on the next call
+            complete = data.rfind(b'\n') + 1
+            if not complete:
+                continue
+            self.index_positions[idx_path] = position + complete
+
+            segment_path = idx_path[:-len('.idx')] + '.seg'
+            for line in data[:complete].decode('utf-8').splitlines():
+                parts = line.split()
+                if len(parts) == 4:
+                    index.append((int(parts[0]), segment_path, int(parts[1]), int(parts[2]), parts[3]))
+                    added = True
+
+        removed = {path for path in self.index_positions
+                   if os.path.dirname(path) == directory and path not in present}
+        if removed:
+            for path in removed:
+                del self.index_positions[path]
+            segments = {path[:-len('.idx')] + '.seg' for path in removed}
+            index[:] = [entry for entry in index if entry[1] not in segments]
+        if added:
+            index.sort()
+        return index
+
+    @contextlib.contextmanager
+    def _feed_lock(self, directory):
+        """Hold an exclusive flock on a feed directory's .lock file across processes"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(directory, '.lock'), 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def append(self, feed_id, header_timestamp, content):
+        """
+        Archive a raw snapshot unless it is a duplicate
+
+        Args:
+            feed_id (str): Feed ID
+            header_timestamp (int): FeedMessage header timestamp
+            content (bytes): Raw GTFS-RT payload
+
+        Returns:
+            bool: True if the snapshot was written
+        """
+        digest = hashlib.sha1(content).hexdigest()
+        record = self._compress(content)
+        directory = os.path.join(self.root, feed_id)
+        os.makedirs(directory, exist_ok=True)
+
+        with self.lock, self._feed_lock(directory):
+            index = self._load_index(feed_id)
+
+            # Duplicate if the header timestamp is already archived or the
+            # payload is byte-identical to the latest snapshot
+            position = bisect.bisect_left(index, (header_timestamp,))
+            if position < len(index) and index[position][0] == header_timestamp:
+                return False
+            if index and index[-1][4] == digest:
+                return False
+
+            segment_start = header_timestamp - header_timestamp % self.segment_seconds
+            segment_path = os.path.join(directory, f"{segment_start}.{self.codec}.seg")
+            idx_path = segment_path[:-len('.seg')] + '.idx'
+
+            with open(segment_path, 'ab') as f:
+                offset = os.fstat(f.fileno()).st_size
+                f.write(record)
+            with open(idx_path, 'a', encoding='utf-8') as f:
+                f.write(f"{header_timestamp} {offset} {len(record)} {digest}\n")
+                f.flush()
+                # Everything before this line was loaded above, under the same flock
+                self.index_positions[idx_path] = os.fstat(f.fileno()).st_size
+
+            bisect.insort(index, (header_timestamp, segment_path, offset, len(record), digest))
+            self._enforce_retention(feed_id)
+
+        return True
+
+    def _enforce_retention(self, feed_id):
+        """Drop expired or over-budget segments of a feed (caller holds the lock)"""
+        index = self.indexes[feed_id]
+        newest = {}
+        sizes = {}
+        for header_timestamp, segment_path, _, length, _ in index:
+            newest[segment_path] = header_timestamp
+            sizes[segment_path] = sizes.get(segment_path, 0) + length
+        segments = sorted(newest, key=newest.get)
+        cutoff = time.time() - self.retention_seconds
+
+        total = sum(sizes.values())
+        dropped = set()
+        for segment_path in segments[:-1]:  # Never drop the segment being written
+            if newest[segment_path] >= cutoff and total <= self.max_bytes:
+                break
+            total -= sizes[segment_path]
+            self._remove_segment(segment_path)
+            self.index_positions.pop(segment_path[:-len('.seg')] + '.idx', None)
+            dropped.add(segment_path)
+
+        if dropped:
+            self.indexes[feed_id] = [entry for entry in index if entry[1] not in dropped]
+
+    @staticmethod
+    def _remove_segment(segment_path):
+        """Delete a segment with its index and sidecar files"""
+        directory, name = os.path.split(segment_path[:-len('.seg')])
+        for entry in os.listdir(directory):
+            if entry.startswith(name + '.'):
+                try:
+                    os.remove(os.path.join(directory, entry))
+                except FileNotFoundError:
+                    pass
+
+    @staticmethod
+    def sidecar_path(segment_path, name):
+        """
+        Path of a file derived from a segment, dropped together with it
+
+        Args:
+            segment_path (str): Segment path
+            name (str): Sidecar name (e.g. 'headways.npz')
+
+        Returns:
+            str: Sidecar path
+        """
+        return f"{segment_path[:-len('.seg')]}.{name}"
+
+    def segments(self, feed_id, start, end):
+        """
+        List the segments holding snapshots in a time range
+
+        Args:
+            feed_id (str): Feed ID
+            start (int): First header timestamp (inclusive)
+            end (int): Last header timestamp (inclusive)
+
+        Returns:
+            list: (segment_path, header timestamps of all the segment's snapshots) pairs, oldest first
+        """
+        with self.lock:
+            index = self._load_index(feed_id)
+            low = bisect.bisect_left(index, (start,))
+            high = bisect.bisect_left(index, (end + 1,))
+            if low == high:
+                return []
+            # Segments cover disjoint time spans, so widen the slice to their first and last snapshots
+            while low > 0 and index[low - 1][1] == index[low][1]:
+                low -= 1
+            while high < len(index) and index[high][1] == index[high - 1][1]:
+                high += 1
+            timestamps = {}
+            for header_timestamp, segment_path, _, _, _ in index[low:high]:
+                timestamps.setdefault(segment_path, []).append(header_timestamp)
+        return list(timestamps.items())
+
+    def find(self, feed_id, at):
+        """
+        Find the latest snapshot at or before a point in time
+
+        Args:
+            feed_id (str): Feed ID
+            at (int): POSIX timestamp
+
+        Returns:
+            int: Header timestamp of the snapshot, or None if nothing is archived that early
+        """
+        with self.lock:
+            index = self._load_index(feed_id)
+            position = bisect.bisect_left(index, (at + 1,)) - 1
+            return index[position][0] if position >= 0 else None
+
+    def read(self, feed_id, header_timestamp):
+        """
+        Read an archived snapshot
+
+        Args:
+            feed_id (str): Feed ID
+            header_timestamp (int): Header timestamp of the snapshot
+
+        Returns:
+            bytes: Raw GTFS-RT payload, or None if not archived
+        """
+        with self.lock:
+            index = self._load_index(feed_id)
+            position = bisect.bisect_left(index, (header_timestamp,))
+            if position == len(index) or index[position][0] != header_timestamp:
+                return None
+            _, segment_path, offset, length, _ = index[position]
+
+        with open(segment_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        return self._decompress(segment_path, data)
+
+    def iter_range(self, feed_id, start, end):
+        """
+        Iterate over archived snapshots in a time range, oldest first
+
+        Args:
+            feed_id (str): Feed ID
+            start (int): First header timestamp (inclusive)
+            end (int): Last header timestamp (inclusive)
+
+        Yields:
+            tuple: (header_timestamp, raw GTFS-RT payload)
+        """
+        with self.lock:
+            index = self._load_index(feed_id)
+            entries = index[bisect.bisect_left(index, (start,)):bisect.bisect_left(index, (end + 1,))]
+
+        # Read each segment once; one dropped by retention meanwhile is skipped
+        handles = {}
+        try:
+            for header_timestamp, segment_path, offset, length, _ in entries:
+                if segment_path not in handles:
+                    try:
+                        handles[segment_path] = open(segment_path, 'rb')
+                    except FileNotFoundError:
+                        handles[segment_path] = None
+                f = handles[segment_path]
+                if f is None:
+                    continue
+                f.seek(offset)
+                yield header_timestamp, self._decompress(segment_path, f.read(length))
+        finally:
+            for f in handles.values():
+                if f is not None:
+                    f.close()
+
+    def get_stats(self):
+        """
+        Get archive statistics for feeds loaded so far
+
+        Returns:
+            dict: Snapshot counts and time range per feed
+        """
+        with self.lock:
+            return {
+                feed_id: {
+                    "snapshots": len(index),
+                    "first": index[0][0] if index else None,
+                    "last": index[-1][0] if index else None
+                } for feed_id, index in self.indexes.items()
+            }
@@ -1,4 +1,39 @@
+import math
 import time
+from utils.metrics import metrics
+
+
+CACHE_HITS = metrics.counter('cache_hits_total', 'Cache hits', ('prefix',))
+CACHE_MISSES = metrics.counter('cache_misses_total', 'Cache misses', ('prefix',))
+CACHE_EVICTIONS = metrics.counter('cache_evictions_total', 'Cache entries evicted on expiry', ('prefix',))
+
+_MISSING = object()
+
+
+# Metrics labels of the cache key families, matched longest first so that
+# e.g. 'alert_index_*' is not counted as 'alert' or 'line_shape_*' as 'line'
+KEY_PREFIXES = sorted((
+   'subway', 'lirr', 'mnr', 'alert', 'alert_index', 'accessibility', 'accessibility_index',
+   'archive', 'headways', 'stations', 'routes', 'line', 'line_shape', 'route_stops', 'station_route_map'
+), key=len, reverse=True)
+
+
+def key_prefix(key):
+   """
+   Get the metrics prefix for a cache key (e.g. 'subway' for 'subway_ace',
+   'station_route_map' for the versioned key 'station_route_map@<version>')
+
+   Args:
+       key (str): Cache key
+
+   Returns:
+       str: Key prefix from KEY_PREFIXES, else the part before the first '_'
+   """
+   name = key.split('@', 1)[0]
+   for prefix in KEY_PREFIXES:
+       if name == prefix or name.startswith(prefix + '_'):
+           return prefix
+   return name.split('_', 1)[0]
 
 
 class SimpleCache:
@@ -21,29 +56,36 @@ class SimpleCache:
        Returns:
            any: Cached data or None if not found/expired
        """
-       # Check if key exists
-       if key not in self.cache:
+       # Check if key exists (single lookups: another thread may remove the entry meanwhile)
+       timestamp = self.timestamps.get(key)
+       value = self.cache.get(key, _MISSING)
+       if timestamp is None or value is _MISSING:
+           CACHE_MISSES.inc(key_prefix(key))
            return None
 
        # Check if expired
        current_time = time.time()
-       if current_time - self.timestamps[key] > timeout:
+       if current_time - timestamp > timeout:
            # Remove expired data
            self.remove(key)
+           CACHE_EVICTIONS.inc(key_prefix(key))
+           CACHE_MISSES.inc(key_prefix(key))
            return None
 
-       return self.cache[key]
+       CACHE_HITS.inc(key_prefix(key))
+       return value
 
-   def set(self, key, value):
+   def set(self, key, value, expires=True):
        """
        Set cache data
 
        Args:
            key (str): Cache key
            value (any): Data to cache
+           expires (bool): False to keep the entry until it is removed, whatever the get() timeout
        """
        self.cache[key] = value
-       self.timestamps[key] = time.time()
+       self.timestamps[key] = time.time() if expires else math.inf
 
    def remove(self, key):
        """
@@ -52,9 +94,24 @@ class SimpleCache:
        Args:
            key (str): Cache key to remove
        """
-       if key in self.cache:
-           del self.cache[key]
-           del self.timestamps[key]
+       self.cache.pop(key, None)
+       self.timestamps.pop(key, None)
+
+   def remove_version(self, version):
+       """
+       Remove every entry derived from a static dataset version
+
+       Args:
+           version (str): Dataset version (the part after '@' in versioned keys)
+
+       Returns:
+           int: Number of entries removed
+       """
+       suffix = f"@{version}"
+       keys = [key for key in list(self.cache) if key.endswith(suffix)]
+       for key in keys:
+           self.remove(key)
+       return len(keys)
 
    def clear(self):
        """Clear all cache"""
@@ -68,11 +125,25 @@ class SimpleCache:
        Returns:
            dict: Dictionary with cache stats
        """
+       prefixes = {key_prefix(key) for key in self.cache}
+       for label_values in list(CACHE_HITS.values) + list(CACHE_MISSES.values):
+           prefixes.add(label_values[0])
+
        return {
            "total_keys": len(self.cache),
-           "keys": list(self.cache.keys())
+           "keys": list(self.cache.keys()),
+           "by_prefix": {
+               prefix: {
+                   "keys": sum(1 for key in self.cache if key_prefix(key) == prefix),
+                   "hits": CACHE_HITS.get(prefix),
+                   "misses": CACHE_MISSES.get(prefix),
+                   "evictions": CACHE_EVICTIONS.get(prefix)
+               } for prefix in sorted(prefixes)
+           }
        }
 
 
 # Create global cache instance
-cache = SimpleCache()
\ No newline at end of file
+cache = SimpleCache()
+
+metrics.gauge('cache_entries', 'Entries currently cached').set_function(lambda: len(cache.cache))
\ No newline at end of file
@@ -0,0 +1,537 @@
+import datetime
+import sys
+import numpy as np
+
+# Row layouts. String fields hold codes into ColumnarFeed.strings, -1 when absent
+ENTITY_DTYPE = np.dtype([
+    ('id', np.int32),
+    ('vehicle', np.int32),       # Row in vehicles, -1 if none
+    ('trip_update', np.int32),   # Row in trip_updates, -1 if none
+    ('alert', np.int32)          # Index in alerts, -1 if none
+])
+
+VEHICLE_DTYPE = np.dtype([
+    ('trip_id', np.int32),
+    ('route_id', np.int32),
+    ('start_date', np.int32),
+    ('stop_id', np.int32),
+    ('timestamp', np.int64),
+    ('latitude', np.float32),
+    ('longitude', np.float32),
+    ('bearing', np.float32),
+    ('speed', np.float32),
+    ('current_status', np.int8),
+    ('flags', np.uint8)
+])
+
+TRIP_UPDATE_DTYPE = np.dtype([
+    ('trip_id', np.int32),
+    ('route_id', np.int32),
+    ('start_date', np.int32),
+    ('timestamp', np.int64),
+    ('first_stop_time', np.int32),   # Slice of stop_time_updates belonging to this trip
+    ('stop_time_count', np.int32),
+    ('flags', np.uint8)
+])
+
+STOP_TIME_DTYPE = np.dtype([
+    ('trip_update', np.int32),
+    ('stop_id', np.int32),
+    ('arrival_time', np.int64),
+    ('arrival_delay', np.int32),
+    ('departure_time', np.int64),
+    ('departure_delay', np.int32),
+    ('flags', np.uint8)
+])
+
+# Vehicle flags
+HAS_POSITION = 1
+HAS_BEARING = 2
+HAS_SPEED = 4
+HAS_STATUS = 8
+HAS_STOP_ID = 16
+
+# Trip update flags
+HAS_TIMESTAMP = 1
+
+# Stop time flags
+HAS_ARRIVAL = 1
+HAS_ARRIVAL_DELAY = 2
+HAS_DEPARTURE = 4
+HAS_DEPARTURE_DELAY = 8
+
+VEHICLE_STATUS = {
+    0: "INCOMING_AT",
+    1: "STOPPED_AT",
+    2: "IN_TRANSIT_TO"
+}
+
+
+class ColumnarFeed:
+    """
+    Compact parsed GTFS-RT snapshot of vehicles and trip updates
+
+    Entities, vehicles, trip updates and stop time updates are stored as
+    NumPy structured arrays, and every ID is interned once in a shared string
+    table. JSON-ready dicts identical to DataService.parse_gtfs_rt output are
+    only built by to_dict(), at response time. The few alert entities of a
+    realtime feed are kept as ready-made dicts in `alerts`; service alert
+    feeds keep the dict form.
+    """
+
+    __slots__ = ('feed_id', 'timestamp', 'strings', 'entities', 'vehicles', 'trip_updates', 'stop_times',
+                 'alerts', '_codes')
+
+    def __init__(self, feed_id, timestamp, strings, entities, vehicles, trip_updates, stop_times, alerts=()):
+        self.feed_id = feed_id
+        self.timestamp = timestamp
+        self.strings = strings
+        self.entities = entities
+        self.vehicles = vehicles
+        self.trip_updates = trip_updates
+        self.stop_times = stop_times
+        self.alerts = alerts
+        self._codes = None
+
+    @classmethod
+    def from_bytes(cls, content, feed_id):
+        """
+        Parse a GTFS-RT payload
+
+        Args:
+            content (bytes): GTFS-RT binary content
+            feed_id (str): Feed ID
+
+        Returns:
+            ColumnarFeed: Parsed snapshot
+        """
+        from google.transit import gtfs_realtime_pb2
+
+        feed = gtfs_realtime_pb2.FeedMessage()
+        feed.ParseFromString(content)
+        return cls.from_message(feed, feed_id)
+
+    @classmethod
+    def from_message(cls, feed, feed_id):
+        """
+        Build from a parsed FeedMessage
+
+        Args:
+            feed (FeedMessage): Parsed feed
+            feed_id (str): Feed ID
+
+        Returns:
+            ColumnarFeed: Parsed snapshot
+        """
+        codes = {}
+        strings = []
+
+        def intern(value):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(strings)
+                strings.append(sys.intern(value))
+            return code
+
+        entity_rows = []
+        vehicle_rows = []
+        trip_rows = []
+        stop_time_rows = []
+        alerts = []
+        formatter = _TimeFormatter()
+
+        for entity in feed.entity:
+            vehicle_index = -1
+            trip_index = -1
+            alert_index = -1
+
+            if entity.HasField('vehicle'):
+                vehicle = entity.vehicle
+                flags = 0
+                latitude = longitude = bearing = speed = 0.0
+                if vehicle.HasField('position'):
+                    flags |= HAS_POSITION
+                    latitude = vehicle.position.latitude
+                    longitude = vehicle.position.longitude
+                    if vehicle.position.HasField('bearing'):
+                        flags |= HAS_BEARING
+                        bearing = vehicle.position.bearing
+                    if vehicle.position.HasField('speed'):
+                        flags |= HAS_SPEED
+                        speed = vehicle.position.speed
+                if vehicle.HasField('current_status'):
+                    flags |= HAS_STATUS
+                stop_id = -1
+                if vehicle.HasField('stop_id'):
+                    flags |= HAS_STOP_ID
+                    stop_id = intern(vehicle.stop_id)
+
+                vehicle_index = len(vehicle_rows)
+                vehicle_rows.append((intern(vehicle.trip.trip_id), intern(vehicle.trip.route_id),
+                                     intern(vehicle.trip.start_date), stop_id, vehicle.timestamp,
+                                     latitude, longitude, bearing, speed, vehicle.current_status, flags))
+
+            if entity.HasField('trip_update'):
+                trip_update = entity.trip_update
+                first_stop_time = len(stop_time_rows)
+                trip_index = len(trip_rows)
+                for stop_time in trip_update.stop_time_update:
+                    flags = 0
+                    arrival_time = arrival_delay = departure_time = departure_delay = 0
+                    if stop_time.HasField('arrival'):
+                        flags |= HAS_ARRIVAL
+                        arrival_time = stop_time.arrival.time
+                        if stop_time.arrival.HasField('delay'):
+                            flags |= HAS_ARRIVAL_DELAY
+                            arrival_delay = stop_time.arrival.delay
+                    if stop_time.HasField('departure'):
+                        flags |= HAS_DEPARTURE
+                        departure_time = stop_time.departure.time
+                        if stop_time.departure.HasField('delay'):
+                            flags |= HAS_DEPARTURE_DELAY
+                            departure_delay = stop_time.departure.delay
+                    stop_time_rows.append((trip_index, intern(stop_time.stop_id), arrival_time, arrival_delay,
+                                           departure_time, departure_delay, flags))
+
+                trip_rows.append((intern(trip_update.trip.trip_id), intern(trip_update.trip.route_id),
+                                  intern(trip_update.trip.start_date), trip_update.timestamp, first_stop_time,
+                                  len(stop_time_rows) - first_stop_time,
+                                  HAS_TIMESTAMP if trip_update.HasField('timestamp') else 0))
+
+            if entity.HasField('alert'):
+                alert_index = len(alerts)
+                alerts.append(_alert_dict(entity.alert, formatter))
+
+            entity_rows.append((intern(entity.id), vehicle_index, trip_index, alert_index))
+
+        return cls(
+            feed_id,
+            feed.header.timestamp,
+            tuple(strings),
+            np.array(entity_rows, dtype=ENTITY_DTYPE),
+            np.array(vehicle_rows, dtype=VEHICLE_DTYPE),
+            np.array(trip_rows, dtype=TRIP_UPDATE_DTYPE),
+            np.array(stop_time_rows, dtype=STOP_TIME_DTYPE),
+            tuple(alerts)
+        )
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the snapshot, in bytes"""
+        arrays = self.entities.nbytes + self.vehicles.nbytes + self.trip_updates.nbytes + self.stop_times.nbytes
+        return arrays + sys.getsizeof(self.strings) + sum(sys.getsizeof(value) for value in self.strings)
+
+    def code(self, value):
+        """
+        Get the string table code of an ID
+
+        Args:
+            value (str): ID
+
+        Returns:
+            int: Code, or -1 if the ID does not occur in the snapshot
+        """
+        if self._codes is None:
+            self._codes = {value: code for code, value in enumerate(self.strings)}
+        return self._codes.get(value, -1)
+
+    def string_array(self, codes):
+        """
+        Decode an array of string codes
+
+        Args:
+            codes (ndarray): Codes into the string table
+
+        Returns:
+            ndarray: Object array of IDs
+        """
+        return np.array(self.strings, dtype=object)[codes] if len(codes) else np.array([], dtype=object)
+
+    def stop_time_columns(self, route_id=None):
+        """
+        Get stop time updates as flat columns joined with their trip
+
+        Args:
+            route_id (str): Keep only trips of this route
+
+        Returns:
+            dict: Equal-length arrays 'trip_id', 'route_id', 'start_date', 'stop_id'
+                  (string codes), 'time' (arrival, else departure) and 'delay'
+                  (NaN when the feed gives none)
+        """
+        stop_times = self.stop_times
+        trips = self.trip_updates[stop_times['trip_update']]
+        if route_id is not None:
+            keep = trips['route_id'] == self.code(route_id)
+            stop_times = stop_times[keep]
+            trips = trips[keep]
+
+        has_arrival = (stop_times['flags'] & HAS_ARRIVAL) != 0
+        time = np.where(has_arrival, stop_times['arrival_time'], stop_times['departure_time'])
+        has_delay = np.where(has_arrival, stop_times['flags'] & HAS_ARRIVAL_DELAY,
+                             stop_times['flags'] & HAS_DEPARTURE_DELAY) != 0
+        delay = np.where(has_arrival, stop_times['arrival_delay'], stop_times['departure_delay']).astype(np.float64)
+        delay[~has_delay] = np.nan
+
+        return {
+            "trip_id": trips['trip_id'],
+            "route_id": trips['route_id'],
+            "start_date": trips['start_date'],
+            "stop_id": stop_times['stop_id'],
+            "time": time,
+            "delay": delay
+        }
+
+    def arrivals_at(self, stop_id, after=None, limit=None):
+        """
+        Get predicted arrivals at a stop, soonest first
+
+        Args:
+            stop_id (str): Stop ID (including the N/S direction suffix)
+            after (int): Only arrivals at or after this POSIX timestamp
+            limit (int): Maximum number of arrivals
+
+        Returns:
+            list: Arrivals as {"trip_id", "route_id", "time"} dicts
+        """
+        columns = self.stop_time_columns()
+        keep = (columns["stop_id"] == self.code(stop_id)) & (columns["time"] > 0)
+        if after is not None:
+            keep &= columns["time"] >= after
+        rows = np.flatnonzero(keep)
+        rows = rows[np.argsort(columns["time"][rows], kind='stable')][:limit]
+
+        return [
+            {
+                "trip_id": self.strings[columns["trip_id"][row]],
+                "route_id": self.strings[columns["route_id"][row]],
+                "time": int(columns["time"][row])
+            } for row in rows
+        ]
+
+    def delayed_stops(self, min_delay):
+        """
+        Get the stops where a trip is predicted at least `min_delay` late
+
+        Args:
+            min_delay (int): Delay threshold in seconds
+
+        Returns:
+            set: (route_id, stop_id) pairs
+        """
+        columns = self.stop_time_columns()
+        rows = np.flatnonzero(columns["delay"] >= min_delay)
+        pairs = np.unique(np.stack([columns["route_id"][rows], columns["stop_id"][rows]], axis=1), axis=0)
+        return {(self.strings[route_code], self.strings[stop_code]) for route_code, stop_code in pairs}
+
+    def trips(self):
+        """
+        Get every trip of the snapshot, joining its vehicle and trip update entities
+
+        A vehicle without a start date joins the trip update of the same trip ID.
+
+        Returns:
+            dict: (trip_id, start_date) -> (route_id, timestamp, trip update row, vehicle row), where the
+                  timestamp is the newest of the trip update's, the vehicle's and the header's and a
+                  missing row is -1
+        """
+        strings = self.strings
+        trips = {}
+        dated = {}  # trip ID -> key of its trip update
+        for row, (trip_id, route_id, start_date, timestamp, flags) in enumerate(
+                self.trip_updates[['trip_id', 'route_id', 'start_date', 'timestamp', 'flags']].tolist()):
+            timestamp = timestamp if flags & HAS_TIMESTAMP else self.timestamp
+            key = (strings[trip_id], strings[start_date])
+            trips[key] = (strings[route_id], timestamp, row, -1)
+            dated[key[0]] = key
+
+        for row, (trip_id, route_id, start_date, timestamp) in enumerate(
+                self.vehicles[['trip_id', 'route_id', 'start_date', 'timestamp']].tolist()):
+            key = (strings[trip_id], strings[start_date])
+            if not key[1]:
+                key = dated.get(key[0], key)
+            trip = trips.get(key)
+            if trip is None:
+                trips[key] = (strings[route_id], timestamp or self.timestamp, -1, row)
+            else:
+                trips[key] = (trip[0], max(trip[1], timestamp), trip[2], row)
+        return trips
+
+    def trip_dict(self, trip_row, vehicle_row):
+        """
+        Materialize one trip's trip update and vehicle position
+
+        Args:
+            trip_row (int): Row in trip_updates, -1 if none
+            vehicle_row (int): Row in vehicles, -1 if none
+
+        Returns:
+            dict: {"trip_update", "vehicle"} in the to_dict() entity format, absent parts omitted
+        """
+        formatter = _TimeFormatter()
+        trip_data = {}
+        if trip_row >= 0:
+            trip_data["trip_update"] = self._trip_update_dict(trip_row, formatter)
+        if vehicle_row >= 0:
+            trip_data["vehicle"] = self._vehicle_dict(vehicle_row, formatter)
+        return trip_data
+
+    def vehicles_for_route(self, route_id):
+        """
+        Get vehicle positions of a route
+
+        Args:
+            route_id (str): Route ID
+
+        Returns:
+            list: Vehicle dicts as in to_dict()
+        """
+        formatter = _TimeFormatter()
+        rows = np.flatnonzero(self.vehicles['route_id'] == self.code(route_id))
+        return [self._vehicle_dict(row, formatter) for row in rows]
+
+    def _vehicle_dict(self, row, formatter):
+        vehicle = self.vehicles[row]
+        strings = self.strings
+        flags = int(vehicle['flags'])
+        timestamp = int(vehicle['timestamp'])
+
+        vehicle_data = {
+            "trip": {
+                "trip_id": strings[vehicle['trip_id']],
+                "route_id": strings[vehicle['route_id']]
+            },
+            "timestamp": timestamp
+        }
+        if timestamp:
+            vehicle_data["human_time"] = formatter(timestamp)
+        if flags & HAS_POSITION:
+            vehicle_data["position"] = {
+                "latitude": float(vehicle['latitude']),
+                "longitude": float(vehicle['longitude'])
+            }
+            if flags & HAS_BEARING:
+                vehicle_data["position"]["bearing"] = float(vehicle['bearing'])
+            if flags & HAS_SPEED:
+                vehicle_data["position"]["speed"] = float(vehicle['speed'])
+        if flags & HAS_STATUS:
+            vehicle_data["current_status"] = VEHICLE_STATUS.get(int(vehicle['current_status']), "UNKNOWN")
+        if flags & HAS_STOP_ID:
+            vehicle_data["stop_id"] = strings[vehicle['stop_id']]
+        return vehicle_data
+
+    def _trip_update_dict(self, row, formatter):
+        trip_update = self.trip_updates[row]
+        strings = self.strings
+
+        update_data = {
+            "trip": {
+                "trip_id": strings[trip_update['trip_id']],
+                "route_id": strings[trip_update['route_id']]
+            },
+            "stop_time_updates": []
+        }
+        if trip_update['flags'] & HAS_TIMESTAMP:
+            update_data["timestamp"] = int(trip_update['timestamp'])
+            update_data["human_time"] = formatter(update_data["timestamp"])
+
+        first = int(trip_update['first_stop_time'])
+        stop_times = self.stop_times[first:first + int(trip_update['stop_time_count'])].tolist()
+        for _, stop_id, arrival_time, arrival_delay, departure_time, departure_delay, flags in stop_times:
+            stop_data = {"stop_id": strings[stop_id]}
+            if flags & HAS_ARRIVAL:
+                arrival_data = {"time": arrival_time}
+                if arrival_time:
+                    arrival_data["human_time"] = formatter(arrival_time)
+                if flags & HAS_ARRIVAL_DELAY:
+                    arrival_data["delay"] = arrival_delay
+                stop_data["arrival"] = arrival_data
+            if flags & HAS_DEPARTURE:
+                departure_data = {"time": departure_time}
+                if departure_time:
+                    departure_data["human_time"] = formatter(departure_time)
+                if flags & HAS_DEPARTURE_DELAY:
+                    departure_data["delay"] = departure_delay
+                stop_data["departure"] = departure_data
+            update_data["stop_time_updates"].append(stop_data)
+
+        return update_data
+
+    def to_dict(self):
+        """
+        Materialize the snapshot in the DataService.parse_gtfs_rt format
+
+        Returns:
+            dict: JSON-serializable feed
+        """
+        formatter = _TimeFormatter()
+        result = {
+            "header": {
+                "timestamp": self.timestamp,
+                "human_time": formatter(self.timestamp),
+                "feed_id": self.feed_id
+            },
+            "entities": []
+        }
+
+        for entity_id, vehicle_row, trip_row, alert_index in self.entities.tolist():
+            entity_data = {"id": self.strings[entity_id]}
+            if vehicle_row >= 0:
+                entity_data["vehicle"] = self._vehicle_dict(vehicle_row, formatter)
+            if trip_row >= 0:
+                entity_data["trip_update"] = self._trip_update_dict(trip_row, formatter)
+            if alert_index >= 0:
+                entity_data["alert"] = self.alerts[alert_index]
+            result["entities"].append(entity_data)
+
+        return result
+
+
+def _alert_dict(alert, formatter):
+    """Convert an Alert message to the DataService.parse_gtfs_rt alert format"""
+    alert_data = {
+        "active_period": [],
+        "informed_entity": []
+    }
+    if alert.HasField('cause'):
+        alert_data["cause"] = alert.cause
+    if alert.HasField('effect'):
+        alert_data["effect"] = alert.effect
+    if alert.HasField('url') and alert.url.translation:
+        alert_data["url"] = alert.url.translation[0].text
+    if alert.HasField('header_text') and alert.header_text.translation:
+        alert_data["header_text"] = alert.header_text.translation[0].text
+    if alert.HasField('description_text') and alert.description_text.translation:
+        alert_data["description_text"] = alert.description_text.translation[0].text
+
+    for period in alert.active_period:
+        period_data = {}
+        if period.HasField('start'):
+            period_data["start"] = {"timestamp": period.start, "human_time": formatter(period.start)}
+        if period.HasField('end'):
+            period_data["end"] = {"timestamp": period.end, "human_time": formatter(period.end)}
+        alert_data["active_period"].append(period_data)
+
+    for informed in alert.informed_entity:
+        entity_info = {}
+        if informed.HasField('agency_id'):
+            entity_info["agency_id"] = informed.agency_id
+        if informed.HasField('route_id'):
+            entity_info["route_id"] = informed.route_id
+        if informed.HasField('route_type'):
+            entity_info["route_type"] = informed.route_type
+        if informed.HasField('stop_id'):
+            entity_info["stop_id"] = informed.stop_id
+        alert_data["informed_entity"].append(entity_info)
+
+    return alert_data
+
+
+class _TimeFormatter(dict):
+    """Memoized timestamp -> 'YYYY-mm-dd HH:MM:SS' (arrival times repeat heavily within a snapshot)"""
+
+    def __call__(self, timestamp):
+        human_time = self.get(timestamp)
+        if human_time is None:
+            human_time = self[timestamp] = datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        return human_time
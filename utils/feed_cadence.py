@@ -0,0 +1,229 @@
+import statistics
+import threading
+import time
+from collections import deque
+from utils.metrics import metrics
+
+PUBLISH_INTERVAL = metrics.gauge(
+    'feed_publish_interval_seconds', 'Learned upstream publish interval per feed', ('category', 'feed'))
+PUBLISH_LAG = metrics.gauge(
+    'feed_publish_lag_seconds', 'Shortest delay between a publish and its first fetch', ('category', 'feed'))
+FEED_POLLS = metrics.counter('feed_polls_total', 'Feed fetches by whether they found a new publish', ('feed', 'result'))
+
+
+class FeedCadence:
+    """
+    Publish interval of one feed, learned from its header timestamps
+
+    Every stored fetch reports the feed header's timestamp. When it changed
+    since the previous fetch, the difference is one observed interval and
+    the time between the timestamp and the fetch is one observed lag. The
+    interval is the median of the recent observations, clamped to the
+    category bounds, so a skipped publish or a late one does not move it.
+    The smallest recent lag estimates when a publish becomes fetchable,
+    absorbing clock skew between the MTA and this host.
+
+    Fetching once per estimated interval cannot reveal a feed that
+    publishes faster: every fetch still sees one interval's worth of
+    change. So after every `probe_every`-th publish the next fetch is due
+    after half the interval. When that probe finds a new publish, the
+    estimate was too long and is restarted from the probe's observation.
+    """
+
+    __slots__ = ('min_interval', 'max_interval', 'probe_every', 'intervals', 'lags',
+                 'last_timestamp', 'last_fetched_at', 'found_new', 'publishes')
+
+    def __init__(self, min_interval, max_interval, samples=8, probe_every=8):
+        """
+        Args:
+            min_interval (float): Shortest time between fetches, also the interval assumed until one is observed
+            max_interval (float): Longest time between fetches
+            samples (int): Observations the estimate is based on
+            probe_every (int): Publishes between probes at half the interval
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.probe_every = probe_every
+        self.intervals = deque(maxlen=samples)
+        self.lags = deque(maxlen=samples)
+        self.last_timestamp = None
+        self.last_fetched_at = None
+        self.found_new = False  # Whether the last fetch found a new publish
+        self.publishes = 0
+
+    def observe(self, header_timestamp, fetched_at):
+        """
+        Record a fetch
+
+        Args:
+            header_timestamp (int): Feed header timestamp (POSIX seconds)
+            fetched_at (float): When the fetch completed (POSIX seconds)
+
+        Returns:
+            bool: Whether the fetch found a new publish
+        """
+        probing = self.probing
+        self.last_fetched_at = fetched_at
+        if not header_timestamp or (self.last_timestamp is not None and header_timestamp <= self.last_timestamp):
+            self.found_new = False
+            return False
+
+        if self.last_timestamp is not None:
+            if probing:
+                # A publish was found halfway through the estimated interval
+                self.intervals.clear()
+            self.intervals.append(header_timestamp - self.last_timestamp)
+        self.lags.append(fetched_at - header_timestamp)
+        self.last_timestamp = header_timestamp
+        self.found_new = True
+        self.publishes += 1
+        return True
+
+    @property
+    def learned(self):
+        """Whether an interval has been observed"""
+        return bool(self.intervals)
+
+    @property
+    def probing(self):
+        """Whether the next fetch is a probe at half the interval"""
+        return self.found_new and self.learned and self.publishes % self.probe_every == 0
+
+    @property
+    def interval(self):
+        """Estimated publish interval in seconds, within the bounds"""
+        interval = statistics.median(self.intervals) if self.intervals else self.min_interval
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    @property
+    def lag(self):
+        """Estimated delay between a publish and when it can be fetched"""
+        return min(self.lags) if self.lags else 0
+
+    def next_fetch_delay(self, now):
+        """
+        Time until the next publish is expected to be fetchable
+
+        An overdue publish is polled for again after the minimum interval.
+
+        Args:
+            now (float): POSIX time
+
+        Returns:
+            float: Seconds from now, within the bounds
+        """
+        if self.last_timestamp is None:
+            return self.min_interval
+        interval = self.interval / 2 if self.probing else self.interval
+        expected = self.last_timestamp + interval + self.lag
+        return min(self.max_interval, max(self.min_interval, expected - now))
+
+    def freshness(self):
+        """
+        How long data fetched at the last fetch stays current
+
+        Returns:
+            float: Seconds from the last fetch to the next expected publish, within the bounds
+        """
+        return self.next_fetch_delay(self.last_fetched_at)
+
+
+class FeedCadences:
+    """
+    Learned cadence of every feed that reports header timestamps
+
+    Categories without bounds are not tracked and keep their configured
+    cache timeouts.
+    """
+
+    def __init__(self, bounds, samples=8, probe_every=8):
+        """
+        Args:
+            bounds (dict): Category -> (min, max) seconds between fetches
+            samples (int): Observations each estimate is based on
+            probe_every (int): Publishes between probes at half the interval
+        """
+        self.bounds = bounds
+        self.samples = samples
+        self.probe_every = probe_every
+        self.grace = 0      # Seconds cached data stays valid past the expected publish (see FeedRefresher)
+        self.lock = threading.Lock()
+        self.cadences = {}  # (category, feed_id) -> FeedCadence
+        PUBLISH_INTERVAL.set_function(lambda: {
+            key: cadence.interval for key, cadence in list(self.cadences.items()) if cadence.learned
+        })
+        PUBLISH_LAG.set_function(lambda: {
+            key: cadence.lag for key, cadence in list(self.cadences.items()) if cadence.lags
+        })
+
+    def get(self, category, feed_id):
+        """
+        Get a feed's cadence
+
+        Args:
+            category (str): Feed category
+            feed_id (str): Feed ID
+
+        Returns:
+            FeedCadence: Cadence, or None for untracked categories
+        """
+        if category not in self.bounds:
+            return None
+        key = (category, feed_id)
+        cadence = self.cadences.get(key)
+        if cadence is None:
+            min_interval, max_interval = self.bounds[category]
+            with self.lock:
+                cadence = self.cadences.setdefault(
+                    key, FeedCadence(min_interval, max_interval, self.samples, self.probe_every))
+        return cadence
+
+    def observe(self, category, feed_id, header_timestamp, fetched_at=None):
+        """
+        Record a stored fetch of a feed
+
+        Args:
+            category (str): Feed category
+            feed_id (str): Feed ID
+            header_timestamp (int): Feed header timestamp
+            fetched_at (float): When the fetch completed, defaults to now
+        """
+        cadence = self.get(category, feed_id)
+        if cadence is None:
+            return
+        changed = cadence.observe(header_timestamp, time.time() if fetched_at is None else fetched_at)
+        FEED_POLLS.inc(feed_id, 'new' if changed else 'unchanged')
+
+    def cache_timeout(self, category, feed_id):
+        """
+        Get how long a feed's cached data stays current
+
+        Args:
+            category (str): Feed category
+            feed_id (str): Feed ID
+
+        Returns:
+            float: Seconds, or None until an interval has been learned
+        """
+        cadence = self.cadences.get((category, feed_id))
+        if cadence is None or not cadence.learned:
+            return None
+        return cadence.freshness() + self.grace
+
+    def get_stats(self):
+        """
+        Get cadence statistics
+
+        Returns:
+            dict: "category/feed_id" -> cadence stats
+        """
+        now = time.time()
+        return {
+            f"{category}/{feed_id}": {
+                "interval": round(cadence.interval, 1),
+                "learned": cadence.learned,
+                "lag": round(cadence.lag, 1),
+                "last_timestamp": cadence.last_timestamp,
+                "next_fetch_in": round(cadence.next_fetch_delay(now), 1)
+            } for (category, feed_id), cadence in sorted(self.cadences.items())
+        }
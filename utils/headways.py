@@ -0,0 +1,401 @@
+import os
+import threading
+import numpy as np
+from utils.columnar_feed import ColumnarFeed
+
+# Row arrays of a rollup, see merge_rollups
+ROLLUP_ROWS = ("group", "route", "trip", "stop", "snapshot", "time", "delay", "observations")
+# Row arrays holding codes into the rollup's '<name>_ids' table
+ROLLUP_CODED = ("route", "trip", "stop")
+
+
+def flatten_trip_updates(snapshots, route_id=None):
+    """
+    Flatten the stop_time_updates of GTFS-RT snapshots into columns
+
+    Args:
+        snapshots (iterable): (header_timestamp, raw GTFS-RT payload or parsed ColumnarFeed) pairs
+        route_id (str): Keep only trips of this route
+
+    Returns:
+        dict: Equal-length arrays 'snapshot', 'route', 'trip', 'stop' (integer codes
+              into 'route_ids'/'trip_ids'/'stop_ids'), 'time' and 'delay' (NaN where
+              the feed gives none), plus 'snapshot_times', the header timestamps of
+              all snapshots read, and 'snapshots', their number
+    """
+    snapshot_parts = []
+    route_parts = []
+    trip_parts = []
+    stop_parts = []
+    time_parts = []
+    delay_parts = []
+    snapshot_times = []
+
+    for header_timestamp, content in snapshots:
+        feed = content if isinstance(content, ColumnarFeed) else ColumnarFeed.from_bytes(content, None)
+        snapshot_times.append(header_timestamp)
+        columns = feed.stop_time_columns(route_id)
+        keep = columns["time"] > 0
+        if not keep.any():
+            continue
+
+        # Per-snapshot codes are decoded here and re-coded across snapshots below;
+        # trip_id repeats across service days, start_date disambiguates
+        start_dates = feed.string_array(columns["start_date"][keep])
+        snapshot_parts.append(np.full(int(keep.sum()), header_timestamp, dtype=np.int64))
+        route_parts.append(feed.string_array(columns["route_id"][keep]))
+        trip_parts.append(start_dates + ':' + feed.string_array(columns["trip_id"][keep]))
+        stop_parts.append(feed.string_array(columns["stop_id"][keep]))
+        time_parts.append(columns["time"][keep])
+        delay_parts.append(columns["delay"][keep])
+
+    def concatenate(parts, dtype):
+        return np.concatenate(parts) if parts else np.array([], dtype=dtype)
+
+    route_ids, route_codes = np.unique(concatenate(route_parts, object), return_inverse=True)
+    trip_ids, trip_codes = np.unique(concatenate(trip_parts, object), return_inverse=True)
+    stop_ids, stop_codes = np.unique(concatenate(stop_parts, object), return_inverse=True)
+    return {
+        "snapshot": concatenate(snapshot_parts, np.int64),
+        "route": route_codes.astype(np.int64),
+        "trip": trip_codes.astype(np.int64),
+        "stop": stop_codes.astype(np.int64),
+        "time": concatenate(time_parts, np.int64),
+        "delay": concatenate(delay_parts, np.float64),
+        "route_ids": route_ids,
+        "trip_ids": trip_ids,
+        "stop_ids": stop_ids,
+        "snapshot_times": np.array(snapshot_times, dtype=np.int64),
+        "snapshots": len(snapshot_times)
+    }
+
+
+def rollup_trip_updates(columns, step):
+    """
+    Reduce flattened stop time updates to the latest prediction per trip and stop
+
+    Rows are grouped by the `step`-second bucket of their snapshot. Since
+    final_arrivals only reads the latest prediction of each trip and stop,
+    it gives the same arrivals over merged rollups of adjacent ranges as
+    over the flattened snapshots of the whole range.
+
+    Args:
+        columns (dict): Output of flatten_trip_updates
+        step (int): Bucket size in seconds
+
+    Returns:
+        dict: Rollup, see merge_rollups
+    """
+    snapshot = columns["snapshot"]
+    snapshot_times = columns["snapshot_times"]
+    groups, group_snapshots = np.unique(snapshot_times - snapshot_times % step, return_counts=True)
+    return merge_rollups([{
+        "group": snapshot - snapshot % step,
+        "route": columns["route"],
+        "trip": columns["trip"],
+        "stop": columns["stop"],
+        "snapshot": snapshot,
+        "time": columns["time"],
+        "delay": columns["delay"],
+        "observations": np.ones(len(snapshot), dtype=np.int64),
+        "route_ids": columns["route_ids"].astype(str),
+        "trip_ids": columns["trip_ids"].astype(str),
+        "stop_ids": columns["stop_ids"].astype(str),
+        "groups": groups.astype(np.int64),
+        "group_snapshots": group_snapshots.astype(np.int64),
+        "last": int(snapshot_times.max()) if len(snapshot_times) else 0
+    }])
+
+
+def _concatenate_rollups(rollups):
+    """Concatenate rollups without reducing them, re-coding IDs into shared tables"""
+    result = {key: np.concatenate([rollup[key] for rollup in rollups]) for key in ROLLUP_ROWS}
+    for name in ROLLUP_CODED:
+        tables = [rollup[f"{name}_ids"] for rollup in rollups]
+        ids, inverse = np.unique(np.concatenate(tables), return_inverse=True)
+        bounds = np.cumsum([0] + [len(table) for table in tables])
+        result[name] = np.concatenate([
+            inverse[bounds[position]:bounds[position + 1]][rollup[name]] for position, rollup in enumerate(rollups)
+        ]).astype(np.int64)
+        result[f"{name}_ids"] = ids
+    result["groups"] = np.concatenate([rollup["groups"] for rollup in rollups])
+    result["group_snapshots"] = np.concatenate([rollup["group_snapshots"] for rollup in rollups])
+    result["last"] = max(rollup["last"] for rollup in rollups)
+    return result
+
+
+def merge_rollups(rollups, route_id=None, group=None):
+    """
+    Merge rollups, keeping the latest prediction per group, trip and stop
+
+    A rollup holds equal-length row arrays 'group' (bucket start), 'route',
+    'trip', 'stop' (codes into its 'route_ids'/'trip_ids'/'stop_ids'),
+    'snapshot', 'time', 'delay' and 'observations' (flattened rows reduced
+    into the row), plus 'groups' and 'group_snapshots' (snapshots read per
+    bucket) and 'last' (the newest snapshot read).
+
+    Args:
+        rollups (list): Rollups to merge, at least one
+        route_id (str): Keep only rows of this route
+        group (int): Merge all buckets into this one
+
+    Returns:
+        dict: Merged rollup
+    """
+    result = _concatenate_rollups(rollups)
+    rows = {key: result[key] for key in ROLLUP_ROWS}
+    if route_id is not None:
+        keep = result["route_ids"][rows["route"]] == route_id
+        rows = {key: values[keep] for key, values in rows.items()}
+    if group is not None:
+        rows["group"] = np.full(len(rows["group"]), group, dtype=np.int64)
+        result["groups"] = np.full(len(result["groups"]), group, dtype=np.int64)
+
+    groups, group_codes = np.unique(result["groups"], return_inverse=True)
+    result["groups"] = groups.astype(np.int64)
+    result["group_snapshots"] = np.bincount(
+        group_codes, weights=result["group_snapshots"], minlength=len(groups)).astype(np.int64)
+
+    # Sort by group, trip, stop, snapshot and keep the last row of each (group, trip, stop) run
+    order = np.lexsort((rows["snapshot"], rows["stop"], rows["trip"], rows["group"]))
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = False
+    for key in ("group", "trip", "stop"):
+        values = rows[key][order]
+        last[:-1] |= values[1:] != values[:-1]
+    run_totals = np.cumsum(rows["observations"][order])[last]
+
+    result.update({key: values[order[last]] for key, values in rows.items()})
+    result["observations"] = np.diff(run_totals, prepend=0).astype(np.int64)
+    return result
+
+
+def append_rollup(rollup, added):
+    """
+    Merge a rollup of newer snapshots into a rollup
+
+    Only the buckets both rollups hold are reduced again; older buckets are
+    carried over as they are.
+
+    Args:
+        rollup (dict): Rollup
+        added (dict): Rollup of snapshots archived after those of `rollup`
+
+    Returns:
+        dict: Merged rollup
+    """
+    if not len(added["groups"]):
+        return rollup
+    first = int(added["groups"].min())
+    older = select_buckets(rollup, np.iinfo(np.int64).min, first)
+    newer = select_buckets(rollup, first, np.iinfo(np.int64).max)
+    return _concatenate_rollups([older, merge_rollups([newer, added])])
+
+
+def select_buckets(rollup, start, end):
+    """
+    Keep the buckets of a rollup that start within [start, end)
+
+    Args:
+        rollup (dict): Rollup
+        start (int): First bucket start (inclusive)
+        end (int): Last bucket start (exclusive)
+
+    Returns:
+        dict: Rollup of the selected buckets
+    """
+    keep = (rollup["group"] >= start) & (rollup["group"] < end)
+    keep_groups = (rollup["groups"] >= start) & (rollup["groups"] < end)
+    result = dict(rollup)
+    result.update({key: rollup[key][keep] for key in ROLLUP_ROWS})
+    result["groups"] = rollup["groups"][keep_groups]
+    result["group_snapshots"] = rollup["group_snapshots"][keep_groups]
+    return result
+
+
+def rollup_columns(rollup):
+    """
+    Get a rollup's rows as flatten_trip_updates columns for final_arrivals
+
+    Args:
+        rollup (dict): Rollup
+
+    Returns:
+        dict: Arrays 'snapshot', 'trip', 'stop', 'time' and 'delay', plus 'trip_ids' and 'stop_ids'
+    """
+    return {
+        "snapshot": rollup["snapshot"],
+        "trip": rollup["trip"],
+        "stop": rollup["stop"],
+        "time": rollup["time"],
+        "delay": rollup["delay"],
+        "trip_ids": rollup["trip_ids"].astype(object),
+        "stop_ids": rollup["stop_ids"].astype(object)
+    }
+
+
+def save_rollups(path, rollups):
+    """
+    Atomically write named rollups to a compressed .npz file
+
+    Args:
+        path (str): Destination
+        rollups (dict): Name -> rollup
+    """
+    arrays = {f"{name}-{key}": value for name, rollup in rollups.items() for key, value in rollup.items()}
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(temporary, path)
+
+
+def load_rollups(path):
+    """
+    Read rollups written by save_rollups
+
+    Args:
+        path (str): .npz file
+
+    Returns:
+        dict: Name -> rollup
+    """
+    rollups = {}
+    with np.load(path, allow_pickle=False) as data:
+        for name in data.files:
+            rollup_name, key = name.split('-', 1)
+            rollups.setdefault(rollup_name, {})[key] = data[name]
+    for rollup in rollups.values():
+        rollup["last"] = int(rollup["last"])
+    return rollups
+
+
+def final_arrivals(columns):
+    """
+    Reduce repeated predictions to one arrival per trip and stop
+
+    The latest snapshot's prediction for a (trip, stop) is taken as the actual
+    arrival. Arrivals still in the future at the last snapshot are dropped,
+    since those trains had not reached the stop yet.
+
+    Args:
+        columns (dict): Output of flatten_trip_updates or rollup_columns
+
+    Returns:
+        dict: Arrays 'trip', 'stop', 'time' and 'delay', one row per arrival
+    """
+    snapshot = columns["snapshot"]
+    if not len(snapshot):
+        return {key: columns[key] for key in ("trip", "stop", "time", "delay")}
+
+    # Sort by trip, stop, snapshot and keep the last row of each (trip, stop) run
+    order = np.lexsort((snapshot, columns["stop"], columns["trip"]))
+    trip = columns["trip"][order]
+    stop = columns["stop"][order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = (trip[1:] != trip[:-1]) | (stop[1:] != stop[:-1])
+    keep = order[last]
+    keep = keep[columns["time"][keep] <= snapshot.max()]
+
+    return {key: columns[key][keep] for key in ("trip", "stop", "time", "delay")}
+
+
+def grouped_percentile(values, groups, fraction):
+    """
+    Percentile of values within each group, with linear interpolation
+
+    Args:
+        values (ndarray): Values
+        groups (ndarray): Non-negative integer group of each value
+        fraction (float): Percentile as a fraction (0.5 for the median)
+
+    Returns:
+        ndarray: Percentile per group present, in ascending group order
+    """
+    order = np.lexsort((values, groups))
+    sorted_values = values[order].astype(np.float64)
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    counts = np.diff(np.r_[starts, len(order)])
+
+    position = starts + fraction * (counts - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def _distribution(values):
+    if not len(values):
+        return {"count": 0}
+    p10, p50, p90, p99 = np.percentile(values, (10, 50, 90, 99))
+    return {
+        "count": int(len(values)),
+        "mean_s": round(float(values.mean()), 1),
+        "p10_s": round(float(p10), 1),
+        "p50_s": round(float(p50), 1),
+        "p90_s": round(float(p90), 1),
+        "p99_s": round(float(p99), 1)
+    }
+
+
+def analyze_headways(arrivals, stop_ids, bunching_ratio=0.25):
+    """
+    Headway regularity, delay distribution and bunching from arrivals
+
+    Args:
+        arrivals (dict): Output of final_arrivals
+        stop_ids (ndarray): Stop ID for each stop code
+        bunching_ratio (float): Headways shorter than this share of the stop's
+                                median headway count as bunching events
+
+    Returns:
+        dict: Route-wide 'headways', 'delays' and 'bunching', plus per-stop 'stops'
+    """
+    # Consecutive arrivals at the same stop (stop IDs carry the direction)
+    order = np.lexsort((arrivals["time"], arrivals["stop"]))
+    stop = arrivals["stop"][order]
+    time = arrivals["time"][order]
+    same_stop = stop[1:] == stop[:-1]
+    headways = np.diff(time)[same_stop].astype(np.float64)
+    headway_stop = stop[1:][same_stop]
+
+    # Trains reported at the same second are duplicates, not headways
+    positive = headways > 0
+    headways = headways[positive]
+    headway_stop = headway_stop[positive]
+
+    delays = arrivals["delay"][~np.isnan(arrivals["delay"])]
+    result = {
+        "arrivals": int(len(time)),
+        "headways": _distribution(headways),
+        "delays": _distribution(delays),
+        "bunching": {"threshold_ratio": bunching_ratio, "events": 0, "rate": 0.0},
+        "stops": []
+    }
+    if not len(headways):
+        return result
+
+    stop_codes, group = np.unique(headway_stop, return_inverse=True)
+    counts = np.bincount(group)
+    means = np.bincount(group, weights=headways) / counts
+    variances = np.maximum(np.bincount(group, weights=headways * headways) / counts - means * means, 0)
+    medians = grouped_percentile(headways, group, 0.5)
+    p90s = grouped_percentile(headways, group, 0.9)
+
+    bunched = headways < bunching_ratio * medians[group]
+    bunching_events = np.bincount(group, weights=bunched, minlength=len(stop_codes))
+
+    result["headways"]["cv"] = round(float(headways.std() / headways.mean()), 3)
+    result["bunching"]["events"] = int(bunched.sum())
+    result["bunching"]["rate"] = round(float(bunched.mean()), 4)
+    result["stops"] = [
+        {
+            "stop_id": stop_ids[stop_codes[index]],
+            "headways": int(counts[index]),
+            "mean_s": round(float(means[index]), 1),
+            "p50_s": round(float(medians[index]), 1),
+            "p90_s": round(float(p90s[index]), 1),
+            "cv": round(float(np.sqrt(variances[index]) / means[index]), 3),
+            "bunching_events": int(bunching_events[index])
+        } for index in range(len(stop_codes))
+    ]
+    return result
@@ -0,0 +1,35 @@
+import threading
+
+
+class LazyObject:
+    """
+    Proxy that creates its target on first attribute access
+
+    Lets modules declare shared services at import time without paying for
+    their construction until a request actually uses them.
+    """
+
+    def __init__(self, factory):
+        """
+        Args:
+            factory (callable): Creates the target object
+        """
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_target', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _get_target(self):
+        target = self._target
+        if target is None:
+            with self._lock:
+                target = self._target
+                if target is None:
+                    target = self._factory()
+                    object.__setattr__(self, '_target', target)
+        return target
+
+    def __getattr__(self, name):
+        return getattr(self._get_target(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get_target(), name, value)
@@ -0,0 +1,241 @@
+import bisect
+import threading
+import time
+
+# Default histogram buckets in seconds, from cache hits to slow upstream fetches
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class Metric:
+    """
+    Base class for a labelled metric
+
+    Label values are passed positionally in the order of `label_names`, which
+    keeps the hot path to a tuple build and a dict lookup.
+    """
+
+    type_name = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def render(self):
+        """
+        Render the metric in Prometheus text format
+
+        Returns:
+            list: Lines of text
+        """
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing counter"""
+
+    type_name = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        return self.values.get(label_values, 0)
+
+
+class Gauge(Metric):
+    """Value that can go up and down, optionally computed at render time"""
+
+    type_name = 'gauge'
+
+    def __init__(self, name, help_text, label_names=()):
+        super().__init__(name, help_text, label_names)
+        self.function = None
+
+    def set(self, value, *label_values):
+        with self.lock:
+            self.values[label_values] = value
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def set_function(self, function):
+        """
+        Compute the gauge at render time
+
+        Args:
+            function (callable): Returns a number, or a dict of label tuple -> number
+        """
+        self.function = function
+
+    def render(self):
+        if self.function is not None:
+            value = self.function()
+            with self.lock:
+                self.values = dict(value) if isinstance(value, dict) else {(): value}
+        return super().render()
+
+
+class Histogram(Metric):
+    """Bucketed distribution of observed values"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(label_values)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), then sum
+                series = [0] * (len(self.buckets) + 1) + [0.0]
+                self.values[label_values] = series
+            series[bucket] += 1
+            series[-1] += value
+
+    def time(self, *label_values):
+        """
+        Time a block of code
+
+        Returns:
+            Timer: Context manager observing the elapsed seconds
+        """
+        return Timer(self, label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        with self.lock:
+            items = sorted((label_values, list(series)) for label_values, series in self.values.items())
+
+        for label_values, series in items:
+            cumulative = 0
+            for upper, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                labels = _format_labels(self.label_names, label_values, f'le="{_format_value(float(upper))}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Timer:
+    """Context manager that records elapsed time into a histogram"""
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Process-wide registry of metrics
+    """
+
+    def __init__(self, prefix='nyc_transit'):
+        self.prefix = prefix
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric_class, name, help_text, label_names, **kwargs):
+        full_name = f"{self.prefix}_{name}" if self.prefix else name
+        with self.lock:
+            # Registration is idempotent so modules can declare metrics at import time
+            if full_name not in self.metrics:
+                self.metrics[full_name] = metric_class(full_name, help_text, label_names, **kwargs)
+            return self.metrics[full_name]
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(Counter, name, help_text, label_names)
+
+    def gauge(self, name, help_text, label_names=()):
+        return self._register(Gauge, name, help_text, label_names)
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def render(self):
+        """
+        Render all metrics in Prometheus text exposition format
+
+        Returns:
+            str: Metrics text
+        """
+        with self.lock:
+            metrics = sorted(self.metrics.items())
+        lines = []
+        for _, metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def init_request_metrics(app):
+    """
+    Record per-endpoint request latency for a Flask app
+
+    Args:
+        app (Flask): Application
+    """
+    from flask import g, request
+
+    request_latency = metrics.histogram(
+        'http_request_duration_seconds', 'API request latency', ('endpoint', 'method', 'status'))
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            request_latency.observe(time.perf_counter() - start,
+                                    request.endpoint or 'unmatched', request.method, str(response.status_code))
+        return response
+
+
+# Create global metrics registry
+metrics = MetricsRegistry()
@@ -0,0 +1,121 @@
+import threading
+
+
+class NotificationIndex:
+    """
+    Inverted index from notification subscriptions to user IDs
+
+    Each enabled NotificationSetting is indexed under its
+    (notification_type, route_id, station_id) key, where a None route or
+    station means "any". An event for a route and station therefore matches
+    at most four keys, so matching cost depends on the number of events and
+    not on the number of users. Settings are added, replaced and removed
+    one at a time as they change.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = {}     # (notification_type, route_id, station_id) -> {user ID: matching settings}
+        self.settings = {}  # setting ID -> (key, user ID)
+
+    def load(self, settings):
+        """
+        Replace the index contents
+
+        Args:
+            settings (iterable): Setting rows, as accepted by apply()
+        """
+        with self.lock:
+            self.users = {}
+            self.settings = {}
+            for setting in settings:
+                self._apply(setting)
+
+    def apply(self, setting):
+        """
+        Add or replace one setting
+
+        Args:
+            setting (tuple): (id, user_id, notification_type, route_id, station_id, is_enabled)
+        """
+        with self.lock:
+            self._apply(setting)
+
+    def remove(self, setting_id):
+        """
+        Remove one setting
+
+        Args:
+            setting_id (int): NotificationSetting ID
+        """
+        with self.lock:
+            self._remove(setting_id)
+
+    def _apply(self, setting):
+        setting_id, user_id, notification_type, route_id, station_id, is_enabled = setting
+        self._remove(setting_id)
+        if not is_enabled:
+            return
+        key = (notification_type, route_id or None, station_id or None)
+        users = self.users.setdefault(key, {})
+        users[user_id] = users.get(user_id, 0) + 1
+        self.settings[setting_id] = (key, user_id)
+
+    def _remove(self, setting_id):
+        entry = self.settings.pop(setting_id, None)
+        if entry is None:
+            return
+        key, user_id = entry
+        users = self.users[key]
+        # Another setting of the same user may share the key
+        users[user_id] -= 1
+        if not users[user_id]:
+            del users[user_id]
+            if not users:
+                del self.users[key]
+
+    def match(self, events):
+        """
+        Find the users affected by a batch of events
+
+        Args:
+            events (list): Event dicts with "notification_type", "route_id" and "station_id"
+
+        Returns:
+            dict: User ID -> list of events matching the user's settings
+        """
+        affected = {}
+        with self.lock:
+            for event in events:
+                notification_type = event["notification_type"]
+                route_id = event.get("route_id")
+                station_id = event.get("station_id")
+
+                keys = {(notification_type, None, None)}
+                if route_id is not None:
+                    keys.add((notification_type, route_id, None))
+                if station_id is not None:
+                    keys.add((notification_type, None, station_id))
+                if route_id is not None and station_id is not None:
+                    keys.add((notification_type, route_id, station_id))
+
+                users = set()
+                for key in keys:
+                    users.update(self.users.get(key, ()))
+                for user_id in users:
+                    affected.setdefault(user_id, []).append(event)
+        return affected
+
+    def get_stats(self):
+        """
+        Get index statistics
+
+        Returns:
+            dict: Dictionary with index stats
+        """
+        with self.lock:
+            return {
+                "settings": len(self.settings),
+                "keys": len(self.users),
+                "users": len({user_id for _, user_id in self.settings.values()})
+            }
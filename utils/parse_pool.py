@@ -0,0 +1,95 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from utils.columnar_feed import ColumnarFeed
+from utils.metrics import metrics
+from utils.upstream import remaining_time
+
+PARSES = metrics.counter('gtfs_rt_parses_total', 'GTFS-RT payloads parsed, by where parsing ran', ('mode',))
+
+
+def _parse_columnar(content, feed_id):
+    """Runs in a pool process; ColumnarFeed pickles as a few flat array buffers"""
+    return ColumnarFeed.from_bytes(content, feed_id)
+
+
+class ParsePool:
+    """
+    Bounded process pool for parsing large GTFS-RT payloads off the GIL
+
+    Payloads smaller than `min_bytes`, or every payload when `workers` is 0,
+    are parsed in the calling thread, where the round trip would cost more
+    than it saves. The pool is created on first use in each process, with the
+    spawn start method, so pre-forked workers each get their own and never
+    inherit a pool or lock state from the master.
+
+    A pooled parse waits no longer than the request deadline; when the pool
+    is backed up past it, the payload is parsed in the calling thread.
+    """
+
+    def __init__(self, workers=2, min_bytes=256 * 1024):
+        """
+        Args:
+            workers (int): Pool processes, 0 to always parse in-process
+            min_bytes (int): Smallest payload sent to the pool
+        """
+        self.workers = workers
+        self.min_bytes = min_bytes
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pid = None
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None or self.pid != os.getpid():
+                self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+                self.pid = os.getpid()
+            return self.executor
+
+    def _discard_executor(self, executor):
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False)
+
+    def parse_columnar(self, content, feed_id):
+        """
+        Parse a GTFS-RT payload into a ColumnarFeed
+
+        Args:
+            content (bytes): GTFS-RT binary content
+            feed_id (str): Feed ID
+
+        Returns:
+            ColumnarFeed: Parsed snapshot
+        """
+        if self.workers <= 0 or len(content) < self.min_bytes:
+            PARSES.inc('inline')
+            return ColumnarFeed.from_bytes(content, feed_id)
+
+        executor = self._get_executor()
+        future = executor.submit(_parse_columnar, content, feed_id)
+        try:
+            snapshot = future.result(timeout=remaining_time())
+        except FutureTimeoutError:
+            future.cancel()
+            PARSES.inc('inline')
+            return ColumnarFeed.from_bytes(content, feed_id)
+        except BrokenProcessPool:
+            # A pool process died (e.g. OOM-killed); parse here and start a fresh pool next time
+            self._discard_executor(executor)
+            PARSES.inc('inline')
+            return ColumnarFeed.from_bytes(content, feed_id)
+
+        PARSES.inc('pool')
+        return snapshot
+
+    def shutdown(self):
+        """Stop the pool processes"""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
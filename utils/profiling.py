@@ -0,0 +1,248 @@
+import cProfile
+import collections
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+
+# Header and query parameter that request a cProfile summary
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = '_profile'
+
+# Number of functions listed in profile summaries and reports
+TOP_FUNCTIONS = 25
+
+
+def _function_key(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})"
+
+
+class InFlightRequest:
+    """Stack samples collected for one in-flight request"""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.samples = 0
+        self.self_counts = collections.Counter()  # Function on top of the stack
+        self.total_counts = collections.Counter()  # Function anywhere on the stack
+
+
+class RequestProfiler:
+    """
+    Request profiling hooks for a Flask app
+
+    - On demand: a request carrying the configured token in the `X-Profile`
+      header or `_profile` query parameter is run under cProfile and answered
+      with the pstats summary instead of its normal body.
+    - Continuously: requests slower than the threshold are kept in a bounded
+      ring buffer. With PROFILING_SAMPLE_INTERVAL set, a background thread
+      also samples the stacks of in-flight requests, so slow requests come
+      with their hottest functions.
+    """
+
+    def __init__(self):
+        self.token = None
+        self.slow_threshold = 1.0
+        self.sample_interval = 0
+        self.slow_requests = collections.deque(maxlen=100)
+        self.hot_self = collections.Counter()  # Aggregated over slow requests
+        self.hot_total = collections.Counter()
+        self.in_flight = {}  # Thread ID -> InFlightRequest
+        self.lock = threading.Lock()
+        self.profile_lock = threading.Lock()  # Only one cProfile session at a time
+        self.sampler_pid = None
+
+    def init_app(self, app):
+        """
+        Register profiling hooks on a Flask app
+
+        Args:
+            app (Flask): Application
+        """
+        self.token = app.config.get('PROFILING_TOKEN')
+        self.slow_threshold = app.config.get('SLOW_REQUEST_THRESHOLD', 1.0)
+        self.sample_interval = app.config.get('PROFILING_SAMPLE_INTERVAL', 0)
+        self.slow_requests = collections.deque(maxlen=app.config.get('SLOW_REQUEST_BUFFER_SIZE', 100))
+
+        from flask import g, request
+
+        @app.before_request
+        def start_profiling():
+            self._ensure_sampler()
+            thread_id = threading.get_ident()
+            with self.lock:
+                # A batch sub-request can run nested on its parent's thread
+                g.profiling_parent = self.in_flight.get(thread_id)
+                self.in_flight[thread_id] = InFlightRequest(request.method, request.path)
+
+            view = app.view_functions.get(request.endpoint)
+            if getattr(view, 'profiler_exempt', False) or not self._requested(request):
+                return
+            if self.profile_lock.acquire(blocking=False):
+                g.profiler = cProfile.Profile()
+                g.profiler.enable()
+
+        @app.after_request
+        def finish_profiling(response):
+            profiler = g.pop('profiler', None)
+            if profiler is not None:
+                profiler.disable()
+                self.profile_lock.release()
+                response = self._profile_response(profiler, response)
+
+            self._finish(request, response.status_code, g.pop('profiling_parent', None))
+            return response
+
+        @app.teardown_request
+        def discard_profiling(exc):
+            # after_request does not run when the view raised
+            profiler = g.pop('profiler', None)
+            if profiler is not None:
+                profiler.disable()
+                self.profile_lock.release()
+            if 'profiling_parent' in g:
+                self._restore(g.pop('profiling_parent'))
+
+    def exempt(self, view):
+        """
+        Exclude a view from on-demand profiling (e.g. views authorized by the token)
+
+        Args:
+            view (callable): View function
+
+        Returns:
+            callable: The same view function
+        """
+        view.profiler_exempt = True
+        return view
+
+    def is_authorized(self, request):
+        """
+        Check whether a request carries the profiling token
+
+        Args:
+            request (Request): Flask request
+
+        Returns:
+            bool: True if profiling is enabled and the token matches
+        """
+        if not self.token:
+            return False
+        supplied = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_PARAM) or ''
+        return hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    def _requested(self, request):
+        if PROFILE_HEADER not in request.headers and PROFILE_PARAM not in request.args:
+            return False
+        return self.is_authorized(request)
+
+    def _profile_response(self, profiler, response):
+        from flask import Response
+
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output)
+        stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+
+        profiled = Response(output.getvalue(), mimetype='text/plain')
+        profiled.headers['X-Profiled-Status'] = str(response.status_code)
+        profiled.headers['X-Profiled-Length'] = str(response.calculate_content_length() or 0)
+        return profiled
+
+    def _restore(self, parent):
+        with self.lock:
+            sample = self.in_flight.pop(threading.get_ident(), None)
+            if parent is not None:
+                self.in_flight[threading.get_ident()] = parent
+        return sample
+
+    def _finish(self, request, status_code, parent):
+        sample = self._restore(parent)
+        if sample is None:
+            return
+
+        duration = time.perf_counter() - sample.start
+        if duration < self.slow_threshold:
+            return
+
+        with self.lock:
+            self.hot_self.update(sample.self_counts)
+            self.hot_total.update(sample.total_counts)
+            self.slow_requests.append({
+                "method": sample.method,
+                "path": sample.path,
+                "endpoint": request.endpoint,
+                "status": status_code,
+                "duration": round(duration, 6),
+                "timestamp": time.time(),
+                "samples": sample.samples,
+                "top_functions": [
+                    {"function": function, "samples": count}
+                    for function, count in sample.self_counts.most_common(10)
+                ]
+            })
+
+    def _ensure_sampler(self):
+        # Threads do not survive fork, so each worker process starts its own.
+        # Sampling walks every in-flight stack under the GIL, so it only runs
+        # when both an interval and a slow-request threshold are configured
+        if not self.sample_interval or not self.slow_threshold or self.sampler_pid == os.getpid():
+            return
+        with self.lock:
+            if self.sampler_pid == os.getpid():
+                return
+            self.sampler_pid = os.getpid()
+        threading.Thread(target=self._sample_loop, name='request-sampler', daemon=True).start()
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.sample_interval)
+            if not self.in_flight:
+                continue
+
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, sample in self.in_flight.items():
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+
+                    sample.samples += 1
+                    sample.self_counts[_function_key(frame.f_code)] += 1
+                    seen = set()
+                    while frame is not None:
+                        key = _function_key(frame.f_code)
+                        if key not in seen:
+                            seen.add(key)
+                            sample.total_counts[key] += 1
+                        frame = frame.f_back
+            del frames
+
+    def get_report(self):
+        """
+        Get slow request samples and the hottest functions across them
+
+        Returns:
+            dict: Profiling report
+        """
+        with self.lock:
+            return {
+                "threshold": self.slow_threshold,
+                "sample_interval": self.sample_interval,
+                "in_flight": len(self.in_flight),
+                "slow_requests": list(self.slow_requests),
+                "hot_functions": {
+                    "self": [{"function": function, "samples": count}
+                             for function, count in self.hot_self.most_common(TOP_FUNCTIONS)],
+                    "cumulative": [{"function": function, "samples": count}
+                                   for function, count in self.hot_total.most_common(TOP_FUNCTIONS)]
+                }
+            }
+
+
+# Create global profiler instance
+profiler = RequestProfiler()
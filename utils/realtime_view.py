@@ -0,0 +1,212 @@
+import itertools
+import threading
+import time
+from utils.metrics import metrics
+
+VIEW_TRIPS = metrics.gauge('realtime_view_trips', 'Trips in the merged realtime view', ('agency',))
+VIEW_SOURCE_SWITCHES = metrics.counter(
+    'realtime_view_source_switches_total', 'Trips whose newest report moved to another feed', ('agency',))
+
+# Feed categories merged into the view; each is one agency with its own trip ID space
+REALTIME_CATEGORIES = ('subway', 'lirr', 'mnr')
+
+
+class TripRecord:
+    """One feed's report of a trip: the snapshot rows it is materialized from"""
+
+    __slots__ = ('source', 'route_id', 'timestamp', 'feed_timestamp', 'snapshot', 'trip_row', 'vehicle_row', 'seq')
+
+    def __init__(self, source, route_id, timestamp, snapshot, trip_row, vehicle_row, seq):
+        self.source = source            # (category, feed_id)
+        self.route_id = route_id
+        self.timestamp = timestamp
+        self.feed_timestamp = snapshot.timestamp
+        self.snapshot = snapshot
+        self.trip_row = trip_row
+        self.vehicle_row = vehicle_row
+        self.seq = seq                  # Order applied, breaks timestamp ties in favor of the last writer
+
+
+class MergedRealtimeView:
+    """
+    Trips of every subway, LIRR and MNR feed merged by a stable trip key
+
+    A trip is keyed by (agency, start_date, trip_id), so the same trip
+    reported by several feeds (e.g. shuttles and shared-track services)
+    is one entry. Each feed's report is kept, and the entry resolves to the
+    report with the newest trip timestamp, the most recently applied one on
+    a tie (last writer wins). Withdrawing a report falls back to the
+    remaining ones.
+
+    The view is updated incrementally from each feed refresh: only that
+    feed's reports are added, replaced or withdrawn, and the route and trip
+    ID indexes are adjusted for the entries whose winner changed. Records
+    point into the columnar snapshots and are only materialized by queries.
+    """
+
+    def __init__(self, max_age=600):
+        """
+        Args:
+            max_age (float): Queries skip trips whose feed snapshot is older than this many seconds
+        """
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.seq = itertools.count()
+        self.reports = {}    # trip key -> {source: TripRecord}
+        self.winners = {}    # trip key -> TripRecord
+        self.by_source = {}  # (category, feed_id) -> trip keys it reports
+        self.by_route = {}   # (agency, route_id) -> trip keys
+        self.by_trip = {}    # (agency, trip_id) -> trip keys (one per start date)
+        VIEW_TRIPS.set_function(self._count_by_agency)
+
+    def on_feed(self, category, feed_id, data):
+        """
+        Feed listener: merge a refreshed realtime snapshot
+
+        Args:
+            category (str): Feed category
+            feed_id (str): Feed ID
+            data: ColumnarFeed for realtime categories (others are ignored)
+        """
+        if category in REALTIME_CATEGORIES:
+            self.apply(category, feed_id, data)
+
+    def apply(self, category, feed_id, snapshot):
+        """
+        Replace a feed's reports with those of its new snapshot
+
+        Args:
+            category (str): Agency ('subway', 'lirr', 'mnr')
+            feed_id (str): Feed ID
+            snapshot (ColumnarFeed): Refreshed snapshot
+        """
+        source = (category, feed_id)
+        trips = snapshot.trips()
+
+        with self.lock:
+            seq = next(self.seq)
+            keys = set()
+            for (trip_id, start_date), (route_id, timestamp, trip_row, vehicle_row) in trips.items():
+                key = (category, start_date, trip_id)
+                keys.add(key)
+                self._report(key, TripRecord(source, route_id, timestamp, snapshot, trip_row, vehicle_row, seq))
+
+            for key in self.by_source.get(source, set()) - keys:
+                self._withdraw(key, source)
+            self.by_source[source] = keys
+
+    def _report(self, key, record):
+        reports = self.reports.setdefault(key, {})
+        reports[record.source] = record
+        self._elect(key, reports)
+
+    def _withdraw(self, key, source):
+        reports = self.reports.get(key)
+        if reports is None or reports.pop(source, None) is None:
+            return
+        if not reports:
+            del self.reports[key]
+        self._elect(key, reports)
+
+    def _elect(self, key, reports):
+        """Resolve a trip key to its newest report and keep the indexes in step"""
+        previous = self.winners.get(key)
+        winner = max(reports.values(), key=lambda record: (record.timestamp, record.seq)) if reports else None
+
+        if previous is not None and (winner is None or winner.route_id != previous.route_id):
+            self._unindex(self.by_route, (key[0], previous.route_id), key)
+        if winner is None:
+            self.winners.pop(key, None)
+            self._unindex(self.by_trip, (key[0], key[2]), key)
+            return
+
+        self.winners[key] = winner
+        if previous is not None and winner.source != previous.source:
+            VIEW_SOURCE_SWITCHES.inc(key[0])
+        if previous is None or winner.route_id != previous.route_id:
+            self.by_route.setdefault((key[0], winner.route_id), set()).add(key)
+        if previous is None:
+            self.by_trip.setdefault((key[0], key[2]), set()).add(key)
+
+    @staticmethod
+    def _unindex(index, index_key, key):
+        keys = index.get(index_key)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[index_key]
+
+    def _materialize(self, key, record):
+        agency, start_date, trip_id = key
+        trip_data = {
+            "agency": agency,
+            "trip_id": trip_id,
+            "start_date": start_date,
+            "route_id": record.route_id,
+            "timestamp": record.timestamp,
+            "feed_id": record.source[1]
+        }
+        trip_data.update(record.snapshot.trip_dict(record.trip_row, record.vehicle_row))
+        return trip_data
+
+    def _current(self, keys, now):
+        """Winners of the given keys whose feed snapshot is recent enough"""
+        oldest = now - self.max_age
+        with self.lock:
+            records = [(key, self.winners[key]) for key in keys if key in self.winners]
+        return [(key, record) for key, record in records if record.feed_timestamp >= oldest]
+
+    def trips_for_route(self, agency, route_id, now=None):
+        """
+        Get the active trips of a route across all of the agency's feeds
+
+        Args:
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+            route_id (str): Route ID
+            now (int): POSIX timestamp, defaults to now
+
+        Returns:
+            list: Trip dicts, ordered by start date and trip ID
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            keys = list(self.by_route.get((agency, route_id), ()))
+        return [self._materialize(key, record) for key, record in sorted(self._current(keys, now))]
+
+    def get_trip(self, agency, trip_id, now=None):
+        """
+        Get a trip by ID, one entry per start date it runs on
+
+        Args:
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+            trip_id (str): Trip ID
+            now (int): POSIX timestamp, defaults to now
+
+        Returns:
+            list: Trip dicts, ordered by start date
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            keys = list(self.by_trip.get((agency, trip_id), ()))
+        return [self._materialize(key, record) for key, record in sorted(self._current(keys, now))]
+
+    def _count_by_agency(self):
+        counts = {}
+        for agency, _, _ in list(self.winners):
+            counts[(agency, )] = counts.get((agency, ), 0) + 1
+        return counts
+
+    def get_stats(self):
+        """
+        Get view statistics
+
+        Returns:
+            dict: Dictionary with view stats
+        """
+        with self.lock:
+            return {
+                "trips": len(self.winners),
+                "shared_trips": sum(1 for reports in self.reports.values() if len(reports) > 1),
+                "feeds": len(self.by_source),
+                "routes": len(self.by_route)
+            }
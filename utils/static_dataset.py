@@ -0,0 +1,435 @@
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from utils.cache import cache
+from utils.metrics import metrics
+
+RELOADS = metrics.counter(
+    'static_dataset_reloads_total', 'Static GTFS release checks that found a change', ('agency', 'result'))
+DATASET_BYTES = metrics.gauge('static_dataset_bytes', 'Memory held by cached static GTFS data', ('agency',))
+
+# A release is rejected when any of these cannot be read
+REQUIRED_FILES = ('routes', 'trips', 'stops')
+
+# Snapshots no process has touched for this many poll intervals are pruned
+PRUNE_IDLE_POLLS = 3
+
+
+def deep_sizeof(value, seen=None):
+    """
+    Approximate memory held by a loader result (nested dicts, lists and scalars)
+
+    Objects reachable more than once, such as interned IDs, are counted once.
+
+    Args:
+        value: Object to measure
+        seen (set): IDs of objects already counted
+
+    Returns:
+        int: Size in bytes
+    """
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in value)
+    return size
+
+
+class StaticDataset:
+    """
+    One immutable static GTFS release of an agency
+
+    Loaders read every file through path() and cache results under key(),
+    so data derived from different agencies or releases never shares a
+    cache entry. Cached results are reported through track() to account
+    memory per dataset; results the cache has since dropped no longer count.
+    """
+
+    __slots__ = ('agency', 'version', 'directory', 'loaded_at', 'nbytes')
+
+    def __init__(self, agency, version, directory):
+        """
+        Args:
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+            version (str): Release fingerprint
+            directory (str): Directory holding the release's .txt files
+        """
+        self.agency = agency
+        self.version = version
+        self.directory = directory
+        self.loaded_at = time.time()
+        self.nbytes = {}  # cache key -> approximate size of the cached result
+
+    @property
+    def tag(self):
+        """Agency and version, as used in cache keys"""
+        return f"{self.agency}.{self.version}"
+
+    def track(self, key, data):
+        """
+        Record the memory held by a cached result
+
+        Args:
+            key (str): Cache key
+            data: Cached result
+        """
+        self.nbytes[key] = deep_sizeof(data)
+
+    @property
+    def cached_nbytes(self):
+        """Cache key -> approximate size, for the tracked results still in the cache"""
+        return {key: size for key, size in list(self.nbytes.items()) if key in cache.cache}
+
+    @property
+    def memory_bytes(self):
+        """Approximate memory held by this dataset's cached results"""
+        return sum(self.cached_nbytes.values())
+
+    def path(self, name):
+        """
+        Get the path of a GTFS file in this release
+
+        Args:
+            name (str): File name (e.g. 'stops.txt')
+
+        Returns:
+            str: File path
+        """
+        return os.path.join(self.directory, name)
+
+    def key(self, name):
+        """
+        Get the cache key of data derived from this release
+
+        Args:
+            name (str): Unversioned cache key (e.g. 'stations')
+
+        Returns:
+            str: Versioned cache key
+        """
+        return f"{name}@{self.tag}"
+
+
+def fingerprint(directory):
+    """
+    Fingerprint a static GTFS directory from its files' names, sizes and mtimes
+
+    Args:
+        directory (str): Static GTFS directory
+
+    Returns:
+        tuple: (version string, newest mtime), or (None, None) if the directory is unreadable
+    """
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith('.txt'))
+        stats = [(name, os.stat(os.path.join(directory, name))) for name in names]
+    except OSError:
+        return None, None
+
+    digest = hashlib.sha1()
+    for name, stat in stats:
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    newest = max((stat.st_mtime for _, stat in stats), default=0)
+    return digest.hexdigest()[:12], newest
+
+
+class StaticDatasets:
+    """
+    Current static GTFS release of one agency, hot-reloaded when a new one is published
+
+    Without watching, the source directory is served in place. With
+    watching, each release is first copied to `snapshot_dir/<version>`, so
+    files being rewritten by the next release are never read. A background
+    thread polls the source directory. Once a changed release has settled,
+    it is copied and validated. The `warm` callback then builds its derived
+    data into the new version's cache keys, and only after that is the
+    release swapped in with a single assignment. Requests in flight keep the
+    dataset they started with. Afterwards, `on_retire` is called with the
+    old dataset so its cache entries can be dropped.
+
+    Worker processes swap releases independently, so each one touches the
+    snapshot it serves on every poll, and only snapshots that no process
+    has touched for PRUNE_IDLE_POLLS polls are pruned.
+    """
+
+    def __init__(self, agency, source_dir, watch=False, snapshot_dir=None, poll_interval=300, settle_seconds=30):
+        """
+        Args:
+            agency (str): Agency ('subway', 'lirr', 'mnr')
+            source_dir (str): Directory the MTA release is published to
+            watch (bool): Poll for new releases and serve snapshot copies
+            snapshot_dir (str): Where this agency's release snapshots are kept
+            poll_interval (float): Seconds between polls
+            settle_seconds (float): Only load a release whose files are this old
+        """
+        self.agency = agency
+        self.source_dir = source_dir
+        self.watch = watch
+        self.snapshot_dir = snapshot_dir or os.path.join(os.path.dirname(source_dir), '.gtfs_versions', agency)
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.warm = None       # callable(dataset, index), builds derived data before a swap
+        self.on_retire = None  # callable(dataset), called after a dataset is swapped out
+
+        self.lock = threading.Lock()
+        self.dataset = None
+        self.watcher_pid = None
+        self.last_error = None
+
+    def current(self):
+        """
+        Get the release to serve
+
+        Returns:
+            StaticDataset: Current release
+        """
+        dataset = self.dataset
+        if dataset is None:
+            with self.lock:
+                if self.dataset is None:
+                    self.dataset = self._initial_dataset()
+                dataset = self.dataset
+        if self.watch and self.watcher_pid != os.getpid():
+            self._start_watcher()
+        return dataset
+
+    def _initial_dataset(self):
+        version, _ = fingerprint(self.source_dir)
+        if self.watch and version is not None:
+            directory = self._snapshot(version)
+            if directory is not None:
+                return StaticDataset(self.agency, version, directory)
+        return StaticDataset(self.agency, version or 'unversioned', self.source_dir)
+
+    def _snapshot(self, version):
+        """Copy the source release to snapshot_dir/<version>; None if it changed while copying"""
+        target = os.path.join(self.snapshot_dir, version)
+        if os.path.isdir(target):
+            return target
+
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".{version}-", dir=self.snapshot_dir)
+        try:
+            for name in os.listdir(self.source_dir):
+                if name.endswith('.txt'):
+                    shutil.copy2(os.path.join(self.source_dir, name), os.path.join(staging, name))
+            if fingerprint(self.source_dir)[0] != version:
+                self.last_error = "Release changed while it was being copied"
+                return None
+            # Another process may have published the same version first
+            try:
+                os.rename(staging, target)
+                staging = None
+            except OSError:
+                if not os.path.isdir(target):
+                    raise
+            return target
+        finally:
+            if staging is not None:
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def _start_watcher(self):
+        with self.lock:
+            if self.watcher_pid == os.getpid():
+                return
+            # Threads don't survive fork; every worker process starts its own watcher
+            self.watcher_pid = os.getpid()
+        self._touch()
+        thread = threading.Thread(target=self._watch, name=f'static-dataset-watcher-{self.agency}', daemon=True)
+        thread.start()
+
+    def _touch(self):
+        """Mark the snapshot this process serves as in use, so pruning by other processes keeps it"""
+        dataset = self.dataset
+        if dataset is not None and dataset.directory != self.source_dir:
+            try:
+                os.utime(dataset.directory)
+            except OSError:
+                pass
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self._touch()
+            try:
+                self.reload()
+            except Exception as e:
+                self.last_error = str(e)
+                RELOADS.inc(self.agency, 'error')
+                print(f"Static dataset reload failed: {str(e)}")
+
+    def reload(self):
+        """
+        Load and swap in the source release if it differs from the current one
+
+        Returns:
+            bool: Whether a new release was swapped in
+        """
+        from utils.static_index import StaticGTFSIndex
+
+        current = self.current()
+        version, newest = fingerprint(self.source_dir)
+        if version is None or version == current.version:
+            return False
+        if time.time() - newest < self.settle_seconds:
+            # Files are still being written; check again on the next poll
+            RELOADS.inc(self.agency, 'unsettled')
+            return False
+
+        directory = self._snapshot(version) if self.watch else self.source_dir
+        if directory is None:
+            RELOADS.inc(self.agency, 'unsettled')
+            return False
+
+        index = StaticGTFSIndex(directory)
+        missing = {name: error for name, error in index.errors.items() if name in REQUIRED_FILES}
+        if missing:
+            self.last_error = f"Release {version} rejected: {missing}"
+            RELOADS.inc(self.agency, 'rejected')
+            return False
+
+        dataset = StaticDataset(self.agency, version, directory)
+        if self.warm is not None:
+            self.warm(dataset, index)
+
+        with self.lock:
+            previous, self.dataset = self.dataset, dataset
+        self.last_error = None
+        RELOADS.inc(self.agency, 'swapped')
+
+        if previous is not None and previous.version != version:
+            if self.on_retire is not None:
+                self.on_retire(previous)
+            self._prune(keep=(previous.directory, directory))
+        return True
+
+    def _prune(self, keep):
+        """Delete snapshots other than `keep` that no process has touched for PRUNE_IDLE_POLLS polls"""
+        if not self.watch or not os.path.isdir(self.snapshot_dir):
+            return
+        keep = {os.path.abspath(directory) for directory in keep}
+        cutoff = time.time() - PRUNE_IDLE_POLLS * self.poll_interval
+        for name in os.listdir(self.snapshot_dir):
+            path = os.path.join(self.snapshot_dir, name)
+            if name.startswith('.') or os.path.abspath(path) in keep:
+                continue
+            try:
+                idle = os.stat(path).st_mtime < cutoff
+            except OSError:
+                continue
+            if idle:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def get_stats(self):
+        """
+        Get release statistics
+
+        Returns:
+            dict: Dictionary with release stats
+        """
+        dataset = self.current()
+        return {
+            "version": dataset.version,
+            "directory": dataset.directory,
+            "loaded_at": int(dataset.loaded_at),
+            "memory_bytes": dataset.memory_bytes,
+            "cached_results": len(dataset.cached_nbytes),
+            "watching": self.watch,
+            "last_error": self.last_error
+        }
+
+
+class StaticDatasetRegistry:
+    """
+    Static GTFS releases of every agency behind one interface
+
+    Each agency has its own StaticDatasets, loaded on first use, so serving
+    one agency never waits for another agency's files to be read.
+    """
+
+    def __init__(self, directories, watch=False, snapshot_dir=None, poll_interval=300, settle_seconds=30):
+        """
+        Args:
+            directories (dict): Agency -> static GTFS directory
+            watch (bool): Poll for new releases and serve snapshot copies
+            snapshot_dir (str): Where release snapshots are kept, one subdirectory per agency
+            poll_interval (float): Seconds between polls
+            settle_seconds (float): Only load a release whose files are this old
+        """
+        self.datasets = {
+            agency: StaticDatasets(
+                agency, directory, watch=watch,
+                snapshot_dir=os.path.join(snapshot_dir, agency) if snapshot_dir else None,
+                poll_interval=poll_interval, settle_seconds=settle_seconds
+            ) for agency, directory in directories.items()
+        }
+        DATASET_BYTES.set_function(lambda: {
+            (agency, ): datasets.dataset.memory_bytes
+            for agency, datasets in self.datasets.items() if datasets.dataset is not None
+        })
+
+    @property
+    def agencies(self):
+        """Configured agencies"""
+        return list(self.datasets)
+
+    def set_hooks(self, warm=None, on_retire=None):
+        """
+        Set the warm and retire callbacks of every agency (see StaticDatasets)
+
+        Args:
+            warm (callable): warm(dataset, index)
+            on_retire (callable): on_retire(dataset)
+        """
+        for datasets in self.datasets.values():
+            datasets.warm = warm
+            datasets.on_retire = on_retire
+
+    def get(self, agency):
+        """
+        Get an agency's releases
+
+        Args:
+            agency (str): Agency
+
+        Returns:
+            StaticDatasets: Agency releases
+
+        Raises:
+            ValueError: If the agency is not configured
+        """
+        if agency not in self.datasets:
+            raise ValueError(f"Invalid agency: {agency}")
+        return self.datasets[agency]
+
+    def current(self, agency):
+        """
+        Get an agency's current release
+
+        Args:
+            agency (str): Agency
+
+        Returns:
+            StaticDataset: Current release
+        """
+        return self.get(agency).current()
+
+    def get_stats(self):
+        """
+        Get release statistics of every agency
+
+        Returns:
+            dict: Agency -> release stats
+        """
+        return {agency: datasets.get_stats() for agency, datasets in self.datasets.items()}
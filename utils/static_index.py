@@ -0,0 +1,169 @@
+import csv
+import os
+import sys
+
+
+class StaticGTFSIndex:
+    """
+    Route, stop and shape lookups built from one pass over each static GTFS file
+
+    The per-route DataService loaders scan trips.txt, stop_times.txt and
+    shapes.txt on every cache miss. Warming every route that way reads the
+    large files once per route; this index reads each file once and then
+    produces the same results the loaders would. Files that are missing are
+    recorded in `errors`, and the lookups that need them return None. IDs
+    and names are interned, so every agency and release shares one copy.
+    """
+
+    def __init__(self, directory=os.path.join('data', 'gtfs_subway')):
+        """
+        Args:
+            directory (str): Static GTFS directory
+        """
+        self.directory = directory
+        self.errors = {}
+
+        self.route_ids = []            # routes.txt order
+        self.route_trips = {}          # route_id -> set of trip_ids
+        self.route_shapes = {}         # route_id -> set of shape_ids
+        self.stops = []                # stops.txt rows as {"id", "name", "lat", "lng"}
+        self.route_stop_ids = None     # route_id -> set of stop_ids, None without stop_times.txt
+        self.stop_routes = None        # stop_id -> set of route_ids, None without stop_times.txt
+        self.shape_points = None       # shape_id -> [{"lat", "lng", "sequence"}], None without shapes.txt
+
+        self._load_routes()
+        trip_routes = self._load_trips()
+        self._load_stops()
+        self._load_stop_times(trip_routes)
+        self._load_shapes()
+
+    def _open(self, name):
+        return open(os.path.join(self.directory, name), 'r', encoding='utf-8')
+
+    def _load_routes(self):
+        try:
+            with self._open('routes.txt') as f:
+                self.route_ids = [sys.intern(row['route_id']) for row in csv.DictReader(f)]
+        except OSError as e:
+            self.errors['routes'] = str(e)
+
+    def _load_trips(self):
+        trip_routes = {}
+        try:
+            with self._open('trips.txt') as f:
+                for row in csv.DictReader(f):
+                    route_id = sys.intern(row['route_id'])
+                    trip_routes[row['trip_id']] = route_id
+                    self.route_trips.setdefault(route_id, set()).add(row['trip_id'])
+                    if 'shape_id' in row:
+                        self.route_shapes.setdefault(route_id, set()).add(sys.intern(row['shape_id']))
+        except OSError as e:
+            self.errors['trips'] = str(e)
+        return trip_routes
+
+    def _load_stops(self):
+        try:
+            with self._open('stops.txt') as f:
+                self.stops = [{
+                    "id": sys.intern(row['stop_id']),
+                    "name": sys.intern(row['stop_name']),
+                    "lat": float(row['stop_lat']),
+                    "lng": float(row['stop_lon'])
+                } for row in csv.DictReader(f)]
+        except OSError as e:
+            self.errors['stops'] = str(e)
+
+    def _load_stop_times(self, trip_routes):
+        route_stop_ids = {}
+        stop_routes = {}
+        try:
+            with self._open('stop_times.txt') as f:
+                for row in csv.DictReader(f):
+                    stop_id = sys.intern(row['stop_id'])
+                    routes = stop_routes.setdefault(stop_id, set())
+                    route_id = trip_routes.get(row['trip_id'])
+                    if route_id is not None:
+                        routes.add(route_id)
+                        route_stop_ids.setdefault(route_id, set()).add(stop_id)
+        except OSError as e:
+            self.errors['stop_times'] = str(e)
+            return
+
+        self.route_stop_ids = route_stop_ids
+        self.stop_routes = stop_routes
+
+    def _load_shapes(self):
+        wanted = set()
+        for shape_ids in self.route_shapes.values():
+            wanted.update(shape_ids)
+
+        shape_points = {}
+        try:
+            with self._open('shapes.txt') as f:
+                for row in csv.DictReader(f):
+                    if row['shape_id'] in wanted:
+                        shape_points.setdefault(row['shape_id'], []).append({
+                            "lat": float(row['shape_pt_lat']),
+                            "lng": float(row['shape_pt_lon']),
+                            "sequence": int(row['shape_pt_sequence'])
+                        })
+        except OSError as e:
+            self.errors['shapes'] = str(e)
+            return
+
+        for points in shape_points.values():
+            points.sort(key=lambda point: point['sequence'])
+        self.shape_points = shape_points
+
+    def route_stops(self, route_id):
+        """
+        Get stops for a route, as DataService.get_stops_for_route returns them
+
+        Args:
+            route_id (str): Route ID
+
+        Returns:
+            dict: Route stops, or None if the route has no trips or stop_times.txt is missing
+        """
+        if self.route_stop_ids is None or not self.route_trips.get(route_id):
+            return None
+
+        stop_ids = self.route_stop_ids.get(route_id, set())
+        return {
+            "route_id": route_id,
+            "stops": [dict(stop) for stop in self.stops if stop["id"] in stop_ids]
+        }
+
+    def line_shape(self, route_id):
+        """
+        Get shapes for a route, as DataService.get_line_shape returns them
+
+        Args:
+            route_id (str): Route ID
+
+        Returns:
+            dict: Route shapes, or None if the route has no shapes or shapes.txt is missing
+        """
+        shape_ids = self.route_shapes.get(route_id)
+        if self.shape_points is None or not shape_ids:
+            return None
+
+        return {
+            "route_id": route_id,
+            "shapes": [{
+                "shape_id": shape_id,
+                "coordinates": [{"lat": point["lat"], "lng": point["lng"]}
+                                for point in self.shape_points.get(shape_id, [])]
+            } for shape_id in shape_ids]
+        }
+
+    def station_route_map(self):
+        """
+        Get the stop -> routes mapping, as DataService.get_station_route_map returns it
+
+        Returns:
+            dict: Stop ID -> list of route IDs, or None if stop_times.txt is missing
+        """
+        if self.stop_routes is None:
+            return None
+        return {stop_id: list(route_ids) for stop_id, route_ids in self.stop_routes.items()}
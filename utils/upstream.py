@@ -0,0 +1,387 @@
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from utils.metrics import metrics
+
+UPSTREAM_RETRIES = metrics.counter('upstream_retries_total', 'Upstream fetch attempts retried', ('feed',))
+UPSTREAM_REJECTED = metrics.counter(
+    'upstream_rejected_total', 'Upstream fetches not attempted', ('feed', 'reason'))
+BREAKER_STATE = metrics.gauge(
+    'upstream_breaker_state', 'Circuit breaker state per feed (0 closed, 1 half-open, 2 open)', ('feed',))
+
+# Absolute time.monotonic() deadline of the request being served, None when unbounded
+_deadline = contextvars.ContextVar('upstream_deadline', default=None)
+
+
+class UpstreamUnavailable(Exception):
+    """A fetch was not attempted: the feed's breaker is open or the request deadline has passed"""
+
+
+def set_deadline(seconds):
+    """
+    Bound upstream fetches made from the current context
+
+    An earlier deadline already set (e.g. by a batch request running its
+    sub-requests) is kept.
+
+    Args:
+        seconds (float): Time budget from now
+
+    Returns:
+        Token: Pass to reset_deadline() when the request ends
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    return _deadline.set(deadline)
+
+
+def reset_deadline(token):
+    """
+    Restore the deadline that applied before set_deadline()
+
+    Args:
+        token (Token): Token returned by set_deadline()
+    """
+    _deadline.reset(token)
+
+
+def remaining_time():
+    """
+    Get the time left before the current deadline
+
+    Returns:
+        float: Seconds left (may be negative), or None without a deadline
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def request_deadline(seconds):
+    """
+    Decorator giving a view its own deadline instead of the app default
+
+    For views whose upstream timeouts exceed the default budget (e.g. the
+    slow accessibility feeds).
+
+    Args:
+        seconds (float): Budget of the view's requests
+
+    Returns:
+        callable: Decorator returning the same view function
+    """
+    def decorator(view):
+        view.request_deadline = seconds
+        return view
+    return decorator
+
+
+def init_request_deadline(app, seconds):
+    """
+    Give every request of a Flask app an upstream deadline
+
+    Args:
+        app (Flask): Application
+        seconds (float): Budget per request, falsy to leave requests unbounded
+    """
+    from flask import g, request
+
+    if not seconds:
+        return
+
+    @app.before_request
+    def start_request_deadline():
+        view = app.view_functions.get(request.endpoint)
+        g.upstream_deadline_token = set_deadline(getattr(view, 'request_deadline', seconds))
+
+    @app.teardown_request
+    def end_request_deadline(exc=None):
+        token = g.pop('upstream_deadline_token', None)
+        if token is not None:
+            reset_deadline(token)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one upstream feed
+
+    Opens after `failure_threshold` consecutive failed fetches, so requests
+    stop waiting on a feed that is down. After `reset_seconds` a single
+    probe fetch is let through (half-open): success closes the breaker,
+    failure opens it for another `reset_seconds`.
+    """
+
+    CLOSED = 'closed'
+    HALF_OPEN = 'half_open'
+    OPEN = 'open'
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker
+            reset_seconds (float): How long the breaker stays open before a probe
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+        self.last_success = None
+        self.last_failure = None
+        self.last_error = None
+
+    def allow(self):
+        """
+        Check whether a fetch may be attempted now
+
+        Returns:
+            bool: True when closed, or when this call is the half-open probe
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at < self.reset_seconds:
+                return False
+            # One probe at a time; a probe that never reported back is replaced after reset_seconds
+            if self.state == self.HALF_OPEN and now - self.probe_started_at < self.reset_seconds:
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_started_at = now
+            return True
+
+    def record_success(self):
+        """Record a successful fetch"""
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self.last_success = time.time()
+
+    def record_failure(self, error=None):
+        """
+        Record a failed fetch (after its retries)
+
+        Args:
+            error (str): Failure description
+        """
+        with self.lock:
+            self.failures += 1
+            self.last_failure = time.time()
+            self.last_error = error
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def get_stats(self):
+        """
+        Get breaker statistics
+
+        Returns:
+            dict: Dictionary with breaker stats
+        """
+        with self.lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "last_success": int(self.last_success) if self.last_success else None,
+                "last_failure": int(self.last_failure) if self.last_failure else None,
+                "last_error": self.last_error
+            }
+
+
+class UpstreamPolicy:
+    """
+    Timeouts, retries and circuit breakers for upstream feed fetches
+
+    Every fetch gets the feed's (connect, read) timeouts, shortened to the
+    time left before the request deadline. Connection errors, timeouts, 429
+    and 5xx responses are retried with full-jitter exponential backoff as
+    long as the deadline allows. A fetch whose retries all failed counts
+    as one failure for the feed's circuit breaker. Other responses,
+    including 4xx, are returned to the caller as they are.
+    """
+
+    BREAKER_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+    def __init__(self, timeouts, retries=2, backoff_base=0.2, backoff_max=2.0, failure_threshold=5,
+                 reset_seconds=30):
+        """
+        Args:
+            timeouts (dict): (connect, read) seconds by feed ID, '<category>_default' or 'default'
+            retries (int): Retries after a failed attempt
+            backoff_base (float): Backoff ceiling of the first retry, doubled on each retry
+            backoff_max (float): Largest backoff ceiling
+            failure_threshold (int): Consecutive failed fetches that open a feed's breaker
+            reset_seconds (float): How long a breaker stays open before a probe
+        """
+        self.timeouts = timeouts
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.breakers = {}  # feed ID -> CircuitBreaker
+        BREAKER_STATE.set_function(lambda: {
+            (feed_id, ): self.BREAKER_STATES[breaker.state] for feed_id, breaker in self.breakers.items()
+        })
+
+    def breaker(self, feed_id):
+        """
+        Get a feed's circuit breaker
+
+        Args:
+            feed_id (str): Feed ID
+
+        Returns:
+            CircuitBreaker: Breaker of the feed
+        """
+        breaker = self.breakers.get(feed_id)
+        if breaker is None:
+            with self.lock:
+                breaker = self.breakers.setdefault(
+                    feed_id, CircuitBreaker(self.failure_threshold, self.reset_seconds))
+        return breaker
+
+    def get_timeout(self, category, feed_id):
+        """
+        Get a feed's configured timeouts
+
+        Args:
+            category (str): Feed category
+            feed_id (str): Feed ID
+
+        Returns:
+            tuple: (connect, read) seconds
+        """
+        if feed_id in self.timeouts:
+            return self.timeouts[feed_id]
+        return self.timeouts.get(f"{category}_default", self.timeouts['default'])
+
+    def _begin(self, feed_id):
+        breaker = self.breaker(feed_id)
+        if not breaker.allow():
+            UPSTREAM_REJECTED.inc(feed_id, 'breaker_open')
+            raise UpstreamUnavailable(f"Upstream feed {feed_id} is unavailable (circuit open)")
+        return breaker
+
+    def _attempt_timeout(self, category, feed_id):
+        """(connect, read) timeouts of the next attempt, capped by the deadline"""
+        connect, read = self.get_timeout(category, feed_id)
+        remaining = remaining_time()
+        if remaining is None:
+            return connect, read
+        if remaining <= 0:
+            UPSTREAM_REJECTED.inc(feed_id, 'deadline')
+            raise UpstreamUnavailable(f"Request deadline exceeded before fetching {feed_id}")
+        return min(connect, remaining), min(read, remaining)
+
+    def _after_attempt(self, breaker, feed_id, attempt, response, error):
+        """
+        Settle an attempt
+
+        Returns:
+            float: Seconds to wait before retrying, or None when done
+        """
+        if error is None and response.status_code != 429 and response.status_code < 500:
+            breaker.record_success()
+            return None
+
+        if attempt < self.retries:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            remaining = remaining_time()
+            if remaining is None or delay < remaining:
+                UPSTREAM_RETRIES.inc(feed_id)
+                return delay
+
+        breaker.record_failure(str(error) if error is not None else f"HTTP {response.status_code}")
+        return None
+
+    def call(self, category, feed_id, request_once):
+        """
+        Fetch a feed through its breaker, retrying failed attempts
+
+        Args:
+            category (str): Feed category
+            feed_id (str): Feed ID
+            request_once (callable): request_once((connect, read)) makes one attempt and returns the response
+
+        Returns:
+            Response: Last response (possibly a 429 or 5xx once retries are exhausted)
+
+        Raises:
+            UpstreamUnavailable: If the breaker is open or the deadline has passed
+            Exception: The last attempt's exception
+        """
+        breaker = self._begin(feed_id)
+        attempt = 0
+        while True:
+            try:
+                timeout = self._attempt_timeout(category, feed_id)
+            except UpstreamUnavailable as e:
+                # Out of time is only the feed's fault once an attempt has failed
+                if attempt:
+                    breaker.record_failure(str(e))
+                raise
+            try:
+                response, error = request_once(timeout), None
+            except Exception as e:
+                response, error = None, e
+
+            delay = self._after_attempt(breaker, feed_id, attempt, response, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, category, feed_id, request_once):
+        """
+        Async counterpart of call()
+
+        Args:
+            category (str): Feed category
+            feed_id (str): Feed ID
+            request_once (callable): Coroutine function making one attempt with (connect, read) timeouts
+
+        Returns:
+            Response: Last response
+        """
+        breaker = self._begin(feed_id)
+        attempt = 0
+        while True:
+            try:
+                timeout = self._attempt_timeout(category, feed_id)
+            except UpstreamUnavailable as e:
+                # Out of time is only the feed's fault once an attempt has failed
+                if attempt:
+                    breaker.record_failure(str(e))
+                raise
+            try:
+                response, error = await request_once(timeout), None
+            except Exception as e:
+                response, error = None, e
+
+            delay = self._after_attempt(breaker, feed_id, attempt, response, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def get_stats(self):
+        """
+        Get breaker statistics of every feed fetched so far
+
+        Returns:
+            dict: Feed ID -> breaker stats
+        """
+        return {feed_id: breaker.get_stats() for feed_id, breaker in sorted(self.breakers.items())}
@@ -0,0 +1,162 @@
+import threading
+
+# Wire format -> response mimetype
+MIMETYPES = {
+    'json': 'application/json',
+    'protobuf': 'application/x-protobuf',
+    'msgpack': 'application/msgpack'
+}
+
+# Accept header mimetypes, in order of preference when the client rates them equally
+ACCEPTED_MIMETYPES = {
+    'application/json': 'json',
+    'application/x-protobuf': 'protobuf',
+    'application/protobuf': 'protobuf',
+    'application/msgpack': 'msgpack',
+    'application/x-msgpack': 'msgpack'
+}
+
+
+def negotiate(request):
+    """
+    Pick the wire format of a feed response
+
+    An explicit ?format= wins over the Accept header. JSON is the default,
+    also for Accept headers that name no supported format, as clients
+    predating content negotiation expect.
+
+    Args:
+        request (Request): Flask request
+
+    Returns:
+        str: 'json', 'protobuf' or 'msgpack', or None for an unsupported ?format=
+    """
+    requested = request.args.get('format')
+    if requested:
+        return requested if requested in MIMETYPES else None
+    best = request.accept_mimetypes.best_match(list(ACCEPTED_MIMETYPES))
+    return ACCEPTED_MIMETYPES.get(best, 'json')
+
+
+def encode_msgpack(data):
+    """
+    Encode parsed feed data as MessagePack
+
+    Args:
+        data (dict or list): Parsed feed data
+
+    Returns:
+        bytes: Encoded data
+
+    Raises:
+        ImportError: If msgpack is not installed
+    """
+    import msgpack
+
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def filter_feed_message(content, route_id):
+    """
+    Keep only the entities of a GTFS-RT payload that concern a route
+
+    Trip updates and vehicles are kept when their trip is on the route,
+    alerts when they inform the route.
+
+    Args:
+        content (bytes): GTFS-RT binary content
+        route_id (str): Route ID
+
+    Returns:
+        bytes: Re-encoded GTFS-RT payload
+    """
+    from google.transit import gtfs_realtime_pb2
+
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(content)
+
+    kept = []
+    for entity in feed.entity:
+        if entity.HasField('trip_update'):
+            matches = entity.trip_update.trip.route_id == route_id
+        elif entity.HasField('vehicle'):
+            matches = entity.vehicle.trip.route_id == route_id
+        elif entity.HasField('alert'):
+            matches = any(informed.route_id == route_id for informed in entity.alert.informed_entity)
+        else:
+            matches = False
+        if matches:
+            kept.append(entity)
+
+    filtered = gtfs_realtime_pb2.FeedMessage()
+    filtered.header.CopyFrom(feed.header)
+    filtered.entity.extend(kept)
+    return filtered.SerializeToString()
+
+
+class EncodedSnapshots:
+    """
+    Encoded response bodies of the current snapshot of each feed
+
+    Entries are tied to the snapshot object they were encoded from: once a
+    refresh stores a new snapshot, the old bodies are dropped and each
+    format is encoded again at most once. The upstream payload is stored
+    with the snapshot so protobuf responses are served byte for byte.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # (category, feed_id) -> (snapshot, {(format, variant): bytes})
+
+    def put(self, category, feed_id, snapshot, raw=None):
+        """
+        Start the encodings of a newly stored snapshot
+
+        Args:
+            category (str): Feed category
+            feed_id (str): Feed ID
+            snapshot: Stored snapshot (ColumnarFeed, dict or list)
+            raw (bytes): Upstream GTFS-RT payload of the snapshot
+        """
+        bodies = {} if raw is None else {('protobuf', None): raw}
+        with self.lock:
+            self.entries[(category, feed_id)] = (snapshot, bodies)
+
+    def get(self, category, feed_id, snapshot, key):
+        """
+        Get an encoded body of a snapshot
+
+        Args:
+            category (str): Feed category
+            feed_id (str): Feed ID
+            snapshot: Snapshot the body must have been encoded from
+            key (tuple): (format, variant), e.g. ('protobuf', route_id)
+
+        Returns:
+            bytes: Encoded body, or None if not encoded yet
+        """
+        with self.lock:
+            entry = self.entries.get((category, feed_id))
+        if entry is None or entry[0] is not snapshot:
+            return None
+        return entry[1].get(key)
+
+    def set(self, category, feed_id, snapshot, key, body):
+        """
+        Store an encoded body of a snapshot (ignored if the feed was refreshed meanwhile)
+
+        Args:
+            category (str): Feed category
+            feed_id (str): Feed ID
+            snapshot: Snapshot the body was encoded from
+            key (tuple): (format, variant)
+            body (bytes): Encoded body
+        """
+        with self.lock:
+            entry = self.entries.get((category, feed_id))
+            if entry is None:
+                entry = (snapshot, {})
+                self.entries[(category, feed_id)] = entry
+            elif entry[0] is not snapshot:
+                return
+            entry[1][key] = body
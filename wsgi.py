@@ -0,0 +1,13 @@
+"""
+WSGI entry point for pre-forking servers
+
+    gunicorn -c gunicorn.conf.py
+
+With preload_app the module is imported once in the master process: static
+GTFS data is loaded there and frozen (PRELOAD_STATIC_DATA), and forked
+workers share those pages copy-on-write instead of each building a private
+copy on first request.
+"""
+from app import create_app
+
+app = create_app({'PRELOAD_STATIC_DATA': True})